@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compresión gzip/brotli de las respuestas (brotli requiere el paquete brotli)
+    'gestion_academica.compresion.CompresionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +59,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Tras una escritura, las lecturas del usuario no van a la réplica por unos segundos
+    'gestion_academica.replicas.FijarPrimariaMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -93,6 +97,66 @@ DATABASES = {
     }
 }
 
+# Réplica de lectura opcional para los endpoints pesados (ver gestion_academica/replicas.py).
+# Para probar localmente basta con DB_REPLICA_HOST apuntando al mismo servidor.
+DB_REPLICA_HOST = config("DB_REPLICA_HOST", default="")
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config("DB_REPLICA_NAME", default=DATABASES['default']['NAME']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config("DB_REPLICA_PORT", default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['gestion_academica.replicas.ReplicaRouter']
+REPLICA_RETRASO_MAXIMO = config("REPLICA_RETRASO_MAXIMO", default=5, cast=int)
+
+
+# Cache
+# Memoria local por defecto, válida solo con un proceso. Con REDIS_URL se usa
+# un backend compartido entre procesos (paquete redis): es obligatorio con más
+# de un worker y recomendable en cuanto corren los comandos programados
+# (ver gestion_academica/cache_respuestas.py).
+REDIS_URL = config("REDIS_URL", default="")
+# Procesos del servidor (gunicorn lee la misma variable). Con más de uno y sin
+# REDIS_URL la aplicación no arranca.
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'asistencia',
+        }
+    }
+
+# Fuente de los planteles de las materias: 'cohorte' (carrera + semestre del
+# estudiante) o 'inscripcion' (modelo Inscripcion)
+ROSTER_FUENTE = config("ROSTER_FUENTE", default="cohorte")
+
+# Minutos después del inicio de la sesión en que un registro sigue siendo
+# PRESENTE (después es RETRASO). Carrera y MateriaSemestre pueden redefinirlo;
+# tras cambiarlo aquí se ejecuta `manage.py recalcular_tolerancia --todas`
+ASISTENCIA_TOLERANCIA_MINUTOS = config("ASISTENCIA_TOLERANCIA_MINUTOS", default=15, cast=int)
+
+# Tamaño mínimo (bytes) de una respuesta para comprimirla
+COMPRESION_MIN_BYTES = config("COMPRESION_MIN_BYTES", default=1024, cast=int)
+# Bytes ahorrados por ruta (/api/estadisticas-compresion/): tres escrituras en la
+# caché por respuesta comprimida; con varios workers requiere REDIS_URL
+COMPRESION_ESTADISTICAS = config("COMPRESION_ESTADISTICAS", default=False, cast=bool)
+
+# Segundos que los clientes pueden reutilizar los catálogos sin revalidar.
+# Con 0 siempre revalidan (If-None-Match), lo que es barato: 304 sin consultas.
+CATALOGO_MAX_AGE = config("CATALOGO_MAX_AGE", default=0, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,6 +207,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Paginación por cursor; los clientes antiguos pueden enviar X-Paginacion: desactivada
+    'DEFAULT_PAGINATION_CLASS': 'gestion_academica.paginacion.PaginacionCursor',
+    'PAGE_SIZE': 50,
+    # JSON con orjson (gestion_academica/renderers.py); la API navegable solo en DEBUG
+    'DEFAULT_RENDERER_CLASSES': [
+        'gestion_academica.renderers.ORJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'gestion_academica.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # JWT Settings
@@ -152,6 +228,8 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
+    # Cada access token renovado vuelve a resolver los perfiles (ver principal.py)
+    'TOKEN_REFRESH_SERIALIZER': 'gestion_academica.principal.RefreshConPerfilesSerializer',
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
 
@@ -186,6 +264,15 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-paginacion',
+    'if-none-match',
+    'if-modified-since',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'x-resultados-truncados',
+    'etag',
+    'last-modified',
 ]
 
 CORS_ALLOWED_ORIGINS = [
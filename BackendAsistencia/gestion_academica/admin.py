@@ -3,7 +3,8 @@ from .models import (
     Usuario, Carrera, Semestre, Materia,
     Estudiante, Docente, Administrador,
     MateriaSemestre, DocenteMateriaSemestre, SesionClase,
-    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, DiaEspecial
+    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, DiaEspecial,
+    GestionArchivada, CalendarioGestion
 )
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
@@ -37,6 +38,13 @@ admin.site.register(PermisoAsistencia)
 admin.site.register(RegistroAsistencia)
 admin.site.register(Reporte)
 
+admin.site.register(CalendarioGestion)
+
+@admin.register(GestionArchivada)
+class GestionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ['gestion', 'completada', 'sesiones', 'registros', 'permisos', 'fecha_archivado']
+    readonly_fields = ['gestion', 'completada', 'sesiones', 'registros', 'permisos', 'fecha_archivado']
+
 @admin.register(DiaEspecial)
 class DiaEspecialAdmin(admin.ModelAdmin):
     list_display = ['fecha', 'tipo', 'descripcion', 'afecta_asistencia', 'creado_por', 'fecha_creacion']
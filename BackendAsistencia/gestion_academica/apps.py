@@ -6,4 +6,6 @@ class GestionAcademicaConfig(AppConfig):
     name = 'gestion_academica'
 
     def ready(self):
-        import gestion_academica.signals
\ No newline at end of file
+        import gestion_academica.signals
+        from gestion_academica.cache_respuestas import verificar_cache_compartida
+        verificar_cache_compartida()
@@ -0,0 +1,343 @@
+"""
+Archivo de gestiones cerradas.
+
+Cuando una gestión termina, sus sesiones, registros y permisos solo se leen
+para historiales y certificados. `manage.py archivar_gestion` los saca de las
+tablas activas:
+
+1. Calcula los resúmenes congelados por estudiante y por MateriaSemestre
+   (una sola vez, en la misma transacción que crea la GestionArchivada).
+2. Copia las filas crudas por lotes a las tablas compactas *Archivado/a.
+3. Elimina cada lote de las tablas activas en la misma transacción que lo
+   copia, así que una interrupción no deja filas duplicadas ni perdidas y
+   basta con volver a ejecutar el comando.
+
+Desde que existe la GestionArchivada, las lecturas de esa gestión usan los
+resúmenes y las tablas de archivo, aunque el movimiento siga en curso.
+"""
+from django.db import router, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .cache_respuestas import incrementar_version, nombre_tabla
+from .matriz_asistencia import invalidar_matriz
+from .models import (
+    GestionArchivada, Inscripcion, MateriaSemestre, PermisoAsistencia,
+    PermisoAsistenciaArchivado, RegistroAsistencia, RegistroAsistenciaArchivado,
+    ResumenAsistenciaArchivado, ResumenMateriaArchivado, SesionClase, SesionClaseArchivada,
+)
+
+TAMANO_LOTE = 1000
+
+SesionesCubiertas = PermisoAsistencia.sesiones_cubiertas.through
+
+
+class ErrorArchivo(Exception):
+    pass
+
+
+def gestiones_archivadas():
+    """Gestiones cuyas lecturas salen del archivo (completas o en proceso)."""
+    return set(GestionArchivada.objects.values_list('gestion', flat=True))
+
+
+# ----------------------------------------------------------------------
+# Resúmenes congelados
+# ----------------------------------------------------------------------
+def calcular_resumenes(gestion, tamano_lote=TAMANO_LOTE):
+    """Crea los resúmenes por estudiante y por MateriaSemestre de la gestión."""
+    materia_semestre_ids = list(MateriaSemestre.objects.filter(gestion=gestion).values_list('id', flat=True))
+    # Solo las clases realizadas; las planificadas que no se abrieron no cuentan
+    sesiones_por_materia = dict(
+        SesionClase.objects.realizadas().filter(materia_semestre__gestion=gestion)
+        .values('materia_semestre_id').annotate(total=Count('id'))
+        .values_list('materia_semestre_id', 'total')
+    )
+    conteos = (
+        RegistroAsistencia.objects.filter(sesion__materia_semestre__gestion=gestion)
+        .values('estudiante_id', 'sesion__materia_semestre_id')
+        .annotate(
+            presentes=Count('id', filter=Q(estado='PRESENTE')),
+            retrasos=Count('id', filter=Q(estado='RETRASO')),
+            faltas=Count('id', filter=Q(estado='FALTA')),
+            faltas_justificadas=Count('id', filter=Q(estado='FALTA_JUSTIFICADA')),
+            registros=Count('id'),
+        )
+    )
+
+    por_estudiante = {}
+    for fila in conteos:
+        materia_semestre_id = fila['sesion__materia_semestre_id']
+        total = sesiones_por_materia.get(materia_semestre_id, 0)
+        por_estudiante[(fila['estudiante_id'], materia_semestre_id)] = ResumenAsistenciaArchivado(
+            gestion=gestion,
+            estudiante_id=fila['estudiante_id'],
+            materia_semestre_id=materia_semestre_id,
+            total_sesiones=total,
+            presentes=fila['presentes'],
+            retrasos=fila['retrasos'],
+            faltas=fila['faltas'],
+            faltas_justificadas=fila['faltas_justificadas'],
+            sin_registro=max(total - fila['registros'], 0),
+        )
+    # Los inscritos que nunca registraron también tienen su resumen (todo sin registro)
+    for estudiante_id, materia_semestre_id in Inscripcion.objects.filter(
+        materia_semestre__gestion=gestion
+    ).values_list('estudiante_id', 'materia_semestre_id'):
+        if (estudiante_id, materia_semestre_id) not in por_estudiante:
+            total = sesiones_por_materia.get(materia_semestre_id, 0)
+            por_estudiante[(estudiante_id, materia_semestre_id)] = ResumenAsistenciaArchivado(
+                gestion=gestion,
+                estudiante_id=estudiante_id,
+                materia_semestre_id=materia_semestre_id,
+                total_sesiones=total,
+                sin_registro=total,
+            )
+
+    por_materia = {
+        materia_semestre_id: ResumenMateriaArchivado(
+            gestion=gestion,
+            materia_semestre_id=materia_semestre_id,
+            total_sesiones=sesiones_por_materia.get(materia_semestre_id, 0),
+        )
+        for materia_semestre_id in materia_semestre_ids
+    }
+    for resumen in por_estudiante.values():
+        materia = por_materia[resumen.materia_semestre_id]
+        materia.total_estudiantes += 1
+        materia.presentes += resumen.presentes
+        materia.retrasos += resumen.retrasos
+        materia.faltas += resumen.faltas
+        materia.faltas_justificadas += resumen.faltas_justificadas
+
+    ResumenAsistenciaArchivado.objects.bulk_create(por_estudiante.values(), batch_size=tamano_lote)
+    ResumenMateriaArchivado.objects.bulk_create(por_materia.values(), batch_size=tamano_lote)
+    return len(por_estudiante), len(por_materia)
+
+
+# ----------------------------------------------------------------------
+# Movimiento de filas
+# ----------------------------------------------------------------------
+def _eliminar(queryset):
+    # Borrado directo: sin cargar instancias ni emitir una señal por fila
+    # (las cachés se invalidan una sola vez al terminar)
+    queryset._raw_delete(router.db_for_write(queryset.model))
+
+
+def _mover(queryset, copiar, tamano_lote, antes_de_eliminar=None, progreso=None, etiqueta=''):
+    """
+    Copia y elimina el queryset por lotes de claves ascendentes; cada lote va
+    en su propia transacción. Retorna la cantidad de filas movidas.
+    """
+    movidas = 0
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            filas = list(queryset.filter(pk__gt=ultimo_id).order_by('pk')[:tamano_lote])
+            if not filas:
+                break
+            ids = [fila.pk for fila in filas]
+            copiar(filas)
+            if antes_de_eliminar is not None:
+                antes_de_eliminar(ids)
+            _eliminar(queryset.model.objects.filter(pk__in=ids))
+        ultimo_id = ids[-1]
+        movidas += len(ids)
+        if progreso is not None:
+            progreso(f'{etiqueta}: {movidas} movidos...')
+    return movidas
+
+
+def _copiar_registros(gestion):
+    def copiar(registros):
+        RegistroAsistenciaArchivado.objects.bulk_create([
+            RegistroAsistenciaArchivado(
+                id=r.id,
+                gestion=gestion,
+                estudiante_id=r.estudiante_id,
+                sesion_id=r.sesion_id,
+                fecha_registro=r.fecha_registro,
+                estado=r.estado,
+                permiso_asistencia_id=r.permiso_asistencia_id,
+            )
+            for r in registros
+        ])
+    return copiar
+
+
+def _copiar_permisos(gestion):
+    def copiar(permisos):
+        sesiones = {}
+        for permiso_id, sesion_id in SesionesCubiertas.objects.filter(
+            permisoasistencia_id__in=[p.id for p in permisos]
+        ).values_list('permisoasistencia_id', 'sesionclase_id'):
+            sesiones.setdefault(permiso_id, []).append(sesion_id)
+        PermisoAsistenciaArchivado.objects.bulk_create([
+            PermisoAsistenciaArchivado(
+                id=p.id,
+                gestion=gestion,
+                estudiante_id=p.estudiante_id,
+                administrador_aprobador_id=p.administrador_aprobador_id,
+                motivo=p.motivo,
+                archivo_justificacion=p.archivo_justificacion.name or '',
+                estado=p.estado,
+                fecha_solicitud=p.fecha_solicitud,
+                fecha_inicio=p.fecha_inicio,
+                fecha_fin=p.fecha_fin,
+                sesiones_cubiertas=sorted(sesiones.get(p.id, [])),
+            )
+            for p in permisos
+        ])
+    return copiar
+
+
+def _copiar_sesiones(gestion):
+    def copiar(sesiones):
+        SesionClaseArchivada.objects.bulk_create([
+            SesionClaseArchivada(
+                id=s.id,
+                gestion=gestion,
+                materia_semestre_id=s.materia_semestre_id,
+                fecha=s.fecha,
+                hora_inicio=s.hora_inicio,
+                hora_fin=s.hora_fin,
+                tema=s.tema,
+            )
+            for s in sesiones
+        ])
+    return copiar
+
+
+def _permisos_de_gestion(gestion):
+    """
+    Permisos que solo cubren sesiones de la gestión y no justifican registros
+    de otras gestiones (los que mezclan gestiones se quedan en la tabla activa).
+    """
+    otras_sesiones = SesionClase.objects.exclude(materia_semestre__gestion=gestion)
+    return PermisoAsistencia.objects.filter(
+        pk__in=SesionesCubiertas.objects.filter(
+            sesionclase__materia_semestre__gestion=gestion
+        ).values('permisoasistencia_id')
+    ).exclude(
+        pk__in=SesionesCubiertas.objects.filter(
+            sesionclase__in=otras_sesiones
+        ).values('permisoasistencia_id')
+    ).exclude(
+        pk__in=RegistroAsistencia.objects.filter(
+            permiso_asistencia__isnull=False
+        ).exclude(sesion__materia_semestre__gestion=gestion).values('permiso_asistencia_id')
+    )
+
+
+def archivar_gestion(gestion, tamano_lote=TAMANO_LOTE, forzar=False, progreso=None):
+    """
+    Archiva la gestión. Si un archivado anterior quedó a medias, continúa donde
+    se quedó (los resúmenes ya calculados no se recalculan).
+    """
+    if not MateriaSemestre.objects.filter(gestion=gestion).exists():
+        raise ErrorArchivo(f'No hay materias en la gestión {gestion!r}')
+
+    with transaction.atomic():
+        archivada, creada = GestionArchivada.objects.select_for_update().get_or_create(gestion=gestion)
+        if archivada.completada:
+            raise ErrorArchivo(f'La gestión {gestion} ya está archivada')
+        if creada:
+            if not forzar and SesionClase.objects.realizadas().filter(
+                materia_semestre__gestion=gestion, fecha__gte=timezone.localdate()
+            ).exists():
+                raise ErrorArchivo(f'La gestión {gestion} tiene sesiones de hoy o futuras (use --forzar)')
+            estudiantes, materias = calcular_resumenes(gestion, tamano_lote)
+            if progreso is not None:
+                progreso(f'Resúmenes: {estudiantes} por estudiante, {materias} por materia')
+            # Sus materias salen del horario vigente (ver horarios.py)
+            transaction.on_commit(lambda: incrementar_version(nombre_tabla(GestionArchivada)))
+
+    materia_semestre_ids = list(MateriaSemestre.objects.filter(gestion=gestion).values_list('id', flat=True))
+
+    # Registros primero: referencian sesiones y permisos
+    archivada.registros += _mover(
+        RegistroAsistencia.objects.filter(sesion__materia_semestre__gestion=gestion),
+        _copiar_registros(gestion), tamano_lote, progreso=progreso, etiqueta='Registros',
+    )
+    archivada.permisos += _mover(
+        _permisos_de_gestion(gestion),
+        _copiar_permisos(gestion), tamano_lote,
+        antes_de_eliminar=lambda ids: _eliminar(SesionesCubiertas.objects.filter(permisoasistencia_id__in=ids)),
+        progreso=progreso, etiqueta='Permisos',
+    )
+    # Las planificadas que nunca se abrieron no se archivan
+    _mover(
+        SesionClase.objects.planificadas().filter(materia_semestre__gestion=gestion),
+        lambda sesiones: None, tamano_lote,
+        antes_de_eliminar=lambda ids: _eliminar(SesionesCubiertas.objects.filter(sesionclase_id__in=ids)),
+    )
+    archivada.sesiones += _mover(
+        SesionClase.objects.filter(materia_semestre__gestion=gestion),
+        _copiar_sesiones(gestion), tamano_lote,
+        # Los permisos que se quedan pierden la referencia a las sesiones archivadas
+        antes_de_eliminar=lambda ids: _eliminar(SesionesCubiertas.objects.filter(sesionclase_id__in=ids)),
+        progreso=progreso, etiqueta='Sesiones',
+    )
+
+    archivada.completada = True
+    archivada.save(update_fields=['completada', 'sesiones', 'registros', 'permisos'])
+
+    incrementar_version('asistencia')
+    for materia_semestre_id in materia_semestre_ids:
+        invalidar_matriz(materia_semestre_id)
+    return archivada
+
+
+# ----------------------------------------------------------------------
+# Lecturas
+# ----------------------------------------------------------------------
+def historial_archivado(estudiante_id, materia_semestres):
+    """
+    Historial de un estudiante en MateriaSemestre archivadas, con el mismo
+    formato que el historial de las tablas activas. `materia_semestres` debe
+    venir con materia y semestre__carrera cargados.
+    """
+    por_id = {ms.id: ms for ms in materia_semestres}
+    sesiones = list(
+        SesionClaseArchivada.objects.filter(materia_semestre_id__in=por_id).order_by('-fecha')
+    )
+    registros = {
+        r.sesion_id: r
+        for r in RegistroAsistenciaArchivado.objects.filter(
+            estudiante_id=estudiante_id, sesion_id__in=[s.id for s in sesiones]
+        )
+    }
+    historial = []
+    for sesion in sesiones:
+        ms = por_id[sesion.materia_semestre_id]
+        registro = registros.get(sesion.id)
+        historial.append({
+            'id': registro.id if registro else None,
+            'sesion': {
+                'id': sesion.id,
+                'fecha': sesion.fecha,
+                'hora_inicio': sesion.hora_inicio,
+                'hora_fin': sesion.hora_fin,
+                'tema': sesion.tema or 'Sin tema',
+                'materia_semestre': {
+                    'materia': {'nombre': ms.materia.nombre},
+                    'semestre': {'nombre': ms.semestre.nombre},
+                    'carrera': {'nombre': ms.semestre.carrera.nombre},
+                }
+            },
+            'estado': registro.estado if registro else 'FALTA',
+            'fecha_registro': registro.fecha_registro if registro else None,
+            'archivado': True,
+        })
+    return historial
+
+
+def totales_archivados_por_materia():
+    """{materia_id: (total_sesiones, asistencias)} de las gestiones archivadas."""
+    return {
+        fila['materia_semestre__materia_id']: (fila['sesiones'] or 0, fila['asistencias'] or 0)
+        for fila in ResumenMateriaArchivado.objects.values('materia_semestre__materia_id').annotate(
+            sesiones=Sum('total_sesiones'),
+            asistencias=Sum('presentes') + Sum('retrasos'),
+        )
+    }
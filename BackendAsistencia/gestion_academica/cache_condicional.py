@@ -0,0 +1,69 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) para los catálogos.
+
+Cada ViewSet declara las tablas de las que depende su respuesta. Las señales
+mantienen una versión por tabla (marca de tiempo en milisegundos, ver
+cache_respuestas.nombre_tabla), así que el ETag se calcula sin tocar la base
+de datos: si el cliente ya tiene la versión actual se responde 304 sin
+ejecutar la consulta ni serializar.
+
+Las versiones viven en la caché, así que solo sirven si todos los procesos
+comparten la misma (REDIS_URL). Con la caché en memoria local un cambio hecho
+en otro worker no cambiaría el ETag y se respondería 304 con datos viejos:
+en ese caso el mixin no agrega validadores y cada petición se responde
+completa.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache_respuestas import cache_compartida, nombre_tabla, obtener_version
+
+
+class CatalogoCondicionalMixin:
+    """
+    Agrega ETag, Last-Modified y Cache-Control a list/retrieve y responde 304
+    cuando If-None-Match / If-Modified-Since coinciden con la versión actual.
+
+    tablas_catalogo: modelos cuyos cambios modifican la respuesta.
+    """
+    tablas_catalogo = ()
+
+    def _versiones_catalogo(self):
+        return [obtener_version(nombre_tabla(modelo)) for modelo in self.tablas_catalogo]
+
+    def _validadores_catalogo(self, request):
+        versiones = self._versiones_catalogo()
+        # La ruta con sus parámetros y el modo de paginación cambian el contenido
+        partes = [request.get_full_path(), request.headers.get('X-Paginacion', '')]
+        partes.extend(str(v) for v in versiones)
+        etag = 'W/"%s"' % hashlib.md5('|'.join(partes).encode()).hexdigest()
+        return etag, max(versiones) // 1000
+
+    def _respuesta_condicional(self, accion, request, *args, **kwargs):
+        if not cache_compartida():
+            return accion(request, *args, **kwargs)
+        etag, ultima_modificacion = self._validadores_catalogo(request)
+        response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        if response is None:
+            response = accion(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(ultima_modificacion)
+
+        max_age = getattr(settings, 'CATALOGO_MAX_AGE', 0)
+        if max_age:
+            patch_cache_control(response, private=True, max_age=max_age)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization', 'X-Paginacion'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_condicional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_condicional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,218 @@
+"""
+Caché de respuestas versionada para los endpoints del panel de administración.
+
+Las claves se arman con el endpoint, los parámetros de filtro, el rol del
+usuario y la versión de cada dominio de datos del que depende la respuesta
+(asistencia, catalogo, calendario). Las señales de los modelos incrementan
+la versión del dominio, así que una respuesta vieja nunca se vuelve a servir.
+
+Funciona con la caché en memoria local y con un backend compartido (Redis):
+solo usa get/set/add/delete/incr, y cache.add como candado para que una sola
+petición recalcule una respuesta expirada (single-flight).
+
+La memoria local solo sirve con un único proceso: cada worker, y cada comando
+programado (cerrar_sesiones, programar_sesiones...), tendría sus propias
+versiones y las invalidaciones de uno no llegarían a los demás. Con más de un
+worker (WEB_CONCURRENCY > 1) hay que configurar REDIS_URL; al arrancar se
+rechaza la combinación (verificar_cache_compartida) y `check --deploy`
+advierte si la caché no es compartida.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.response import Response
+
+from .principal import obtener_principal
+from .replicas import leer_de_principal, retraso_maximo
+
+DOMINIOS = ('asistencia', 'catalogo', 'calendario')
+
+TIMEOUT_RESPUESTA = 60 * 10  # 10 minutos
+TIMEOUT_BLOQUEO = 30  # segundos que se reserva el cálculo de una respuesta
+ESPERA_MAXIMA = 5  # segundos que otra petición espera el resultado ajeno
+INTERVALO_ESPERA = 0.05
+
+# Endpoints registrados con @cachear_respuesta, para las estadísticas
+_endpoints = set()
+
+
+def _marca_tiempo():
+    return int(time.time() * 1000)
+
+
+# ----------------------------------------------------------------------
+# Versiones por dominio
+# ----------------------------------------------------------------------
+def _clave_version(nombre):
+    return f'version:{nombre}'
+
+
+def obtener_version(nombre):
+    """
+    Retorna la versión actual de un dominio. Si no existe (caché vacía o
+    reiniciada) se inicializa con la hora actual en milisegundos, de modo que
+    nunca coincide con una versión anterior.
+    """
+    clave = _clave_version(nombre)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _marca_tiempo(), None)
+        version = cache.get(clave)
+    return version
+
+
+def incrementar_version(nombre):
+    """Invalida todas las respuestas que dependen del dominio."""
+    clave = _clave_version(nombre)
+    nueva = max(_marca_tiempo(), (cache.get(clave) or 0) + 1)
+    cache.set(clave, nueva, None)
+    return nueva
+
+
+# Backends cuya memoria es propia de cada proceso
+CACHES_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_compartida():
+    """True si todos los procesos ven la misma caché (Redis, Memcached, base de datos o archivos)."""
+    return settings.CACHES['default']['BACKEND'] not in CACHES_LOCALES
+
+
+def verificar_cache_compartida():
+    """Se llama al arrancar (apps.py): varios workers con memoria local sirven respuestas viejas."""
+    procesos = getattr(settings, 'WEB_CONCURRENCY', 1)
+    if procesos > 1 and not cache_compartida():
+        raise ImproperlyConfigured(
+            f'WEB_CONCURRENCY={procesos} requiere una caché compartida entre procesos: configure REDIS_URL.'
+        )
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def revisar_cache_compartida(app_configs, **kwargs):
+    if cache_compartida():
+        return []
+    return [checks.Warning(
+        'La caché es local a cada proceso: los comandos programados y los demás workers no '
+        'invalidan las respuestas en caché de este proceso.',
+        hint='Configure REDIS_URL en producción.',
+        id='gestion_academica.W001',
+    )]
+
+
+def nombre_tabla(modelo):
+    """Nombre de la versión por tabla de un modelo (usada por los ETag de catálogos)."""
+    return f'tabla:{modelo._meta.label_lower}'
+
+
+# ----------------------------------------------------------------------
+# Estadísticas
+# ----------------------------------------------------------------------
+def _contar(endpoint, tipo):
+    clave = f'estadisticas_cache:{endpoint}:{tipo}'
+    if not cache.add(clave, 1, None):
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # La clave expiró entre add e incr
+            cache.add(clave, 1, None)
+
+
+def estadisticas():
+    """Retorna aciertos, fallos y esperas por endpoint."""
+    resultado = {}
+    for endpoint in sorted(_endpoints):
+        claves = {tipo: f'estadisticas_cache:{endpoint}:{tipo}' for tipo in ('aciertos', 'fallos', 'esperas')}
+        valores = cache.get_many(list(claves.values()))
+        datos = {tipo: valores.get(clave, 0) for tipo, clave in claves.items()}
+        total = datos['aciertos'] + datos['fallos']
+        datos['tasa_aciertos'] = round(datos['aciertos'] / total * 100, 2) if total else 0
+        resultado[endpoint] = datos
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# Decorador
+# ----------------------------------------------------------------------
+def _clave_respuesta(endpoint, request, versiones, por_usuario):
+    parametros = '&'.join(
+        f'{k}={v}' for k, v in sorted(request.query_params.lists())
+    )
+    # Todos los roles: un administrador que también es docente ve otras respuestas
+    partes = [endpoint, '+'.join(sorted(obtener_principal(request).perfiles)) or 'anonimo']
+    if por_usuario:
+        partes.append(str(request.user.pk))
+    partes.append(hashlib.md5(parametros.encode()).hexdigest())
+    partes.append(':'.join(map(str, versiones)))
+    return 'respuesta:' + ':'.join(partes)
+
+
+def cachear_respuesta(endpoint, dominios, por_usuario=False, timeout=TIMEOUT_RESPUESTA):
+    """
+    Cachea el `data` de las respuestas 200 de una vista DRF (función con
+    @api_view o acción de un ViewSet). Se coloca debajo de @api_view / @action
+    para que los permisos se revisen antes de consultar la caché.
+
+    endpoint: nombre estable para la clave y las estadísticas.
+    dominios: dominios de datos de los que depende la respuesta.
+    por_usuario: incluir el id del usuario en la clave (datos personales).
+    """
+    for dominio in dominios:
+        if dominio not in DOMINIOS:
+            raise ValueError(f'Dominio de caché desconocido: {dominio}')
+    _endpoints.add(endpoint)
+
+    def decorador(func):
+        @wraps(func)
+        def envoltura(*args, **kwargs):
+            # En una acción de ViewSet el primer argumento es self
+            request = args[0] if hasattr(args[0], 'query_params') else args[1]
+            versiones = [obtener_version(d) for d in dominios]
+            clave = _clave_respuesta(endpoint, request, versiones, por_usuario)
+
+            datos = cache.get(clave)
+            if datos is not None:
+                _contar(endpoint, 'aciertos')
+                return Response(datos, headers={'X-Cache': 'HIT'})
+
+            clave_bloqueo = f'{clave}:bloqueo'
+            propietario = cache.add(clave_bloqueo, 1, TIMEOUT_BLOQUEO)
+            if not propietario:
+                # Otra petición ya está calculando esta respuesta: esperar su resultado
+                _contar(endpoint, 'esperas')
+                limite = time.monotonic() + ESPERA_MAXIMA
+                while time.monotonic() < limite:
+                    time.sleep(INTERVALO_ESPERA)
+                    datos = cache.get(clave)
+                    if datos is not None:
+                        _contar(endpoint, 'aciertos')
+                        return Response(datos, headers={'X-Cache': 'HIT'})
+                    if cache.get(clave_bloqueo) is None:
+                        break
+
+            _contar(endpoint, 'fallos')
+            try:
+                # Las versiones son la hora de la última escritura (ms): si alguna es
+                # más reciente que el retraso de la réplica, esta quizá no la tiene
+                # y se calcula con la principal; si no, la vista puede usar la réplica
+                if _marca_tiempo() - max(versiones) < retraso_maximo() * 1000:
+                    with leer_de_principal():
+                        response = func(*args, **kwargs)
+                else:
+                    response = func(*args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(clave, response.data, timeout)
+                    response['X-Cache'] = 'MISS'
+            finally:
+                if propietario:
+                    cache.delete(clave_bloqueo)
+            return response
+        return envoltura
+    return decorador
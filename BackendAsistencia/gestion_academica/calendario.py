@@ -0,0 +1,180 @@
+"""
+Calendario de sesiones planificadas de una gestión.
+
+`generar_calendario` expande el horario semanal de cada MateriaSemestre de la
+gestión sobre su rango de fechas (CalendarioGestion), sin los días especiales
+que afectan la asistencia, y crea las SesionClase que faltan con
+origen='PLANIFICADA' mediante bulk_create por lotes. Volver a generarlo solo
+inserta lo que falta y elimina las planificadas que ya no corresponden (rango
+o día de la semana cambiados).
+
+Una sesión planificada no cuenta como clase realizada (SesionClase.objects
+.realizadas()) hasta que el docente o el programador la abren. Los cambios de
+DiaEspecial se aplican solo a la fecha afectada (ver signals.py).
+"""
+from datetime import timedelta
+
+from django.db import router, transaction
+
+from .cache_respuestas import incrementar_version
+from .contadores import recalcular_contadores
+from .matriz_asistencia import invalidar_matriz
+from .models import CalendarioGestion, DiaEspecial, MateriaSemestre, PermisoAsistencia, SesionClase
+
+TAMANO_LOTE = 1000
+
+
+class ErrorCalendario(Exception):
+    pass
+
+
+def fechas_del_dia(dia_semana_num, fecha_inicio, fecha_fin, excluidas=()):
+    """Fechas del rango [fecha_inicio, fecha_fin] que caen en el día de la semana, sin las excluidas."""
+    fecha = fecha_inicio + timedelta(days=(dia_semana_num - fecha_inicio.weekday()) % 7)
+    while fecha <= fecha_fin:
+        if fecha not in excluidas:
+            yield fecha
+        fecha += timedelta(days=7)
+
+
+def _invalidar(materia_semestre_ids):
+    # bulk_create y _raw_delete no emiten señales
+    incrementar_version('asistencia')
+    for materia_semestre_id in materia_semestre_ids:
+        invalidar_matriz(materia_semestre_id)
+
+
+def generar_calendario(gestion, fecha_inicio=None, fecha_fin=None, tamano_lote=TAMANO_LOTE):
+    """
+    Guarda el rango de la gestión (si se indica) y sincroniza sus sesiones
+    planificadas. Retorna (creadas, eliminadas).
+    """
+    if fecha_inicio is not None and fecha_fin is not None:
+        if fecha_inicio > fecha_fin:
+            raise ErrorCalendario('La fecha de inicio debe ser anterior a la fecha de fin.')
+        calendario, _ = CalendarioGestion.objects.update_or_create(
+            gestion=gestion, defaults={'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}
+        )
+    else:
+        calendario = CalendarioGestion.objects.filter(gestion=gestion).first()
+        if calendario is None:
+            raise ErrorCalendario(f'La gestión {gestion!r} no tiene rango de fechas (indique inicio y fin)')
+
+    materias = list(
+        MateriaSemestre.objects.filter(gestion=gestion, dia_semana_num__isnull=False)
+        .only('id', 'dia_semana_num', 'hora_inicio', 'hora_fin')
+    )
+    if not materias:
+        raise ErrorCalendario(f'No hay materias con horario en la gestión {gestion!r}')
+
+    excluidas = set(DiaEspecial.get_dias_especiales_rango(calendario.fecha_inicio, calendario.fecha_fin))
+    esperadas = {
+        (ms.id, fecha)
+        for ms in materias
+        for fecha in fechas_del_dia(ms.dia_semana_num, calendario.fecha_inicio, calendario.fecha_fin, excluidas)
+    }
+
+    # Una consulta para todo lo existente de la gestión (realizadas y planificadas)
+    existentes = {}
+    for sesion_id, materia_semestre_id, fecha, origen in SesionClase.objects.filter(
+        materia_semestre__gestion=gestion
+    ).values_list('id', 'materia_semestre_id', 'fecha', 'origen'):
+        existentes[(materia_semestre_id, fecha)] = (sesion_id, origen)
+
+    horarios = {ms.id: ms for ms in materias}
+    nuevas = [
+        SesionClase(
+            materia_semestre_id=materia_semestre_id,
+            fecha=fecha,
+            hora_inicio=horarios[materia_semestre_id].hora_inicio,
+            hora_fin=horarios[materia_semestre_id].hora_fin,
+            origen='PLANIFICADA',
+        )
+        for materia_semestre_id, fecha in sorted(esperadas - existentes.keys())
+    ]
+    # Planificadas que ya no corresponden; las realizadas nunca se tocan
+    sobrantes = [
+        sesion_id
+        for clave, (sesion_id, origen) in existentes.items()
+        if origen == 'PLANIFICADA' and clave not in esperadas
+    ]
+
+    for i in range(0, len(nuevas), tamano_lote):
+        with transaction.atomic():
+            SesionClase.objects.bulk_create(nuevas[i:i + tamano_lote], ignore_conflicts=True)
+    if nuevas:
+        # bulk_create no emite post_save: el tamaño del plantel se fija aquí
+        recalcular_contadores(SesionClase.objects.planificadas().filter(materia_semestre__gestion=gestion))
+    eliminadas, materias_eliminadas = _eliminar_planificadas(SesionClase.objects.filter(pk__in=sobrantes), tamano_lote)
+
+    if nuevas or eliminadas:
+        _invalidar(set(horarios) | materias_eliminadas)
+    return len(nuevas), eliminadas
+
+
+def _eliminar_planificadas(queryset, tamano_lote=TAMANO_LOTE):
+    """
+    Elimina por lotes sesiones planificadas sin registros de asistencia (un
+    permiso que las cubría deja de cubrirlas). Retorna (cantidad eliminada,
+    ids de sus MateriaSemestre); el llamador invalida las cachés una sola vez.
+    """
+    queryset = queryset.planificadas().filter(registros_sesion__isnull=True)
+    cubiertas = PermisoAsistencia.sesiones_cubiertas.through.objects
+    alias = router.db_for_write(SesionClase)
+    eliminadas = 0
+    materias = set()
+    while True:
+        filas = list(queryset.values_list('id', 'materia_semestre_id')[:tamano_lote])
+        if not filas:
+            return eliminadas, materias
+        ids = [sesion_id for sesion_id, _ in filas]
+        with transaction.atomic():
+            # Borrado directo, sin una señal por sesión; sin registros, lo único
+            # que apunta a una sesión planificada es sesiones_cubiertas
+            cubiertas.filter(sesionclase_id__in=ids)._raw_delete(alias)
+            SesionClase.objects.filter(pk__in=ids)._raw_delete(alias)
+        eliminadas += len(ids)
+        materias.update(materia_semestre_id for _, materia_semestre_id in filas)
+
+
+# ----------------------------------------------------------------------
+# Sincronización incremental con DiaEspecial
+# ----------------------------------------------------------------------
+def quitar_fecha(fecha):
+    """Un día especial nuevo: se quitan las sesiones planificadas de esa fecha."""
+    eliminadas, materias = _eliminar_planificadas(SesionClase.objects.filter(fecha=fecha))
+    if eliminadas:
+        _invalidar(materias)
+    return eliminadas
+
+
+def restaurar_fecha(fecha):
+    """
+    Una fecha deja de ser especial: se vuelven a planificar las sesiones de
+    las gestiones cuyo calendario la incluye. Retorna la cantidad creada.
+    """
+    if DiaEspecial.es_dia_especial(fecha):
+        return 0
+    gestiones = CalendarioGestion.objects.filter(
+        fecha_inicio__lte=fecha, fecha_fin__gte=fecha
+    ).values_list('gestion', flat=True)
+    materias = list(
+        MateriaSemestre.objects.filter(gestion__in=gestiones, dia_semana_num=fecha.weekday())
+        .exclude(sesiones_clase__fecha=fecha)
+        .only('id', 'hora_inicio', 'hora_fin')
+    )
+    if not materias:
+        return 0
+    SesionClase.objects.bulk_create([
+        SesionClase(
+            materia_semestre_id=ms.id,
+            fecha=fecha,
+            hora_inicio=ms.hora_inicio,
+            hora_fin=ms.hora_fin,
+            origen='PLANIFICADA',
+        )
+        for ms in materias
+    ], ignore_conflicts=True)
+    recalcular_contadores(SesionClase.objects.filter(materia_semestre__in=materias, fecha=fecha))
+    _invalidar([ms.id for ms in materias])
+    return len(materias)
@@ -0,0 +1,159 @@
+"""
+Cierre de las sesiones de clase al llegar su hora de fin.
+
+Un estudiante que no escaneó el QR no tiene RegistroAsistencia, así que cada
+lista de asistencia tenía que cruzar el plantel con los registros e inferir
+"Falta" al leer. `manage.py cerrar_sesiones` recorre las sesiones realizadas
+que ya terminaron y, en una pasada por lote:
+
+- inserta con un solo bulk_create(ignore_conflicts=True) el registro de cada
+  estudiante del plantel (ver planteles.py) que no tiene uno: FALTA, o
+  FALTA_JUSTIFICADA con su permiso si un PermisoAsistencia APROBADO cubre la
+  sesión (sesiones_cubiertas);
+- justifica las FALTA ya existentes que un permiso aprobado cubre;
+- marca las sesiones como cerradas y recalcula sus contadores (contadores.py).
+
+Los registros insertados llevan materializado=True: su fecha_registro es la
+del cierre, no la de un escaneo. Una sesión cerrada se lee con una sola
+consulta sobre registro_sesion_estado_idx (ver asistencia_de_sesion).
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+
+from .cache_respuestas import incrementar_version
+from .contadores import recalcular_contadores
+from .matriz_asistencia import invalidar_matriz
+from .models import PermisoAsistencia, RegistroAsistencia, SesionClase
+from .particiones import insertar_registros
+from .planteles import ORDEN_ESTUDIANTES, cargar_planteles
+
+TAMANO_LOTE = 200  # sesiones por transacción
+
+
+def sesiones_por_cerrar(momento):
+    """Sesiones realizadas, aún abiertas, cuya hora de fin ya pasó en `momento` (datetime local)."""
+    fecha, hora = momento.date(), momento.time()
+    return SesionClase.objects.realizadas().filter(cerrada=False).filter(
+        Q(fecha__lt=fecha) | Q(fecha=fecha, hora_fin__lte=hora)
+    )
+
+
+def _coberturas(sesion_ids):
+    """{(sesion_id, estudiante_id): permiso_id} de los permisos aprobados que cubren las sesiones."""
+    cubiertas = PermisoAsistencia.sesiones_cubiertas.through.objects.filter(
+        sesionclase_id__in=sesion_ids, permisoasistencia__estado='APROBADO'
+    ).values_list('sesionclase_id', 'permisoasistencia__estudiante_id', 'permisoasistencia_id')
+    return {(sesion_id, estudiante_id): permiso_id for sesion_id, estudiante_id, permiso_id in cubiertas}
+
+
+def _permisos_aprobados():
+    """Filas de sesiones_cubiertas de permisos aprobados del registro exterior (OuterRef)."""
+    return PermisoAsistencia.sesiones_cubiertas.through.objects.filter(
+        sesionclase_id=OuterRef('sesion_id'),
+        permisoasistencia__estudiante_id=OuterRef('estudiante_id'),
+        permisoasistencia__estado='APROBADO',
+    ).order_by('permisoasistencia_id')
+
+
+def _cerrar_lote(sesiones):
+    sesion_ids = [sesion.id for sesion in sesiones]
+    planteles = cargar_planteles({sesion.materia_semestre for sesion in sesiones})
+    existentes = {
+        (sesion_id, estudiante_id): estado
+        for sesion_id, estudiante_id, estado in RegistroAsistencia.objects.filter(
+            sesion_id__in=sesion_ids
+        ).values_list('sesion_id', 'estudiante_id', 'estado')
+    }
+    coberturas = _coberturas(sesion_ids)
+
+    # Ausentes del plantel y, por si cambió el plantel, estudiantes con permiso aprobado
+    ausentes = {
+        (sesion.id, estudiante['id'])
+        for sesion in sesiones
+        for estudiante in planteles[sesion.materia_semestre_id]
+    } | coberturas.keys()
+    nuevos = [
+        RegistroAsistencia(
+            sesion_id=sesion_id,
+            estudiante_id=estudiante_id,
+            estado='FALTA_JUSTIFICADA' if (sesion_id, estudiante_id) in coberturas else 'FALTA',
+            permiso_asistencia_id=coberturas.get((sesion_id, estudiante_id)),
+            materializado=True,
+        )
+        for sesion_id, estudiante_id in sorted(ausentes - existentes.keys())
+    ]
+    with transaction.atomic():
+        # ignore_conflicts: un escaneo tardío pudo insertar el mismo registro
+        insertar_registros(nuevos)
+        # FALTA anteriores al permiso (registradas a mano o de un cierre previo),
+        # en un solo UPDATE con el permiso que cubre cada (sesión, estudiante)
+        cubiertas = _permisos_aprobados()
+        justificadas = RegistroAsistencia.objects.filter(
+            Exists(cubiertas), sesion_id__in=sesion_ids, estado='FALTA'
+        ).update(
+            estado='FALTA_JUSTIFICADA',
+            permiso_asistencia_id=Subquery(cubiertas.values('permisoasistencia_id')[:1]),
+        )
+        cerradas = SesionClase.objects.filter(pk__in=sesion_ids)
+        cerradas.update(cerrada=True)
+        recalcular_contadores(cerradas)
+
+    faltas = sum(registro.estado == 'FALTA' for registro in nuevos)
+    return faltas, len(nuevos) - faltas + justificadas
+
+
+def cerrar_sesiones(momento, tamano_lote=TAMANO_LOTE):
+    """
+    Cierra las sesiones que terminaron hasta `momento`. Retorna
+    (sesiones, faltas, justificadas) con las cantidades procesadas.
+    """
+    cerradas = faltas = justificadas = 0
+    materia_semestre_ids = set()
+    pendientes = sesiones_por_cerrar(momento).select_related('materia_semestre__semestre').order_by('id')
+    while True:
+        # Cada lote queda cerrado, así que la misma consulta trae el siguiente
+        sesiones = list(pendientes[:tamano_lote])
+        if not sesiones:
+            break
+        lote_faltas, lote_justificadas = _cerrar_lote(sesiones)
+        cerradas += len(sesiones)
+        faltas += lote_faltas
+        justificadas += lote_justificadas
+        materia_semestre_ids.update(sesion.materia_semestre_id for sesion in sesiones)
+
+    # bulk_create y update no emiten post_save: se invalida aquí lo que harían las señales
+    if cerradas:
+        incrementar_version('asistencia')
+        for materia_semestre_id in materia_semestre_ids:
+            invalidar_matriz(materia_semestre_id)
+    return cerradas, faltas, justificadas
+
+
+def asistencia_de_sesion(sesion):
+    """
+    Lista de asistencia de una sesión: [(estudiante, registro o None), ...]
+    con cada estudiante como diccionario de planteles.CAMPOS_ESTUDIANTE.
+
+    Una sesión cerrada ya tiene un registro por estudiante y se lee con una
+    consulta; una abierta cruza su plantel con sus registros (dos consultas).
+    """
+    registros = RegistroAsistencia.objects.filter(sesion=sesion).select_related('estudiante__usuario')
+    if sesion.cerrada:
+        # Mismo orden que el plantel (no el -fecha_registro del modelo)
+        registros = registros.order_by(*(f'estudiante__{campo}' for campo in ORDEN_ESTUDIANTES))
+        return [
+            (
+                {
+                    'id': registro.estudiante_id,
+                    'codigo_institucional': registro.estudiante.codigo_institucional,
+                    'usuario__nombre': registro.estudiante.usuario.nombre,
+                    'usuario__apellido': registro.estudiante.usuario.apellido,
+                },
+                registro,
+            )
+            for registro in registros
+        ]
+
+    por_estudiante = {registro.estudiante_id: registro for registro in registros.select_related(None)}
+    plantel = cargar_planteles([sesion.materia_semestre])[sesion.materia_semestre_id]
+    return [(estudiante, por_estudiante.get(estudiante['id'])) for estudiante in plantel]
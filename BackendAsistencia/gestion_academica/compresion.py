@@ -0,0 +1,205 @@
+"""
+Compresión negociada (brotli o gzip) de las respuestas.
+
+- Respeta Accept-Encoding; brotli solo si el paquete `brotli` está instalado.
+- Las respuestas normales se comprimen a partir de COMPRESION_MIN_BYTES.
+- Las respuestas en streaming se comprimen trozo a trozo, sin acumularlas.
+- No se tocan las respuestas que ya traen Content-Encoding ni los tipos que ya
+  vienen comprimidos (PDF, imágenes, zip).
+- BREACH: las rutas que devuelven secretos en el cuerpo (tokens, CSRF) no se
+  comprimen. Con credenciales (Authorization o cookie de sesión) solo se usa
+  gzip, con hasta MAX_BYTES_ALEATORIOS de relleno aleatorio como
+  GZipMiddleware de Django; brotli no admite ese relleno.
+- Con COMPRESION_ESTADISTICAS se acumulan por ruta los bytes originales y
+  comprimidos en la caché (ver estadisticas()); cuesta tres escrituras por
+  respuesta y solo reúne a todos los workers con una caché compartida.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+MIN_BYTES = 1024
+MAX_BYTES_ALEATORIOS = 100
+CALIDAD_BROTLI = 5  # compromiso entre tamaño y CPU para respuestas dinámicas
+TIPOS_EXCLUIDOS = ('application/pdf', 'application/zip', 'application/gzip', 'image/', 'video/', 'audio/')
+
+# Vistas cuyo cuerpo lleva un secreto (access/refresh token, token CSRF)
+RUTAS_CON_SECRETOS = frozenset({'login', 'token_refresh', 'csrf_token', 'get-csrf-token'})
+
+_re_codificacion = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def _aceptadas(request):
+    """Codificaciones aceptadas por el cliente (q > 0)."""
+    aceptadas = set()
+    for parte in request.headers.get('Accept-Encoding', '').split(','):
+        coincidencia = _re_codificacion.match(parte)
+        if not coincidencia:
+            continue
+        codificacion, calidad = coincidencia.groups()
+        try:
+            if calidad is not None and float(calidad) <= 0:
+                continue
+        except ValueError:
+            continue
+        aceptadas.add(codificacion.lower())
+    return aceptadas
+
+
+def _con_credenciales(request):
+    return 'Authorization' in request.headers or settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def _negociar(request):
+    aceptadas = _aceptadas(request)
+    if brotli is not None and ('br' in aceptadas or '*' in aceptadas) and not _con_credenciales(request):
+        return 'br'
+    if 'gzip' in aceptadas or '*' in aceptadas:
+        return 'gzip'
+    return None
+
+
+def _secuencia_brotli(secuencia):
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    for trozo in secuencia:
+        datos = compresor.process(trozo)
+        if datos:
+            yield datos
+        # Se vacía el compresor en cada trozo para no retener la exportación en memoria
+        datos = compresor.flush()
+        if datos:
+            yield datos
+    yield compresor.finish()
+
+
+# ----------------------------------------------------------------------
+# Estadísticas
+# ----------------------------------------------------------------------
+def _ruta(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is not None and resolver_match.view_name:
+        return resolver_match.view_name
+    return request.path
+
+
+def _sumar(clave, cantidad):
+    if not cache.add(clave, cantidad, None):
+        try:
+            cache.incr(clave, cantidad)
+        except ValueError:
+            cache.add(clave, cantidad, None)
+
+
+def _registrar(ruta, original, comprimido):
+    if not getattr(settings, 'COMPRESION_ESTADISTICAS', False):
+        return
+    if cache.add(f'compresion:{ruta}:respuestas', 1, None):
+        # Primera respuesta de la ruta (en cualquier worker): se anota en la lista de rutas
+        cache.add('compresion:rutas', 0, None)
+        cache.set(f'compresion:ruta:{cache.incr("compresion:rutas")}', ruta, None)
+    else:
+        _sumar(f'compresion:{ruta}:respuestas', 1)
+    _sumar(f'compresion:{ruta}:bytes_originales', original)
+    _sumar(f'compresion:{ruta}:bytes_comprimidos', comprimido)
+
+
+def estadisticas():
+    """Retorna respuestas comprimidas y bytes ahorrados por ruta."""
+    total = cache.get('compresion:rutas', 0)
+    rutas = cache.get_many([f'compresion:ruta:{i}' for i in range(1, total + 1)]).values()
+    resultado = {}
+    for ruta in sorted(set(rutas)):
+        claves = {campo: f'compresion:{ruta}:{campo}' for campo in ('respuestas', 'bytes_originales', 'bytes_comprimidos')}
+        valores = cache.get_many(list(claves.values()))
+        datos = {campo: valores.get(clave, 0) for campo, clave in claves.items()}
+        datos['bytes_ahorrados'] = datos['bytes_originales'] - datos['bytes_comprimidos']
+        datos['porcentaje_ahorro'] = (
+            round(datos['bytes_ahorrados'] / datos['bytes_originales'] * 100, 2) if datos['bytes_originales'] else 0
+        )
+        resultado[ruta] = datos
+    return resultado
+
+
+def _contar_streaming(secuencia, ruta, conteo):
+    """Cuenta los bytes que salen del compresor y registra al terminar el streaming."""
+    try:
+        for trozo in secuencia:
+            conteo['comprimido'] += len(trozo)
+            yield trozo
+    finally:
+        _registrar(ruta, conteo['original'], conteo['comprimido'])
+
+
+def _contar_original(secuencia, conteo):
+    for trozo in secuencia:
+        conteo['original'] += len(trozo)
+        yield trozo
+
+
+# ----------------------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------------------
+class CompresionMiddleware(MiddlewareMixin):
+    """
+    Debe ir después de SecurityMiddleware y antes de cualquier middleware que lea
+    o modifique el cuerpo de la respuesta.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        tipo = response.get('Content-Type', '').lower()
+        if tipo.startswith(TIPOS_EXCLUIDOS):
+            return response
+        if response.streaming and response.is_async:
+            return response
+        min_bytes = getattr(settings, 'COMPRESION_MIN_BYTES', MIN_BYTES)
+        if not response.streaming and len(response.content) < min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = _negociar(request)
+        if codificacion is None:
+            return response
+
+        ruta = _ruta(request)
+        if ruta in RUTAS_CON_SECRETOS:
+            return response
+        if response.streaming:
+            conteo = {'original': 0, 'comprimido': 0}
+            secuencia = _contar_original(response.streaming_content, conteo)
+            if codificacion == 'br':
+                comprimida = _secuencia_brotli(secuencia)
+            else:
+                comprimida = compress_sequence(secuencia, max_random_bytes=MAX_BYTES_ALEATORIOS)
+            response.streaming_content = _contar_streaming(comprimida, ruta, conteo)
+            # La longitud final no se conoce hasta terminar
+            del response.headers['Content-Length']
+        else:
+            original = len(response.content)
+            if codificacion == 'br':
+                comprimido = brotli.compress(response.content, quality=CALIDAD_BROTLI)
+            else:
+                comprimido = compress_string(response.content, max_random_bytes=MAX_BYTES_ALEATORIOS)
+            if len(comprimido) >= original:
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+            _registrar(ruta, original, len(comprimido))
+
+        # El cuerpo cambia, así que un ETag fuerte deja de ser válido
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,81 @@
+"""
+Contadores de asistencia guardados en cada SesionClase.
+
+La lista de sesiones muestra "32/40 presentes" sin consultar los registros:
+SesionClase guarda presentes, retrasos, faltas, faltas_justificadas y
+total_estudiantes (tamaño del plantel; en una sesión cerrada, la cantidad de
+registros).
+
+- Cada RegistroAsistencia que se crea, cambia de estado o se elimina ajusta
+  los contadores con un UPDATE atómico (F() + 1 / F() - 1, ver signals.py).
+- Las escrituras en bloque (cierre de sesiones, programador) no emiten
+  señales y llaman a recalcular_contadores sobre las sesiones afectadas.
+- `manage.py recalcular_contadores_sesion` reconstruye (o solo verifica)
+  todos los contadores con un único UPDATE con subconsultas agrupadas.
+"""
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import RegistroAsistencia, SesionClase
+from .planteles import conteo_plantel
+
+CAMPO_POR_ESTADO = {
+    'PRESENTE': 'presentes',
+    'RETRASO': 'retrasos',
+    'FALTA': 'faltas',
+    'FALTA_JUSTIFICADA': 'faltas_justificadas',
+}
+CAMPOS_CONTADORES = (*CAMPO_POR_ESTADO.values(), 'total_estudiantes')
+
+
+def ajustar_contadores(sesion_id, estado_anterior=None, estado_nuevo=None):
+    """Mueve un registro de `estado_anterior` a `estado_nuevo` (None: no existía / ya no existe)."""
+    if estado_anterior == estado_nuevo:
+        return
+    cambios = {}
+    if estado_anterior in CAMPO_POR_ESTADO:
+        campo = CAMPO_POR_ESTADO[estado_anterior]
+        # Sin bajar de cero si el contador se desfasó (registros escritos en bloque)
+        cambios[campo] = Greatest(F(campo) - 1, 0)
+    if estado_nuevo in CAMPO_POR_ESTADO:
+        campo = CAMPO_POR_ESTADO[estado_nuevo]
+        cambios[campo] = F(campo) + 1
+    if cambios:
+        SesionClase.objects.filter(pk=sesion_id).update(**cambios)
+
+
+def _conteo_registros(estado=None):
+    registros = RegistroAsistencia.objects.filter(sesion_id=OuterRef('pk'))
+    if estado is not None:
+        registros = registros.filter(estado=estado)
+    conteo = registros.order_by().values('sesion_id').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(conteo), 0)
+
+
+def expresiones_contadores():
+    """{campo: expresión} con el valor correcto de cada contador, calculado en la base."""
+    expresiones = {campo: _conteo_registros(estado) for estado, campo in CAMPO_POR_ESTADO.items()}
+    # Una sesión cerrada tiene un registro por estudiante del plantel (ver cierre.py)
+    expresiones['total_estudiantes'] = Case(
+        When(cerrada=True, then=_conteo_registros()),
+        default=conteo_plantel(),
+    )
+    return expresiones
+
+
+def recalcular_contadores(sesiones=None):
+    """Reconstruye los contadores de `sesiones` (queryset; todas por defecto) en un UPDATE. Retorna las filas actualizadas."""
+    if sesiones is None:
+        sesiones = SesionClase.objects.all()
+    return sesiones.update(**expresiones_contadores())
+
+
+def sesiones_desincronizadas(sesiones=None):
+    """Sesiones cuyos contadores guardados no coinciden con los registros."""
+    if sesiones is None:
+        sesiones = SesionClase.objects.all()
+    calculados = {f'{campo}_calculado': expresion for campo, expresion in expresiones_contadores().items()}
+    distinto = Q()
+    for campo in CAMPOS_CONTADORES:
+        distinto |= ~Q(**{campo: F(f'{campo}_calculado')})
+    return sesiones.annotate(**calculados).filter(distinto)
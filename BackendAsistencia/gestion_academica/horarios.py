@@ -0,0 +1,143 @@
+"""
+Índice en memoria del horario semanal de las MateriaSemestre.
+
+Para cada día (0 = lunes ... 6 = domingo) guarda:
+- los cortes ordenados del día (todas las horas de inicio y fin) y, para cada
+  tramo entre dos cortes, el conjunto de materias que están en clase; así
+  "qué materias están en clase ahora" es una búsqueda binaria;
+- las horas de inicio ordenadas, para "qué materias empiezan en los próximos
+  N minutos" (búsqueda binaria más las k materias encontradas).
+
+El índice se construye con una consulta y se reconstruye solo cuando cambia
+la huella del horario: una consulta agregada sobre las MateriaSemestre
+vigentes (las de gestiones archivadas no forman parte del horario). La huella
+sale de la base de datos y no de la caché, que puede ser local a cada proceso:
+así un cambio hecho por otro worker, por el admin o por `archivar_gestion`
+llega también al programador (`programar_sesiones --bucle`).
+"""
+from bisect import bisect_right
+
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMinute
+
+from .models import GestionArchivada, MateriaSemestre
+
+SEGUNDOS_DIA = 24 * 60 * 60
+ANTICIPACION_MINUTOS = 15  # Una sesión puede iniciarse 15 minutos antes de la hora
+
+
+def _segundos(hora):
+    return hora.hour * 3600 + hora.minute * 60 + hora.second
+
+
+class IndiceHorario:
+
+    def __init__(self, filas):
+        """`filas`: iterable de (materia_semestre_id, dia_semana_num, hora_inicio, hora_fin)."""
+        self._por_id = {}
+        por_dia = {}
+        for materia_semestre_id, dia, hora_inicio, hora_fin in filas:
+            if dia is None:
+                continue
+            intervalo = (_segundos(hora_inicio), _segundos(hora_fin), materia_semestre_id)
+            self._por_id[materia_semestre_id] = (dia, intervalo[0], intervalo[1])
+            por_dia.setdefault(dia, []).append(intervalo)
+
+        self._cortes = {}
+        self._tramos = {}
+        self._inicios = {}
+        self._inicio_ids = {}
+        for dia, intervalos in por_dia.items():
+            intervalos.sort()
+            cortes = sorted({s for inicio, fin, _ in intervalos for s in (inicio, fin)})
+            self._cortes[dia] = cortes
+            # Tramo i = [cortes[i], cortes[i + 1]): materias con inicio <= corte < fin
+            self._tramos[dia] = [
+                frozenset(ms_id for inicio, fin, ms_id in intervalos if inicio <= corte < fin)
+                for corte in cortes
+            ]
+            self._inicios[dia] = [inicio for inicio, _, _ in intervalos]
+            self._inicio_ids[dia] = [ms_id for _, _, ms_id in intervalos]
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def en_curso(self, momento):
+        """Ids de las materias en clase en `momento` (datetime local)."""
+        dia = momento.weekday()
+        cortes = self._cortes.get(dia)
+        if not cortes:
+            return frozenset()
+        i = bisect_right(cortes, _segundos(momento.time())) - 1
+        if i < 0:
+            return frozenset()
+        return self._tramos[dia][i]
+
+    def _que_empiezan(self, dia, desde, hasta):
+        """Ids con hora de inicio en (desde, hasta] del día."""
+        inicios = self._inicios.get(dia)
+        if not inicios:
+            return []
+        return self._inicio_ids[dia][bisect_right(inicios, desde):bisect_right(inicios, hasta)]
+
+    def proximas(self, momento, minutos=ANTICIPACION_MINUTOS):
+        """Ids de las materias que empiezan después de `momento` y dentro de `minutos`."""
+        dia = momento.weekday()
+        ahora = _segundos(momento.time())
+        hasta = ahora + minutos * 60
+        ids = self._que_empiezan(dia, ahora, min(hasta, SEGUNDOS_DIA - 1))
+        if hasta >= SEGUNDOS_DIA:
+            # La ventana cruza la medianoche
+            ids = ids + self._que_empiezan((dia + 1) % 7, -1, hasta - SEGUNDOS_DIA)
+        return ids
+
+    def del_dia(self, dia):
+        """Ids de todas las materias del día (0 = lunes ... 6 = domingo)."""
+        return list(self._inicio_ids.get(dia, []))
+
+    def en_horario(self, materia_semestre_id, momento, anticipacion=0):
+        """True si `momento` cae en el horario de la materia, admitiendo `anticipacion` minutos antes del inicio."""
+        horario = self._por_id.get(materia_semestre_id)
+        if horario is None:
+            return False
+        dia, inicio, fin = horario
+        return momento.weekday() == dia and inicio - anticipacion * 60 <= _segundos(momento.time()) < fin
+
+
+# (huella, índice) del proceso; se reemplaza completo al reconstruir
+_indice = (None, None)
+
+
+def _materias_vigentes():
+    return MateriaSemestre.objects.exclude(gestion__in=GestionArchivada.objects.values('gestion'))
+
+
+def _minutos(campo):
+    return ExtractHour(campo) * 60 + ExtractMinute(campo)
+
+
+def huella_horario():
+    """
+    (cantidad, id máximo, suma ponderada de día y horas) de las materias
+    vigentes, en una consulta: cambia con cualquier alta, baja o cambio de
+    horario, aunque se haga con update() o desde otro proceso.
+    """
+    horario = (Coalesce('dia_semana_num', 7) * 1440 + _minutos('hora_inicio')) * 1440 + _minutos('hora_fin')
+    huella = _materias_vigentes().order_by().aggregate(
+        cantidad=Count('id'),
+        ultimo=Max('id'),
+        suma=Sum((F('id') % 9973 + 1) * horario),
+    )
+    return huella['cantidad'], huella['ultimo'], huella['suma']
+
+
+def indice_horario():
+    """Índice del horario vigente; se reconstruye solo si cambió la huella del horario."""
+    global _indice
+    huella = huella_horario()
+    huella_actual, indice = _indice
+    if indice is None or huella != huella_actual:
+        filas = _materias_vigentes().values_list('id', 'dia_semana_num', 'hora_inicio', 'hora_fin')
+        indice = IndiceHorario(filas)
+        _indice = (huella, indice)
+    return indice
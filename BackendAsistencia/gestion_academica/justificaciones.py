@@ -0,0 +1,169 @@
+"""
+Justificación en bloque de las faltas cubiertas por un PermisoAsistencia.
+
+Al aprobar un permiso, `aprobar_permiso` hace en una transacción:
+- un UPDATE que pasa a FALTA_JUSTIFICADA (con permiso_asistencia) las FALTA
+  del estudiante en las sesiones cubiertas;
+- un bulk_create de las FALTA_JUSTIFICADA que faltan en las sesiones
+  cubiertas ya cerradas. Las sesiones aún abiertas se justifican al
+  cerrarlas (cierre.py), así un escaneo del estudiante no choca con el registro.
+
+Rechazar o eliminar el permiso (`revertir_permiso`) devuelve a FALTA, con un
+UPDATE, los registros que el permiso justificaba. Solo se tocan faltas: una
+asistencia registrada no se convierte en falta justificada, y por eso la
+reversión es exacta.
+
+Las sesiones cubiertas de un permiso con rango de fechas se resuelven en el
+servidor (`sesiones_del_rango`: las materias del estudiante por las fechas
+del rango, sin días especiales, en una consulta) y se escriben en la tabla
+intermedia con bulk_create (`asignar_sesiones`).
+
+Los UPDATE y bulk_create no emiten señales: los contadores de las sesiones,
+las matrices y la versión de la caché de asistencia se actualizan una sola
+vez por operación.
+"""
+from django.db import transaction
+
+from .cache_respuestas import incrementar_version
+from .contadores import recalcular_contadores
+from .matriz_asistencia import invalidar_matriz
+from .models import DiaEspecial, PermisoAsistencia, RegistroAsistencia, SesionClase
+from .particiones import insertar_registros
+from .planteles import materias_del_estudiante
+
+SesionesCubiertas = PermisoAsistencia.sesiones_cubiertas.through
+
+
+def _invalidar(sesion_ids):
+    recalcular_contadores(SesionClase.objects.filter(pk__in=sesion_ids))
+    materia_semestre_ids = set(
+        SesionClase.objects.filter(pk__in=sesion_ids).values_list('materia_semestre_id', flat=True)
+    )
+    # Después del COMMIT, para que nadie vuelva a cachear los datos anteriores
+    def invalidar():
+        incrementar_version('asistencia')
+        for materia_semestre_id in materia_semestre_ids:
+            invalidar_matriz(materia_semestre_id)
+    transaction.on_commit(invalidar)
+
+
+def justificar_sesiones(permiso, sesion_ids=None):
+    """
+    Justifica las faltas del estudiante del permiso (aprobado) en `sesion_ids`
+    (por defecto, todas sus sesiones cubiertas). Retorna (actualizados, creados).
+    """
+    if sesion_ids is None:
+        sesion_ids = list(permiso.sesiones_cubiertas.values_list('id', flat=True))
+    sesion_ids = list(sesion_ids)
+    if not sesion_ids:
+        return 0, 0
+
+    with transaction.atomic():
+        actualizados = RegistroAsistencia.objects.filter(
+            estudiante_id=permiso.estudiante_id, sesion_id__in=sesion_ids, estado='FALTA'
+        ).update(estado='FALTA_JUSTIFICADA', permiso_asistencia=permiso)
+
+        cerradas_sin_registro = SesionClase.objects.filter(pk__in=sesion_ids, cerrada=True).exclude(
+            registros_sesion__estudiante_id=permiso.estudiante_id
+        ).values_list('id', flat=True)
+        nuevos = insertar_registros([
+            RegistroAsistencia(
+                estudiante_id=permiso.estudiante_id,
+                sesion_id=sesion_id,
+                estado='FALTA_JUSTIFICADA',
+                permiso_asistencia=permiso,
+                materializado=True,
+            )
+            for sesion_id in cerradas_sin_registro
+        ])
+
+        if actualizados or nuevos:
+            _invalidar(sesion_ids)
+    return actualizados, len(nuevos)
+
+
+def quitar_justificacion(permiso, sesion_ids=None):
+    """Devuelve a FALTA los registros que el permiso justificaba (en `sesion_ids`, o todos). Retorna la cantidad."""
+    registros = RegistroAsistencia.objects.filter(permiso_asistencia=permiso, estado='FALTA_JUSTIFICADA')
+    if sesion_ids is not None:
+        registros = registros.filter(sesion_id__in=list(sesion_ids))
+    with transaction.atomic():
+        sesion_ids = list(registros.values_list('sesion_id', flat=True).distinct())
+        revertidos = registros.update(estado='FALTA', permiso_asistencia=None)
+        if revertidos:
+            _invalidar(sesion_ids)
+    return revertidos
+
+
+def aprobar_permiso(permiso, administrador=None):
+    """Aprueba el permiso y justifica sus sesiones cubiertas en una transacción. Retorna (actualizados, creados)."""
+    with transaction.atomic():
+        # update() en lugar de save(): la invalidación la hace justificar_sesiones una sola vez
+        PermisoAsistencia.objects.filter(pk=permiso.pk).update(
+            estado='APROBADO', administrador_aprobador=administrador
+        )
+        permiso.estado = 'APROBADO'
+        permiso.administrador_aprobador = administrador
+        return justificar_sesiones(permiso)
+
+
+def revertir_permiso(permiso, estado='RECHAZADO', administrador=None):
+    """Rechaza (o devuelve a PENDIENTE) el permiso y quita sus justificaciones. Retorna la cantidad revertida."""
+    with transaction.atomic():
+        PermisoAsistencia.objects.filter(pk=permiso.pk).update(
+            estado=estado, administrador_aprobador=administrador
+        )
+        permiso.estado = estado
+        permiso.administrador_aprobador = administrador
+        return quitar_justificacion(permiso)
+
+
+# ----------------------------------------------------------------------
+# Sesiones cubiertas por el rango de fechas del permiso
+# ----------------------------------------------------------------------
+def sesiones_del_rango(estudiante, fecha_inicio, fecha_fin=None):
+    """
+    Ids de las sesiones de las materias del estudiante entre fecha_inicio y
+    fecha_fin (o solo fecha_inicio), sin los días especiales. Una consulta.
+    """
+    fecha_fin = fecha_fin or fecha_inicio
+    dias_especiales = DiaEspecial.objects.filter(
+        fecha__gte=fecha_inicio, fecha__lte=fecha_fin, afecta_asistencia=True
+    ).values('fecha')
+    return list(
+        SesionClase.objects.filter(
+            materia_semestre__in=materias_del_estudiante(estudiante),
+            fecha__gte=fecha_inicio,
+            fecha__lte=fecha_fin,
+        ).exclude(fecha__in=dias_especiales).order_by('fecha', 'hora_inicio').values_list('id', flat=True)
+    )
+
+
+def asignar_sesiones(permiso, sesion_ids):
+    """
+    Deja exactamente `sesion_ids` como sesiones cubiertas del permiso,
+    escribiendo la tabla intermedia en bloque. Si el permiso está aprobado,
+    justifica las sesiones nuevas y revierte las quitadas.
+    """
+    sesion_ids = set(sesion_ids)
+    with transaction.atomic():
+        actuales = set(
+            SesionesCubiertas.objects.filter(permisoasistencia_id=permiso.pk).values_list('sesionclase_id', flat=True)
+        )
+        nuevas, quitadas = sesion_ids - actuales, actuales - sesion_ids
+        if quitadas:
+            SesionesCubiertas.objects.filter(permisoasistencia_id=permiso.pk, sesionclase_id__in=quitadas).delete()
+        SesionesCubiertas.objects.bulk_create([
+            SesionesCubiertas(permisoasistencia_id=permiso.pk, sesionclase_id=sesion_id)
+            for sesion_id in sorted(nuevas)
+        ], ignore_conflicts=True)
+
+        # La tabla intermedia escrita directamente no emite m2m_changed
+        if permiso.estado == 'APROBADO':
+            if quitadas:
+                quitar_justificacion(permiso, quitadas)
+            if nuevas:
+                justificar_sesiones(permiso, nuevas)
+        if nuevas or quitadas:
+            transaction.on_commit(lambda: incrementar_version('asistencia'))
+    return len(nuevas), len(quitadas)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_academica import archivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Archiva una gestión cerrada: congela sus resúmenes y mueve sesiones, registros '
+        'y permisos a las tablas de archivo por lotes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('gestion', help='Gestión a archivar, tal como figura en MateriaSemestre (ej. 2025/1)')
+        parser.add_argument('--batch-size', type=int, default=archivo.TAMANO_LOTE,
+                            help=f'Filas copiadas y eliminadas por transacción (por defecto {archivo.TAMANO_LOTE})')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Archivar aunque la gestión tenga sesiones de hoy o futuras')
+
+    def handle(self, *args, **options):
+        try:
+            archivada = archivo.archivar_gestion(
+                options['gestion'],
+                tamano_lote=options['batch_size'],
+                forzar=options['forzar'],
+                progreso=self.stdout.write,
+            )
+        except archivo.ErrorArchivo as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Gestión {archivada.gestion} archivada: {archivada.sesiones} sesiones, '
+            f'{archivada.registros} registros y {archivada.permisos} permisos.'
+        ))
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from gestion_academica.models import Administrador, MateriaSemestre
+from gestion_academica.planteles import cargar_planteles
+from gestion_academica.renderers import ORJSONRenderer, orjson
+from gestion_academica.views import RegistroAsistenciaViewSet, resumen_asistencias_general
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el tiempo de codificación JSON de DRF y de orjson con respuestas '
+        'reales: listado de registros, resumen general y planteles'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson no está instalado: ORJSONRenderer usa el JSON de DRF'))
+
+        administrador = Administrador.objects.select_related('usuario').first()
+        if administrador is None:
+            self.stdout.write(self.style.ERROR('Se necesita al menos un administrador para armar las respuestas'))
+            return
+
+        cargas = {
+            'registros-asistencia': self._respuesta(
+                RegistroAsistenciaViewSet.as_view({'get': 'list'}), administrador.usuario,
+                '/api/registros-asistencia/', {'expand': 'estudiante_info,sesion_info,permiso_asistencia_info'},
+            ),
+            'resumen-asistencias-general': self._respuesta(
+                resumen_asistencias_general, administrador.usuario, '/api/resumen-asistencias-general/', {},
+            ),
+            'planteles': cargar_planteles(MateriaSemestre.objects.select_related('semestre')),
+        }
+
+        repeticiones = options['repeticiones']
+        for nombre, datos in cargas.items():
+            drf_ms, tamano = self._medir(JSONRenderer(), datos, repeticiones)
+            orjson_ms, _ = self._medir(ORJSONRenderer(), datos, repeticiones)
+            self.stdout.write(
+                f'{nombre}: {tamano / 1024:.1f} KB | DRF {drf_ms:.2f} ms | orjson {orjson_ms:.2f} ms | '
+                f'{drf_ms / orjson_ms if orjson_ms else 0:.1f}x'
+            )
+
+    def _respuesta(self, vista, usuario, ruta, parametros):
+        request = APIRequestFactory().get(ruta, parametros, HTTP_X_PAGINACION='desactivada')
+        force_authenticate(request, user=usuario)
+        return vista(request).data
+
+    def _medir(self, renderer, datos, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            contenido = renderer.render(datos)
+        return (time.perf_counter() - inicio) * 1000 / repeticiones, len(contenido)
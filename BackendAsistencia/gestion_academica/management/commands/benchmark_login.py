@@ -0,0 +1,78 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from gestion_academica.models import Administrador, Usuario
+from gestion_academica.views import login_view
+
+EMAIL_PRUEBA = 'benchmark.login@emi.edu.bo'
+CLAVE_PRUEBA = 'benchmark-login'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el rendimiento del login: costo del hash de la contraseña por separado '
+        'del resto del trabajo, en modo sesión y en modo solo token'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iteraciones = options['iteraciones']
+
+        # El usuario de prueba se crea dentro de una transacción que se revierte
+        with transaction.atomic():
+            usuario = Usuario.objects.create_user(EMAIL_PRUEBA, 'Benchmark', 'Login', CLAVE_PRUEBA)
+            Administrador.objects.create(usuario=usuario)
+
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                check_password(CLAVE_PRUEBA, usuario.password)
+            hash_ms = (time.perf_counter() - inicio) * 1000 / iteraciones
+
+            self.stdout.write(f'Hash de contraseña: {hash_ms:.1f} ms por login')
+            for modo in ('sesion', 'token'):
+                self._medir_login(modo, iteraciones, hash_ms)
+
+            transaction.set_rollback(True)
+
+    def _medir_login(self, modo, iteraciones, hash_ms):
+        fabrica = RequestFactory()
+        sesiones_antes = Session.objects.count()
+        consultas = 0
+
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            request = fabrica.post(
+                '/api/login/', {'email': EMAIL_PRUEBA, 'password': CLAVE_PRUEBA, 'modo': modo},
+                content_type='application/json',
+            )
+            request.session = self._sesion_nueva()
+            with CaptureQueriesContext(connection) as capturadas:
+                response = login_view(request)
+                if modo == 'sesion':
+                    # Lo que haría SessionMiddleware al terminar la respuesta
+                    request.session.save()
+            consultas += len(capturadas)
+            if response.status_code != 200:
+                self.stdout.write(self.style.ERROR(f'Login fallido en modo {modo}: {response.data}'))
+                return
+        total_ms = (time.perf_counter() - inicio) * 1000 / iteraciones
+
+        self.stdout.write(
+            f'Modo {modo}: {total_ms:.1f} ms por login '
+            f'({total_ms - hash_ms:.1f} ms sin el hash, {consultas / iteraciones:.1f} consultas, '
+            f'{Session.objects.count() - sesiones_antes} sesiones creadas, '
+            f'{iteraciones * 1000 / total_ms:.1f} logins/s)'
+        )
+
+    def _sesion_nueva(self):
+        return import_module(settings.SESSION_ENGINE).SessionStore()
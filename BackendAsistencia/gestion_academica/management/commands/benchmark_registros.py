@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from gestion_academica import particiones
+from gestion_academica.models import RegistroAsistencia, SesionClase
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide con EXPLAIN ANALYZE las lecturas típicas de RegistroAsistencia. '
+        'Ejecutar antes y después de particionar para comparar (solo PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gestion', help='Gestión a consultar (por defecto la actual)')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('El benchmark usa EXPLAIN ANALYZE de PostgreSQL')
+
+        gestion = options['gestion'] or particiones.gestion_de_fecha(timezone.localdate())
+        inicio, fin = particiones.rango_gestion(gestion)
+        sesion_id = SesionClase.objects.filter(fecha__gte=inicio.date(), fecha__lt=fin.date()).values_list('id', flat=True).first()
+        registro = RegistroAsistencia.objects.filter(fecha_registro__gte=inicio, fecha_registro__lt=fin).values('estudiante_id').first()
+
+        consultas = {
+            # Con filtro por fecha_registro: el planificador descarta particiones
+            'conteo por estado de la gestión': RegistroAsistencia.objects.filter(
+                fecha_registro__gte=inicio, fecha_registro__lt=fin
+            ).values('estado').annotate(total=Count('id')).order_by(),
+            'historial del estudiante en la gestión': RegistroAsistencia.objects.filter(
+                estudiante_id=registro['estudiante_id'] if registro else 0,
+                fecha_registro__gte=inicio, fecha_registro__lt=fin,
+            ).values('sesion_id', 'estado'),
+            # Sin fecha_registro (como las vistas actuales): recorre el índice de cada partición
+            'registros de una sesión': RegistroAsistencia.objects.filter(
+                sesion_id=sesion_id or 0
+            ).values('estudiante_id', 'estado'),
+        }
+
+        particionada = particiones.esta_particionada()
+        self.stdout.write(f'Gestión {gestion} | tabla {"particionada" if particionada else "sin particionar"}')
+        for nombre, queryset in consultas.items():
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                plan = json.loads(queryset.explain(format='json', analyze=True))
+                tiempos.append(plan[0]['Execution Time'])
+            tablas = sorted(self._tablas(plan[0]['Plan']))
+            self.stdout.write(
+                f'{nombre}: mínimo {min(tiempos):.3f} ms, mediana {sorted(tiempos)[len(tiempos) // 2]:.3f} ms '
+                f'| tablas recorridas: {len(tablas)} ({", ".join(tablas)})'
+            )
+
+    def _tablas(self, nodo):
+        tablas = set()
+        if 'Relation Name' in nodo:
+            tablas.add(nodo['Relation Name'])
+        for hijo in nodo.get('Plans', []):
+            tablas |= self._tablas(hijo)
+        return tablas
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from gestion_academica.cierre import TAMANO_LOTE, cerrar_sesiones
+
+
+class Command(BaseCommand):
+    help = (
+        'Cierra las sesiones de clase cuya hora de fin ya pasó: inserta en bloque las faltas '
+        'de los estudiantes sin registro y aplica los permisos aprobados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE,
+                            help=f'Sesiones por transacción (por defecto {TAMANO_LOTE})')
+        parser.add_argument('--bucle', action='store_true',
+                            help='Repetir indefinidamente cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=60,
+                            help='Segundos entre pasadas con --bucle (por defecto 60)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size debe ser mayor que cero')
+        if options['intervalo'] <= 0:
+            raise CommandError('--intervalo debe ser mayor que cero')
+
+        while True:
+            # En bucle, la conexión puede haber expirado entre pasadas
+            close_old_connections()
+            ahora = timezone.localtime()
+            sesiones, faltas, justificadas = cerrar_sesiones(ahora, options['batch_size'])
+            if sesiones or not options['bucle']:
+                self.stdout.write(
+                    f'{ahora:%Y-%m-%d %H:%M}: {sesiones} sesiones cerradas, '
+                    f'{faltas} faltas y {justificadas} faltas justificadas registradas.'
+                )
+            if not options['bucle']:
+                break
+            time.sleep(options['intervalo'])
@@ -1,41 +1,137 @@
-from django.core.management.base import BaseCommand
-from gestion_academica.models import RegistroAsistencia
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from gestion_academica.cache_respuestas import incrementar_version
+from gestion_academica.contadores import recalcular_contadores
+from gestion_academica.matriz_asistencia import invalidar_matriz
+from gestion_academica.models import PermisoAsistencia, RegistroAsistencia, SesionClase, tolerancia_global
+from gestion_academica.tolerancia import estado_por_hora
+
+TAMANO_LOTE = 2000
+
+
+def calcular_estados(filas, cubiertas):
+    """
+    Misma regla que RegistroAsistencia.set_estado_asistencia, para un lote:
+    FALTA_JUSTIFICADA si el permiso del registro está aprobado y cubre la
+    sesión; si no, PRESENTE o RETRASO según la tolerancia de la materia.
+    `filas`: (id, fecha_registro, sesion_id, fecha, hora_inicio, permiso_id,
+    estado_permiso, tolerancia); `cubiertas`: pares (permiso_id, sesion_id).
+    Retorna {id: estado}.
+    """
+    zona = timezone.get_current_timezone()
+    estados = {}
+    for registro_id, fecha_registro, sesion_id, fecha, hora_inicio, permiso_id, estado_permiso, tolerancia in filas:
+        if estado_permiso == 'APROBADO' and (permiso_id, sesion_id) in cubiertas:
+            estados[registro_id] = 'FALTA_JUSTIFICADA'
+        elif fecha_registro is None:
+            estados[registro_id] = 'FALTA'
+        else:
+            estados[registro_id] = estado_por_hora(fecha_registro, fecha, hora_inicio, tolerancia, zona)
+    return estados
 
 
 class Command(BaseCommand):
-    help = 'Corrige los estados de asistencia existentes que están marcados incorrectamente como FALTA'
+    help = (
+        'Recalcula por lotes el estado de los registros marcados como FALTA (sin las faltas '
+        'insertadas al cerrar la sesión) y guarda los cambios con bulk_update'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Calcular e informar los cambios sin guardarlos')
+        parser.add_argument('--since', type=str,
+                            help='Solo registros de sesiones desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE,
+                            help=f'Registros leídos y actualizados por lote (por defecto {TAMANO_LOTE})')
 
     def handle(self, *args, **options):
-        self.stdout.write('Iniciando corrección de estados de asistencia...')
-        
-        # Obtener todos los registros de asistencia que tienen estado FALTA
-        registros_falta = RegistroAsistencia.objects.filter(estado='FALTA')
-        
-        self.stdout.write(f'Encontrados {registros_falta.count()} registros con estado FALTA')
-        
-        corregidos = 0
-        for registro in registros_falta:
+        tamano_lote = options['batch_size']
+        if tamano_lote <= 0:
+            raise CommandError('--batch-size debe ser mayor que cero')
+
+        # Registros con estado FALTA, sin las faltas insertadas al cerrar la sesión
+        registros_falta = RegistroAsistencia.objects.filter(estado='FALTA', materializado=False)
+        if options['since']:
             try:
-                # Recalcular el estado
-                estado_anterior = registro.estado
-                registro.set_estado_asistencia()
-                
-                if registro.estado != estado_anterior:
-                    registro.save(update_fields=['estado'])
-                    corregidos += 1
-                    self.stdout.write(
-                        f'Registro {registro.id}: {estado_anterior} -> {registro.estado}'
-                    )
-                else:
-                    self.stdout.write(
-                        f'Registro {registro.id}: estado correcto ({registro.estado})'
-                    )
-                    
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Error al corregir registro {registro.id}: {e}')
-                )
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Proceso completado. {corregidos} registros corregidos.')
-        )
+                desde = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since debe tener el formato AAAA-MM-DD')
+            registros_falta = registros_falta.filter(sesion__fecha__gte=desde)
+
+        total = registros_falta.count()
+        prefijo = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefijo}Encontrados {total} registros con estado FALTA')
+
+        inicio = time.monotonic()
+        procesados = corregidos = 0
+        por_estado = {}
+        sesiones_afectadas = set()
+        materias_afectadas = set()
+        ultimo_id = 0
+        while True:
+            # Cursor por id: cada lote es una consulta por índice, sin OFFSET
+            filas = list(
+                registros_falta.filter(id__gt=ultimo_id).order_by('id').annotate(tolerancia=Coalesce(
+                    F('sesion__materia_semestre__tolerancia_minutos'),
+                    F('sesion__materia_semestre__semestre__carrera__tolerancia_minutos'),
+                    Value(tolerancia_global()),
+                )).values_list(
+                    'id', 'fecha_registro', 'sesion_id', 'sesion__fecha', 'sesion__hora_inicio',
+                    'permiso_asistencia_id', 'permiso_asistencia__estado', 'tolerancia',
+                    'sesion__materia_semestre_id',
+                )[:tamano_lote]
+            )
+            if not filas:
+                break
+            ultimo_id = filas[-1][0]
+
+            permisos = {fila[5] for fila in filas if fila[6] == 'APROBADO'}
+            cubiertas = set(
+                PermisoAsistencia.sesiones_cubiertas.through.objects.filter(
+                    permisoasistencia_id__in=permisos,
+                    sesionclase_id__in={fila[2] for fila in filas},
+                ).values_list('permisoasistencia_id', 'sesionclase_id')
+            ) if permisos else set()
+            estados = calcular_estados([fila[:8] for fila in filas], cubiertas)
+
+            # Todas las filas leídas están en FALTA: cada estado distinto es un cambio
+            cambios = [RegistroAsistencia(id=registro_id, estado=estado) for registro_id, estado in estados.items()
+                       if estado != 'FALTA']
+            if cambios and not options['dry_run']:
+                with transaction.atomic():
+                    RegistroAsistencia.objects.bulk_update(cambios, ['estado'], batch_size=tamano_lote)
+            por_id = {fila[0]: fila for fila in filas}
+            for registro in cambios:
+                por_estado[registro.estado] = por_estado.get(registro.estado, 0) + 1
+                sesiones_afectadas.add(por_id[registro.id][2])
+                materias_afectadas.add(por_id[registro.id][8])
+
+            procesados += len(filas)
+            corregidos += len(cambios)
+            transcurrido = time.monotonic() - inicio
+            velocidad = procesados / transcurrido if transcurrido else 0
+            self.stdout.write(
+                f'{prefijo}{procesados}/{total} registros procesados, {corregidos} corregidos '
+                f'({velocidad:.0f} registros/s)'
+            )
+
+        # bulk_update no emite post_save: se actualiza aquí lo que harían las señales
+        if corregidos and not options['dry_run']:
+            recalcular_contadores(SesionClase.objects.filter(pk__in=sesiones_afectadas))
+            incrementar_version('asistencia')
+            for materia_semestre_id in materias_afectadas:
+                invalidar_matriz(materia_semestre_id)
+
+        detalle = ', '.join(f'{estado}: {cantidad}' for estado, cantidad in sorted(por_estado.items())) or 'sin cambios'
+        verbo = 'se corregirían' if options['dry_run'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefijo}Proceso completado en {time.monotonic() - inicio:.1f} s. '
+            f'{corregidos} registros {verbo} ({detalle}).'
+        ))
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_academica import calendario
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor!r} (formato AAAA-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera las sesiones planificadas de una gestión expandiendo el horario semanal '
+        'de cada materia sobre el rango de fechas, sin los días especiales'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('gestion', help='Gestión tal como figura en MateriaSemestre (ej. 2025/1)')
+        parser.add_argument('--inicio', help='Primer día de clases (AAAA-MM-DD); por defecto el guardado')
+        parser.add_argument('--fin', help='Último día de clases (AAAA-MM-DD); por defecto el guardado')
+        parser.add_argument('--batch-size', type=int, default=calendario.TAMANO_LOTE,
+                            help=f'Sesiones insertadas por sentencia (por defecto {calendario.TAMANO_LOTE})')
+
+    def handle(self, *args, **options):
+        if bool(options['inicio']) != bool(options['fin']):
+            raise CommandError('Indique --inicio y --fin juntos')
+        inicio = _fecha(options['inicio']) if options['inicio'] else None
+        fin = _fecha(options['fin']) if options['fin'] else None
+        try:
+            creadas, eliminadas = calendario.generar_calendario(
+                options['gestion'], inicio, fin, options['batch_size']
+            )
+        except calendario.ErrorCalendario as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Calendario de {options["gestion"]}: {creadas} sesiones planificadas creadas, {eliminadas} eliminadas.'
+        ))
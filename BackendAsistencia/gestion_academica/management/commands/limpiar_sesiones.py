@@ -0,0 +1,29 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Elimina las sesiones expiradas de django_session por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Cantidad de sesiones eliminadas por consulta (por defecto 5000)')
+
+    def handle(self, *args, **options):
+        tamano_lote = options['batch_size']
+        ahora = timezone.now()
+        expiradas = Session.objects.filter(expire_date__lt=ahora)
+
+        # Lotes cortos para no bloquear la tabla con un único DELETE enorme
+        eliminadas = 0
+        while True:
+            claves = list(expiradas.values_list('session_key', flat=True)[:tamano_lote])
+            if not claves:
+                break
+            eliminadas += Session.objects.filter(session_key__in=claves).delete()[0]
+            self.stdout.write(f'{eliminadas} sesiones eliminadas...')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Proceso completado. {eliminadas} sesiones expiradas eliminadas.')
+        )
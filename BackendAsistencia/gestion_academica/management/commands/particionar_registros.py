@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gestion_academica import particiones
+
+
+class Command(BaseCommand):
+    help = (
+        'Particionado opcional de RegistroAsistencia por gestión (solo PostgreSQL). '
+        'Acciones: convertir, crear, desprender, estado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('accion', choices=['convertir', 'crear', 'desprender', 'estado'])
+        parser.add_argument('--adelante', type=int, default=2,
+                            help='Gestiones futuras con partición creada (convertir, crear)')
+        parser.add_argument('--antes', help='Desprender las particiones anteriores a esta gestión (AAAA/1 o AAAA/2)')
+        parser.add_argument('--eliminar', action='store_true',
+                            help='Eliminar las particiones desprendidas en lugar de conservarlas como tablas')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                getattr(self, f'_{options["accion"]}')(options)
+        except particiones.ErrorParticionado as e:
+            raise CommandError(str(e))
+
+    def _convertir(self, options):
+        self.stdout.write('Convirtiendo la tabla de registros (bloquea escrituras mientras dura)...')
+        particiones.convertir(options['adelante'])
+        self._estado(options)
+        self.stdout.write(self.style.SUCCESS('Tabla particionada por gestión.'))
+
+    def _crear(self, options):
+        creadas = particiones.crear_particiones(options['adelante'])
+        for nombre in creadas:
+            self.stdout.write(f'Partición creada: {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'Proceso completado. {len(creadas)} particiones creadas.'))
+
+    def _desprender(self, options):
+        if not options['antes']:
+            raise CommandError('Indique la gestión límite con --antes')
+        afectadas = particiones.desprender_particiones(options['antes'], options['eliminar'])
+        accion = 'eliminada' if options['eliminar'] else 'desprendida'
+        for nombre in afectadas:
+            self.stdout.write(f'Partición {accion}: {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'Proceso completado. {len(afectadas)} particiones.'))
+
+    def _estado(self, options):
+        if not particiones.esta_particionada():
+            self.stdout.write('La tabla de registros no está particionada.')
+            return
+        for nombre, limites, filas in particiones.particiones():
+            self.stdout.write(f'{nombre}: {limites} (~{max(filas, 0)} filas)')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from gestion_academica.horarios import ANTICIPACION_MINUTOS
+from gestion_academica.programador import crear_sesiones
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea las sesiones de clase que tocan ahora según el horario semanal '
+        '(una sola sentencia por pasada; se puede ejecutar desde cron o en bucle)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todo-el-dia', action='store_true',
+                            help='Crear las sesiones de todas las materias del día, no solo las del tramo actual')
+        parser.add_argument('--anticipacion', type=int, default=ANTICIPACION_MINUTOS,
+                            help=f'Minutos antes del inicio en que se crea la sesión (por defecto {ANTICIPACION_MINUTOS})')
+        parser.add_argument('--bucle', action='store_true',
+                            help='Repetir indefinidamente cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=60,
+                            help='Segundos entre pasadas con --bucle (por defecto 60)')
+
+    def handle(self, *args, **options):
+        if options['intervalo'] <= 0:
+            raise CommandError('--intervalo debe ser mayor que cero')
+
+        while True:
+            # En bucle, la conexión puede haber expirado entre pasadas
+            close_old_connections()
+            ahora = timezone.localtime()
+            abiertas = crear_sesiones(ahora, options['todo_el_dia'], options['anticipacion'])
+            if abiertas or not options['bucle']:
+                self.stdout.write(f'{ahora:%Y-%m-%d %H:%M}: {len(abiertas)} sesiones creadas o abiertas.')
+            if not options['bucle']:
+                break
+            time.sleep(options['intervalo'])
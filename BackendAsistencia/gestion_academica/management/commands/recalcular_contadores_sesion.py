@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from gestion_academica.cache_respuestas import incrementar_version
+from gestion_academica.contadores import recalcular_contadores, sesiones_desincronizadas
+from gestion_academica.models import SesionClase
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica y reconstruye los contadores de asistencia guardados en cada sesión de clase '
+        '(un único UPDATE con conteos agrupados por sesión)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gestion', help='Limitar a las sesiones de una gestión (p. ej. 2025/1)')
+        parser.add_argument('--solo-verificar', action='store_true',
+                            help='Informar las sesiones con contadores incorrectos sin modificarlas')
+
+    def handle(self, *args, **options):
+        sesiones = SesionClase.objects.all()
+        if options['gestion']:
+            sesiones = sesiones.filter(materia_semestre__gestion=options['gestion'])
+
+        desincronizadas = sesiones_desincronizadas(sesiones).values_list('id', flat=True)
+        if options['solo_verificar']:
+            # Una sola evaluación para el total y los ids mostrados
+            desincronizadas = list(desincronizadas)
+            if not desincronizadas:
+                self.stdout.write(self.style.SUCCESS('Todos los contadores coinciden con los registros.'))
+                return
+            self.stdout.write(self.style.WARNING(
+                f'{len(desincronizadas)} sesiones con contadores incorrectos '
+                f'(ids: {", ".join(map(str, desincronizadas[:20]))}{"..." if len(desincronizadas) > 20 else ""}).'
+            ))
+            return
+
+        hubo_cambios = desincronizadas.exists()
+        actualizadas = recalcular_contadores(sesiones)
+        if hubo_cambios:
+            incrementar_version('asistencia')
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados en {actualizadas} sesiones.'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_academica.models import MateriaSemestre
+from gestion_academica.tolerancia import recalcular_estados, reclasificar_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Reclasifica PRESENTE/RETRASO con la tolerancia vigente de cada materia '
+        '(un UPDATE ... CASE por materia) y recalcula los contadores de las sesiones'
+    )
+
+    def add_arguments(self, parser):
+        alcance = parser.add_mutually_exclusive_group(required=True)
+        alcance.add_argument('--todas', action='store_true',
+                             help='Todas las materias de gestiones no archivadas (p. ej. tras cambiar '
+                                  'ASISTENCIA_TOLERANCIA_MINUTOS)')
+        alcance.add_argument('--pendientes', action='store_true',
+                             help='Carreras cuya tolerancia cambió desde la última pasada '
+                                  '(pensado para ejecutarse desde cron)')
+        alcance.add_argument('--carrera', type=int, help='Id de la carrera')
+        alcance.add_argument('--materia-semestre', type=int, help='Id de la MateriaSemestre')
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            carreras, total_materias, modificados = reclasificar_pendientes(progreso=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(
+                f'{carreras} carreras pendientes, {total_materias} materias revisadas, '
+                f'{modificados} registros reclasificados.'
+            ))
+            return
+
+        materias = MateriaSemestre.objects.all()
+        if options['carrera'] is not None:
+            materias = materias.filter(semestre__carrera_id=options['carrera'])
+        elif options['materia_semestre'] is not None:
+            materias = materias.filter(pk=options['materia_semestre'])
+        if not materias.exists():
+            raise CommandError('No hay materias para reclasificar con ese alcance')
+
+        total_materias, modificados = recalcular_estados(materias, progreso=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_materias} materias revisadas, {modificados} registros reclasificados.'
+        ))
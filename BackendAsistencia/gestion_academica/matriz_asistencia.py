@@ -0,0 +1,188 @@
+"""
+Matriz compacta de asistencia (estudiantes × sesiones) por MateriaSemestre.
+
+Cada celda guarda un código de estado en un uint8, con los ids de estudiantes
+y sesiones como arreglos de índice. La usa el resumen de asistencias por
+estudiante (una matriz por materia sirve a todo su plantel).
+
+La matriz se guarda en la caché bajo una versión por MateriaSemestre. Un
+registro nuevo o modificado no parcha la celda (un get/modificar/set
+concurrente perdería cambios): sube la versión después del COMMIT, y la
+siguiente lectura reconstruye. Una reconstrucción que leyó la base antes del
+COMMIT queda guardada bajo la versión anterior, que ya nadie lee. Con una
+caché local a cada proceso no se cachea: otro worker no vería la invalidación.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_respuestas import cache_compartida, incrementar_version, obtener_version
+from .models import Estudiante, MateriaSemestre, RegistroAsistencia, SesionClase
+
+# Códigos de estado. 0 significa que el estudiante no tiene registro en la sesión.
+SIN_REGISTRO = 0
+CODIGOS_ESTADO = {
+    'PRESENTE': 1,
+    'RETRASO': 2,
+    'FALTA': 3,
+    'FALTA_JUSTIFICADA': 4,
+}
+CODIGOS_ASISTENCIA = (CODIGOS_ESTADO['PRESENTE'], CODIGOS_ESTADO['RETRASO'])
+CODIGOS_FALTA = (SIN_REGISTRO, CODIGOS_ESTADO['FALTA'])
+
+CACHE_TIMEOUT = 60 * 60  # 1 hora
+
+
+def _nombre_version(materia_semestre_id):
+    return f'matriz:{materia_semestre_id}'
+
+
+def _clave_cache(materia_semestre_id):
+    version = obtener_version(_nombre_version(materia_semestre_id))
+    return f'matriz_asistencia:{materia_semestre_id}:{version}'
+
+
+class MatrizAsistencia:
+    """
+    Matriz de estados de asistencia de una MateriaSemestre.
+    Filas: estudiantes (ordenados por id). Columnas: sesiones (ordenadas por fecha).
+    """
+
+    def __init__(self, materia_semestre_id, estudiante_ids, sesion_ids, codigos):
+        self.materia_semestre_id = materia_semestre_id
+        self.estudiante_ids = np.asarray(estudiante_ids, dtype=np.int64)
+        self.sesion_ids = np.asarray(sesion_ids, dtype=np.int64)
+        self.codigos = np.asarray(codigos, dtype=np.uint8)
+        self._fila = {int(e): i for i, e in enumerate(self.estudiante_ids)}
+        self._columna = {int(s): j for j, s in enumerate(self.sesion_ids)}
+
+    @classmethod
+    def construir(cls, materia_semestre_id):
+        """
+        Construye la matriz desde la base de datos. Las celdas se llenan con una
+        sola consulta values_list sobre RegistroAsistencia; los ejes salen de las
+        sesiones de la materia y del plantel de estudiantes (carrera + semestre).
+        """
+        registros = list(
+            RegistroAsistencia.objects.filter(
+                sesion__materia_semestre_id=materia_semestre_id
+            ).exclude(
+                sesion__origen='PLANIFICADA'
+            ).values_list('estudiante_id', 'sesion_id', 'estado')
+        )
+        sesion_ids = np.fromiter(
+            SesionClase.objects.realizadas().filter(materia_semestre_id=materia_semestre_id)
+            .order_by('fecha', 'hora_inicio', 'id')
+            .values_list('id', flat=True),
+            dtype=np.int64,
+        )
+        plantel = np.fromiter(
+            Estudiante.objects.filter(
+                semestre_actual__materias_ofrecidas__id=materia_semestre_id,
+                carrera=MateriaSemestre.objects.filter(
+                    id=materia_semestre_id
+                ).values('semestre__carrera')[:1],
+            ).values_list('id', flat=True),
+            dtype=np.int64,
+        )
+
+        if registros:
+            reg_est, reg_ses, reg_estado = zip(*registros)
+            reg_est = np.asarray(reg_est, dtype=np.int64)
+            reg_ses = np.asarray(reg_ses, dtype=np.int64)
+            reg_cod = np.asarray([CODIGOS_ESTADO.get(e, SIN_REGISTRO) for e in reg_estado], dtype=np.uint8)
+        else:
+            reg_est = reg_ses = np.empty(0, dtype=np.int64)
+            reg_cod = np.empty(0, dtype=np.uint8)
+
+        # Estudiantes del plantel más los que tienen registros (p. ej. cambiaron de semestre)
+        estudiante_ids = np.union1d(plantel, reg_est)
+
+        codigos = np.zeros((len(estudiante_ids), len(sesion_ids)), dtype=np.uint8)
+        if len(reg_est):
+            filas = np.searchsorted(estudiante_ids, reg_est)
+            orden = np.argsort(sesion_ids, kind='stable')
+            columnas = orden[np.searchsorted(sesion_ids[orden], reg_ses)]
+            codigos[filas, columnas] = reg_cod
+
+        return cls(materia_semestre_id, estudiante_ids, sesion_ids, codigos)
+
+    # ------------------------------------------------------------------
+    # Cálculos vectorizados
+    # ------------------------------------------------------------------
+    def conteos_estudiante(self, estudiante_id):
+        """{estado: cantidad} en la fila del estudiante (ceros si no está en la matriz)."""
+        fila = self._fila.get(estudiante_id)
+        if fila is None:
+            return {estado: 0 for estado in CODIGOS_ESTADO}
+        conteo = np.bincount(self.codigos[fila], minlength=len(CODIGOS_ESTADO) + 1)
+        return {estado: int(conteo[codigo]) for estado, codigo in CODIGOS_ESTADO.items()}
+
+    def _asistio(self):
+        return np.isin(self.codigos, CODIGOS_ASISTENCIA)
+
+    def _falto(self):
+        return np.isin(self.codigos, CODIGOS_FALTA)
+
+    def conteos_por_sesion(self):
+        """Retorna un arreglo (sesiones × 5) con la cantidad de cada código por sesión."""
+        conteos = np.zeros((len(self.sesion_ids), 5), dtype=np.int64)
+        for codigo in range(5):
+            conteos[:, codigo] = (self.codigos == codigo).sum(axis=0)
+        return conteos
+
+    def tasas_por_estudiante(self):
+        """Porcentaje de asistencia (presente o retraso) de cada estudiante."""
+        if not len(self.sesion_ids):
+            return np.zeros(len(self.estudiante_ids))
+        return self._asistio().mean(axis=1) * 100
+
+    def tasas_por_sesion(self):
+        """Porcentaje de estudiantes que asistieron a cada sesión."""
+        if not len(self.estudiante_ids):
+            return np.zeros(len(self.sesion_ids))
+        return self._asistio().mean(axis=0) * 100
+
+    def rachas_maximas_faltas(self):
+        """Racha más larga de faltas consecutivas (sin justificar) de cada estudiante."""
+        faltas = self._falto().astype(np.int8)
+        rachas = np.zeros(len(self.estudiante_ids), dtype=np.int64)
+        if not faltas.size:
+            return rachas
+        bordes = np.diff(np.pad(faltas, ((0, 0), (1, 1))), axis=1)
+        filas_inicio, col_inicio = np.nonzero(bordes == 1)
+        _, col_fin = np.nonzero(bordes == -1)
+        # np.nonzero recorre por filas, así que inicios y fines quedan emparejados
+        np.maximum.at(rachas, filas_inicio, col_fin - col_inicio)
+        return rachas
+
+    def rachas_actuales_faltas(self):
+        """Faltas consecutivas al final de la matriz (las sesiones más recientes)."""
+        faltas = self._falto()
+        if not faltas.size:
+            return np.zeros(len(self.estudiante_ids), dtype=np.int64)
+        invertida = faltas[:, ::-1]
+        # Índice de la primera asistencia desde el final; si nunca asistió, la racha es total
+        primera_no_falta = np.argmin(invertida, axis=1)
+        return np.where(invertida.all(axis=1), faltas.shape[1], primera_no_falta)
+
+
+# ----------------------------------------------------------------------
+# Caché
+# ----------------------------------------------------------------------
+def obtener_matriz(materia_semestre_id):
+    """Retorna la matriz de la caché, construyéndola si no existe."""
+    if not cache_compartida():
+        return MatrizAsistencia.construir(materia_semestre_id)
+    # La versión se lee antes de consultar la base (ver el docstring del módulo)
+    clave = _clave_cache(materia_semestre_id)
+    matriz = cache.get(clave)
+    if matriz is None:
+        matriz = MatrizAsistencia.construir(materia_semestre_id)
+        cache.set(clave, matriz, CACHE_TIMEOUT)
+    return matriz
+
+
+def invalidar_matriz(materia_semestre_id):
+    """Descarta la matriz de la materia cuando se confirme la transacción actual."""
+    transaction.on_commit(lambda: incrementar_version(_nombre_version(materia_semestre_id)))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0008_alter_materiasemestre_unique_together_diaespecial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='permisoasistencia',
+            index=models.Index(fields=['-fecha_solicitud', '-id'], name='permiso_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroasistencia',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='registro_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['-fecha_generacion', '-id'], name='reporte_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionclase',
+            index=models.Index(fields=['-fecha', '-hora_inicio', '-id'], name='sesion_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0009_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diaespecial',
+            index=models.Index(condition=models.Q(('afecta_asistencia', True)), fields=['fecha'], name='dia_especial_afecta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estudiante',
+            index=models.Index(fields=['carrera', 'semestre_actual'], include=('usuario', 'codigo_institucional'), name='estudiante_cohorte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='permisoasistencia',
+            index=models.Index(fields=['estudiante', 'estado'], name='permiso_estudiante_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='permisoasistencia',
+            index=models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['-fecha_solicitud'], name='permiso_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroasistencia',
+            index=models.Index(fields=['sesion', 'estado'], include=('estudiante',), name='registro_sesion_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroasistencia',
+            index=models.Index(fields=['estudiante', 'sesion'], include=('estado',), name='registro_estudiante_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionclase',
+            index=models.Index(fields=['materia_semestre', 'fecha', 'hora_inicio'], include=('hora_fin',), name='sesion_activa_idx'),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0010_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GestionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gestion', models.CharField(max_length=10, unique=True)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+                ('completada', models.BooleanField(default=False)),
+                ('sesiones', models.PositiveIntegerField(default=0)),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('permisos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Gestión Archivada',
+                'verbose_name_plural': 'Gestiones Archivadas',
+                'ordering': ['-gestion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PermisoAsistenciaArchivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('gestion', models.CharField(max_length=10)),
+                ('estudiante_id', models.IntegerField()),
+                ('administrador_aprobador_id', models.IntegerField(blank=True, null=True)),
+                ('motivo', models.TextField()),
+                ('archivo_justificacion', models.CharField(blank=True, max_length=100)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('APROBADO', 'Aprobado'), ('RECHAZADO', 'Rechazado')], max_length=10)),
+                ('fecha_solicitud', models.DateTimeField()),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('sesiones_cubiertas', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Permiso de Asistencia Archivado',
+                'verbose_name_plural': 'Permisos de Asistencia Archivados',
+                'indexes': [models.Index(fields=['estudiante_id'], name='permiso_archivado_est_idx'), models.Index(fields=['gestion'], name='permiso_archivado_gestion_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroAsistenciaArchivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('gestion', models.CharField(max_length=10)),
+                ('estudiante_id', models.IntegerField()),
+                ('sesion_id', models.IntegerField()),
+                ('fecha_registro', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('PRESENTE', 'Presente'), ('RETRASO', 'Presente con retraso'), ('FALTA', 'Falta'), ('FALTA_JUSTIFICADA', 'Falta justificada')], max_length=20)),
+                ('permiso_asistencia_id', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Registro de Asistencia Archivado',
+                'verbose_name_plural': 'Registros de Asistencia Archivados',
+                'indexes': [models.Index(fields=['estudiante_id', 'sesion_id'], include=('estado',), name='registro_archivado_est_idx'), models.Index(fields=['gestion'], name='registro_archivado_gestion_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SesionClaseArchivada',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('gestion', models.CharField(max_length=10)),
+                ('materia_semestre_id', models.IntegerField()),
+                ('fecha', models.DateField()),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('tema', models.CharField(blank=True, max_length=200, null=True)),
+            ],
+            options={
+                'verbose_name': 'Sesión de Clase Archivada',
+                'verbose_name_plural': 'Sesiones de Clase Archivadas',
+                'indexes': [models.Index(fields=['materia_semestre_id', '-fecha'], name='sesion_archivada_materia_idx'), models.Index(fields=['gestion'], name='sesion_archivada_gestion_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenAsistenciaArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gestion', models.CharField(max_length=10)),
+                ('total_sesiones', models.PositiveIntegerField(default=0)),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('retrasos', models.PositiveIntegerField(default=0)),
+                ('faltas', models.PositiveIntegerField(default=0)),
+                ('faltas_justificadas', models.PositiveIntegerField(default=0)),
+                ('sin_registro', models.PositiveIntegerField(default=0)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_archivados', to='gestion_academica.estudiante')),
+                ('materia_semestre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_estudiantes_archivados', to='gestion_academica.materiasemestre')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Asistencia Archivado',
+                'verbose_name_plural': 'Resúmenes de Asistencia Archivados',
+                'indexes': [models.Index(fields=['gestion'], name='resumen_archivado_gestion_idx')],
+                'unique_together': {('estudiante', 'materia_semestre')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenMateriaArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gestion', models.CharField(max_length=10)),
+                ('total_sesiones', models.PositiveIntegerField(default=0)),
+                ('total_estudiantes', models.PositiveIntegerField(default=0)),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('retrasos', models.PositiveIntegerField(default=0)),
+                ('faltas', models.PositiveIntegerField(default=0)),
+                ('faltas_justificadas', models.PositiveIntegerField(default=0)),
+                ('materia_semestre', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_archivado', to='gestion_academica.materiasemestre')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Materia Archivado',
+                'verbose_name_plural': 'Resúmenes de Materia Archivados',
+                'indexes': [models.Index(fields=['gestion'], name='resumen_materia_gestion_idx')],
+            },
+        ),
+    ]
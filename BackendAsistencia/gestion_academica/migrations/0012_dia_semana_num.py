@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+NUMERO_DIA = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3,
+    'viernes': 4, 'sabado': 5, 'domingo': 6,
+}
+
+
+def llenar_dia_semana_num(apps, schema_editor):
+    MateriaSemestre = apps.get_model('gestion_academica', 'MateriaSemestre')
+    # Una actualización por cada forma distinta de escribir el día
+    for nombre in MateriaSemestre.objects.values_list('dia_semana', flat=True).distinct():
+        normalizado = (nombre or '').strip().lower().replace('á', 'a').replace('é', 'e')
+        if normalizado in NUMERO_DIA:
+            MateriaSemestre.objects.filter(dia_semana=nombre).update(dia_semana_num=NUMERO_DIA[normalizado])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0011_archivo_gestiones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materiasemestre',
+            name='dia_semana_num',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], editable=False, null=True),
+        ),
+        migrations.RunPython(llenar_dia_semana_num, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='materiasemestre',
+            index=models.Index(fields=['dia_semana_num', 'hora_inicio'], include=('hora_fin',), name='materia_semestre_horario_idx'),
+        ),
+    ]
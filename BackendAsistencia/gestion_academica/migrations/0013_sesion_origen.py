@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0012_dia_semana_num'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesionclase',
+            name='origen',
+            field=models.CharField(choices=[('DOCENTE', 'Creada por el docente'), ('AUTOMATICA', 'Creada por el programador de sesiones')], default='DOCENTE', max_length=10),
+        ),
+    ]
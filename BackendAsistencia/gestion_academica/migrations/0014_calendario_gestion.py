@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0013_sesion_origen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioGestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gestion', models.CharField(max_length=10, unique=True)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('fecha_generacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Calendario de Gestión',
+                'verbose_name_plural': 'Calendarios de Gestión',
+                'ordering': ['-fecha_inicio'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='sesionclase',
+            name='origen',
+            field=models.CharField(choices=[('DOCENTE', 'Creada por el docente'), ('AUTOMATICA', 'Creada por el programador de sesiones'), ('PLANIFICADA', 'Planificada (aún no iniciada)')], default='DOCENTE', max_length=11),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0014_calendario_gestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroasistencia',
+            name='materializado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='sesionclase',
+            name='cerrada',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='sesionclase',
+            index=models.Index(condition=models.Q(('cerrada', False)), fields=['fecha', 'hora_fin'], name='sesion_por_cerrar_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Func, IntegerField, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+
+ESTADOS = {
+    'presentes': 'PRESENTE',
+    'retrasos': 'RETRASO',
+    'faltas': 'FALTA',
+    'faltas_justificadas': 'FALTA_JUSTIFICADA',
+}
+
+
+def llenar_contadores(apps, schema_editor):
+    # Misma cuenta que contadores.recalcular_contadores, con los modelos históricos
+    SesionClase = apps.get_model('gestion_academica', 'SesionClase')
+    RegistroAsistencia = apps.get_model('gestion_academica', 'RegistroAsistencia')
+    Estudiante = apps.get_model('gestion_academica', 'Estudiante')
+    Inscripcion = apps.get_model('gestion_academica', 'Inscripcion')
+
+    def contar(queryset):
+        return Coalesce(Subquery(
+            queryset.order_by().annotate(total=Func(F('id'), function='COUNT', output_field=IntegerField())).values('total')
+        ), 0)
+
+    registros = RegistroAsistencia.objects.filter(sesion_id=OuterRef('pk'))
+    if getattr(settings, 'ROSTER_FUENTE', 'cohorte') == 'inscripcion':
+        plantel = Inscripcion.objects.filter(materia_semestre_id=OuterRef('materia_semestre_id'))
+    else:
+        plantel = Estudiante.objects.filter(
+            semestre_actual__materias_ofrecidas__id=OuterRef('materia_semestre_id'),
+            carrera_id=F('semestre_actual__carrera_id'),
+        )
+    contadores = {campo: contar(registros.filter(estado=estado)) for campo, estado in ESTADOS.items()}
+    contadores['total_estudiantes'] = Case(When(cerrada=True, then=contar(registros)), default=contar(plantel))
+    SesionClase.objects.update(**contadores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0015_cierre_sesiones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesionclase',
+            name='faltas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sesionclase',
+            name='faltas_justificadas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sesionclase',
+            name='presentes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sesionclase',
+            name='retrasos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sesionclase',
+            name='total_estudiantes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(llenar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0016_contadores_sesion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrera',
+            name='tolerancia_minutos',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='materiasemestre',
+            name='tolerancia_minutos',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0017_tolerancia_asistencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='permisoasistencia',
+            name='fecha_inicio',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
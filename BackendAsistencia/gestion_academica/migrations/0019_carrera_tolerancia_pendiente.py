@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0018_permiso_fecha_inicio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrera',
+            name='tolerancia_pendiente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0019_carrera_tolerancia_pendiente'),
+    ]
+
+    operations = [
+        # El índice único de unique_together (estudiante, sesion) ya sirve al historial del estudiante
+        migrations.RemoveIndex(
+            model_name='registroasistencia',
+            name='registro_estudiante_cov_idx',
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academica', '0020_quitar_registro_estudiante_cov_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='permisoasistenciaarchivado',
+            name='administrador_aprobador_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='permisoasistenciaarchivado',
+            name='estudiante_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='permisoasistenciaarchivado',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='registroasistenciaarchivado',
+            name='estudiante_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='registroasistenciaarchivado',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='registroasistenciaarchivado',
+            name='permiso_asistencia_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='registroasistenciaarchivado',
+            name='sesion_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='sesionclasearchivada',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='sesionclasearchivada',
+            name='materia_semestre_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
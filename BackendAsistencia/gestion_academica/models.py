@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
 from django.utils import timezone
@@ -54,6 +55,10 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
 class Carrera(models.Model):
     # Django automáticamente añade un campo 'id' como clave primaria autoincremental
     nombre = models.CharField(max_length=100, unique=True)
+    # Minutos de tolerancia para marcar PRESENTE; vacío usa ASISTENCIA_TOLERANCIA_MINUTOS
+    tolerancia_minutos = models.PositiveSmallIntegerField(null=True, blank=True)
+    # La tolerancia cambió y falta reclasificar sus materias (recalcular_tolerancia --pendientes)
+    tolerancia_pendiente = models.BooleanField(default=False, editable=False)
     class Meta:
         verbose_name = "Carrera"
         verbose_name_plural = "Carreras"
@@ -101,6 +106,10 @@ class Estudiante(models.Model):
         verbose_name = "Estudiante"
         verbose_name_plural = "Estudiantes"
         ordering = ['usuario__apellido', 'usuario__nombre'] # Ordenar por nombre del usuario asociado
+        indexes = [
+            # Plantel de una materia: estudiantes de la carrera y semestre
+            models.Index(fields=['carrera', 'semestre_actual'], include=['usuario', 'codigo_institucional'], name='estudiante_cohorte_idx'),
+        ]
 
     def __str__(self):
         return self.usuario.get_full_name() # Uso del método get_full_name del Usuario
@@ -129,13 +138,48 @@ class Administrador(models.Model):
     def __str__(self):
         return f'Admin: {self.usuario.get_full_name()}'
 
+# Número de día igual a date.weekday(): 0 = lunes ... 6 = domingo
+DIAS_SEMANA = (
+    (0, 'Lunes'),
+    (1, 'Martes'),
+    (2, 'Miércoles'),
+    (3, 'Jueves'),
+    (4, 'Viernes'),
+    (5, 'Sábado'),
+    (6, 'Domingo'),
+)
+_NUMERO_DIA = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3,
+    'viernes': 4, 'sabado': 5, 'domingo': 6,
+}
+
+
+def numero_dia_semana(nombre):
+    """'Miércoles', 'miercoles', ' MIÉRCOLES ' -> 2. None si no es un día válido."""
+    if not nombre:
+        return None
+    normalizado = nombre.strip().lower()
+    for con_tilde, sin_tilde in (('á', 'a'), ('é', 'e')):
+        normalizado = normalizado.replace(con_tilde, sin_tilde)
+    return _NUMERO_DIA.get(normalizado)
+
+
+def tolerancia_global():
+    """Minutos de tolerancia cuando ni la materia ni la carrera definen uno."""
+    return getattr(settings, 'ASISTENCIA_TOLERANCIA_MINUTOS', RegistroAsistencia.TOLERANCIA_MINUTOS)
+
+
 class MateriaSemestre(models.Model):
     materia = models.ForeignKey(Materia, on_delete=models.CASCADE, related_name='materias_por_semestre')
     semestre = models.ForeignKey(Semestre, on_delete=models.CASCADE, related_name='materias_ofrecidas')
     gestion = models.CharField(max_length=10)  # Ejemplo: "2025/1", "II-2024"
     dia_semana = models.CharField(max_length=10)  # "lunes", "martes", etc.
+    # Se deriva de dia_semana al guardar; es lo que usan las comparaciones de horario
+    dia_semana_num = models.PositiveSmallIntegerField(choices=DIAS_SEMANA, null=True, blank=True, editable=False)
     hora_inicio = models.TimeField()
     hora_fin = models.TimeField()
+    # Minutos de tolerancia para marcar PRESENTE; vacío usa la de la carrera
+    tolerancia_minutos = models.PositiveSmallIntegerField(null=True, blank=True)
 
     class Meta:
         verbose_name = "Materia por Semestre"
@@ -143,11 +187,29 @@ class MateriaSemestre(models.Model):
         # Asegurar que una materia no se ofrezca en el mismo semestre, gestión y hora de inicio con el mismo día
         unique_together = ('materia', 'semestre', 'gestion', 'hora_inicio', 'hora_fin')
         ordering = ['semestre', 'materia__nombre', 'dia_semana', 'hora_inicio']
+        indexes = [
+            # Horario semanal (ver horarios.py)
+            models.Index(fields=['dia_semana_num', 'hora_inicio'], include=['hora_fin'], name='materia_semestre_horario_idx'),
+        ]
 
 
     def __str__(self):
         return f'{self.materia.nombre} - {self.semestre.nombre} ({self.gestion}) - {self.dia_semana} {self.hora_inicio}-{self.hora_fin}'
 
+    def tolerancia_efectiva(self):
+        """Tolerancia de la materia, si no la de su carrera y si no la global."""
+        if self.tolerancia_minutos is not None:
+            return self.tolerancia_minutos
+        carrera_tolerancia = self.semestre.carrera.tolerancia_minutos
+        return carrera_tolerancia if carrera_tolerancia is not None else tolerancia_global()
+
+    def save(self, *args, **kwargs):
+        self.dia_semana_num = numero_dia_semana(self.dia_semana)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'dia_semana' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'dia_semana_num'}
+        super().save(*args, **kwargs)
+
 class DocenteMateriaSemestre(models.Model):
     docente = models.ForeignKey(Docente, on_delete=models.CASCADE, related_name='asignaciones')
     materia_semestre = models.ForeignKey(MateriaSemestre, on_delete=models.CASCADE, related_name='docentes_asignados')
@@ -161,6 +223,15 @@ class DocenteMateriaSemestre(models.Model):
     def __str__(self):
         return f'{self.docente.usuario.get_full_name()} asignado a {self.materia_semestre}'
 
+class SesionClaseQuerySet(models.QuerySet):
+    def realizadas(self):
+        """Sesiones abiertas (por el docente o el programador); excluye las solo planificadas."""
+        return self.exclude(origen='PLANIFICADA')
+
+    def planificadas(self):
+        return self.filter(origen='PLANIFICADA')
+
+
 class SesionClase(models.Model):
     materia_semestre = models.ForeignKey(MateriaSemestre, on_delete=models.CASCADE, related_name='sesiones_clase')
     fecha = models.DateField()
@@ -168,15 +239,55 @@ class SesionClase(models.Model):
     hora_fin = models.TimeField()
     tema = models.CharField(max_length=200, blank=True, null=True)
 
+    ORIGEN_CHOICES = (
+        ('DOCENTE', 'Creada por el docente'),
+        ('AUTOMATICA', 'Creada por el programador de sesiones'),
+        # Generada con el calendario de la gestión; pasa a DOCENTE o AUTOMATICA al abrirse
+        ('PLANIFICADA', 'Planificada (aún no iniciada)'),
+    )
+    origen = models.CharField(max_length=11, choices=ORIGEN_CHOICES, default='DOCENTE')
+    # La cierra `manage.py cerrar_sesiones` al pasar hora_fin: desde entonces
+    # cada estudiante del plantel tiene su RegistroAsistencia (ver cierre.py)
+    cerrada = models.BooleanField(default=False)
+
+    # Contadores de asistencia de la sesión, mantenidos al escribir los registros (ver contadores.py)
+    presentes = models.PositiveIntegerField(default=0, editable=False)
+    retrasos = models.PositiveIntegerField(default=0, editable=False)
+    faltas = models.PositiveIntegerField(default=0, editable=False)
+    faltas_justificadas = models.PositiveIntegerField(default=0, editable=False)
+    total_estudiantes = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = SesionClaseQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Sesión de Clase"
         verbose_name_plural = "Sesiones de Clase"
         unique_together = ('materia_semestre', 'fecha')
         ordering = ['fecha', 'hora_inicio']
+        indexes = [
+            # Orden del cursor de paginación
+            models.Index(fields=['-fecha', '-hora_inicio', '-id'], name='sesion_cursor_idx'),
+            # Sesión activa de una materia: la ventana horaria se lee del índice
+            models.Index(fields=['materia_semestre', 'fecha', 'hora_inicio'], include=['hora_fin'], name='sesion_activa_idx'),
+            # Sesiones pendientes de cierre
+            models.Index(fields=['fecha', 'hora_fin'], condition=models.Q(cerrada=False), name='sesion_por_cerrar_idx'),
+        ]
 
     def __str__(self):
         return f'Sesión de {self.materia_semestre} el {self.fecha} de {self.hora_inicio} a {self.hora_fin}'
 
+    CAMPOS_CONTADORES = ('presentes', 'retrasos', 'faltas', 'faltas_justificadas', 'total_estudiantes')
+
+    def save(self, *args, **kwargs):
+        # Los contadores solo se escriben con UPDATE atómicos (contadores.py): un
+        # save() completo pisaría los incrementos concurrentes con valores viejos
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_CONTADORES
+            ]
+        super().save(*args, **kwargs)
+
 class CredencialQR(models.Model):
     estudiante = models.OneToOneField(Estudiante, on_delete=models.CASCADE, related_name='credencial_qr')
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True) # UUID es un identificador único universal
@@ -209,7 +320,7 @@ class PermisoAsistencia(models.Model):
     estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='PENDIENTE')
     
     fecha_solicitud = models.DateTimeField(auto_now_add=True)
-    fecha_inicio = models.DateField(default=timezone.now)
+    fecha_inicio = models.DateField(default=timezone.localdate)
     fecha_fin = models.DateField(null=True, blank=True) 
 
     sesiones_cubiertas = models.ManyToManyField(
@@ -222,6 +333,12 @@ class PermisoAsistencia(models.Model):
         verbose_name = "Permiso de Asistencia"
         verbose_name_plural = "Permisos de Asistencia"
         ordering = ['-fecha_solicitud']
+        indexes = [
+            models.Index(fields=['-fecha_solicitud', '-id'], name='permiso_cursor_idx'),
+            models.Index(fields=['estudiante', 'estado'], name='permiso_estudiante_estado_idx'),
+            # Bandeja de permisos pendientes del administrador
+            models.Index(fields=['-fecha_solicitud'], condition=models.Q(estado='PENDIENTE'), name='permiso_pendiente_idx'),
+        ]
 
     def __str__(self):
         return f'Permiso de {self.estudiante.usuario.get_full_name()} ({self.estado}) desde {self.fecha_inicio}'
@@ -250,18 +367,31 @@ class RegistroAsistencia(models.Model):
         null=True, blank=True,    # Puede ser nulo (no todos los registros tienen un permiso asociado)
         related_name='registros_asociados'
     )
+    # Falta insertada al cerrar la sesión (no hubo escaneo): fecha_registro es la del cierre
+    materializado = models.BooleanField(default=False)
 
     class Meta:
         verbose_name = "Registro de Asistencia"
         verbose_name_plural = "Registros de Asistencia"
-        # Un estudiante solo puede tener un registro por sesión de clase
+        # Un estudiante solo puede tener un registro por sesión de clase; su
+        # índice también sirve al historial de un estudiante por materia
         unique_together = ('estudiante', 'sesion')
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['-fecha_registro', '-id'], name='registro_cursor_idx'),
+            # Conteos por estado de una sesión (resúmenes, matriz de asistencia)
+            models.Index(fields=['sesion', 'estado'], include=['estudiante'], name='registro_sesion_estado_idx'),
+        ]
 
     # Método para calcular el estado, útil para establecer el campo 'estado'
-    # tolerancia_minutos=15: El estudiante puede registrarse hasta 15 minutos después
-    # de que inicie la sesión y se considerará "PRESENTE", después será "RETRASO"
-    def _calcular_estado_asistencia_basado_en_hora(self, tolerancia_minutos=15):
+    # tolerancia_minutos: El estudiante puede registrarse hasta esos minutos después
+    # de que inicie la sesión y se considerará "PRESENTE", después será "RETRASO".
+    # Por defecto, la de la materia, la de su carrera o la global (15 si no se configura)
+    TOLERANCIA_MINUTOS = 15
+
+    def _calcular_estado_asistencia_basado_en_hora(self, tolerancia_minutos=None):
+        if tolerancia_minutos is None:
+            tolerancia_minutos = self.sesion.materia_semestre.tolerancia_efectiva()
         # La hora de inicio programada está en la sesión específica
         hora_inicio_sesion = self.sesion.hora_inicio
         
@@ -312,7 +442,7 @@ class RegistroAsistencia(models.Model):
                 return
 
         # Si no hay permiso o no lo cubre/aprueba, calcula el estado basado en el registro
-        if self.fecha_registro: # Si hay un registro real
+        if self.fecha_registro and not self.materializado: # Si hay un registro real
             try:
                 self.estado = self._calcular_estado_asistencia_basado_en_hora()
                 print(f"Estado calculado: {self.estado} para registro {self.id}")
@@ -378,6 +508,11 @@ class Reporte(models.Model):
     # 👇 Cambio clave: FileField en lugar de URLField
     archivo_pdf = models.FileField(upload_to='reportes/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-fecha_generacion', '-id'], name='reporte_cursor_idx'),
+        ]
+
     def __str__(self):
         generador = "Desconocido"
         if self.generado_por_docente:
@@ -406,6 +541,25 @@ class Inscripcion(models.Model):
     def __str__(self):
         return f"{self.estudiante} inscrito en {self.materia_semestre}"
 
+class CalendarioGestion(models.Model):
+    """Rango de fechas de clases de una gestión (ver calendario.py)."""
+    gestion = models.CharField(max_length=10, unique=True)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    fecha_generacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Calendario de Gestión"
+        verbose_name_plural = "Calendarios de Gestión"
+        ordering = ['-fecha_inicio']
+
+    def __str__(self):
+        return f'Gestión {self.gestion}: {self.fecha_inicio} a {self.fecha_fin}'
+
+    def clean(self):
+        if self.fecha_inicio and self.fecha_fin and self.fecha_inicio > self.fecha_fin:
+            raise ValidationError('La fecha de inicio debe ser anterior a la fecha de fin.')
+
 class DiaEspecial(models.Model):
     fecha = models.DateField(unique=True)
     tipo = models.CharField(max_length=20, choices=[
@@ -422,6 +576,10 @@ class DiaEspecial(models.Model):
         verbose_name = "Día Especial"
         verbose_name_plural = "Días Especiales"
         ordering = ['-fecha']
+        indexes = [
+            # Solo los días que afectan la asistencia (es_dia_especial, rangos)
+            models.Index(fields=['fecha'], condition=models.Q(afecta_asistencia=True), name='dia_especial_afecta_idx'),
+        ]
 
     def __str__(self):
         return f"{self.fecha} - {self.get_tipo_display()}: {self.descripcion}"
@@ -442,3 +600,132 @@ class DiaEspecial(models.Model):
             fecha__lte=fecha_fin,
             afecta_asistencia=True
         ).values_list('fecha', flat=True)
+
+
+# ----------------------------------------------------------------------
+# Archivo de gestiones cerradas (ver archivo.py)
+# ----------------------------------------------------------------------
+class GestionArchivada(models.Model):
+    gestion = models.CharField(max_length=10, unique=True)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    # False mientras quedan filas por mover a las tablas de archivo
+    completada = models.BooleanField(default=False)
+    sesiones = models.PositiveIntegerField(default=0)
+    registros = models.PositiveIntegerField(default=0)
+    permisos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Gestión Archivada"
+        verbose_name_plural = "Gestiones Archivadas"
+        ordering = ['-gestion']
+
+    def __str__(self):
+        return f'Gestión {self.gestion} archivada ({"completa" if self.completada else "en proceso"})'
+
+
+class ResumenAsistenciaArchivado(models.Model):
+    """Totales congelados de un estudiante en una MateriaSemestre de una gestión archivada."""
+    gestion = models.CharField(max_length=10)
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='resumenes_archivados')
+    materia_semestre = models.ForeignKey(MateriaSemestre, on_delete=models.CASCADE, related_name='resumenes_estudiantes_archivados')
+    total_sesiones = models.PositiveIntegerField(default=0)
+    presentes = models.PositiveIntegerField(default=0)
+    retrasos = models.PositiveIntegerField(default=0)
+    faltas = models.PositiveIntegerField(default=0)
+    faltas_justificadas = models.PositiveIntegerField(default=0)
+    # Sesiones en las que el estudiante no tiene registro (el historial las muestra como FALTA)
+    sin_registro = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumen de Asistencia Archivado"
+        verbose_name_plural = "Resúmenes de Asistencia Archivados"
+        unique_together = ('estudiante', 'materia_semestre')
+        indexes = [
+            models.Index(fields=['gestion'], name='resumen_archivado_gestion_idx'),
+        ]
+
+    def __str__(self):
+        return f'Resumen {self.gestion} de {self.estudiante_id} en {self.materia_semestre_id}'
+
+
+class ResumenMateriaArchivado(models.Model):
+    """Totales congelados de una MateriaSemestre de una gestión archivada."""
+    gestion = models.CharField(max_length=10)
+    materia_semestre = models.OneToOneField(MateriaSemestre, on_delete=models.CASCADE, related_name='resumen_archivado')
+    total_sesiones = models.PositiveIntegerField(default=0)
+    total_estudiantes = models.PositiveIntegerField(default=0)
+    presentes = models.PositiveIntegerField(default=0)
+    retrasos = models.PositiveIntegerField(default=0)
+    faltas = models.PositiveIntegerField(default=0)
+    faltas_justificadas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumen de Materia Archivado"
+        verbose_name_plural = "Resúmenes de Materia Archivados"
+        indexes = [
+            models.Index(fields=['gestion'], name='resumen_materia_gestion_idx'),
+        ]
+
+    def __str__(self):
+        return f'Resumen {self.gestion} de {self.materia_semestre_id}'
+
+
+# Copias compactas de las filas crudas: sin claves foráneas ni índices salvo
+# los que usan las lecturas de historial. Los ids son los originales, así que
+# son bigint como los de BigAutoField.
+class SesionClaseArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    gestion = models.CharField(max_length=10)
+    materia_semestre_id = models.BigIntegerField()
+    fecha = models.DateField()
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    tema = models.CharField(max_length=200, blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Sesión de Clase Archivada"
+        verbose_name_plural = "Sesiones de Clase Archivadas"
+        indexes = [
+            models.Index(fields=['materia_semestre_id', '-fecha'], name='sesion_archivada_materia_idx'),
+            models.Index(fields=['gestion'], name='sesion_archivada_gestion_idx'),
+        ]
+
+
+class RegistroAsistenciaArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    gestion = models.CharField(max_length=10)
+    estudiante_id = models.BigIntegerField()
+    sesion_id = models.BigIntegerField()
+    fecha_registro = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=RegistroAsistencia.ESTADO_CHOICES)
+    permiso_asistencia_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Registro de Asistencia Archivado"
+        verbose_name_plural = "Registros de Asistencia Archivados"
+        indexes = [
+            models.Index(fields=['estudiante_id', 'sesion_id'], include=['estado'], name='registro_archivado_est_idx'),
+            models.Index(fields=['gestion'], name='registro_archivado_gestion_idx'),
+        ]
+
+
+class PermisoAsistenciaArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    gestion = models.CharField(max_length=10)
+    estudiante_id = models.BigIntegerField()
+    administrador_aprobador_id = models.BigIntegerField(null=True, blank=True)
+    motivo = models.TextField()
+    archivo_justificacion = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=10, choices=PermisoAsistencia.ESTADO_CHOICES)
+    fecha_solicitud = models.DateTimeField()
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField(null=True, blank=True)
+    sesiones_cubiertas = models.JSONField(default=list)  # ids de SesionClaseArchivada
+
+    class Meta:
+        verbose_name = "Permiso de Asistencia Archivado"
+        verbose_name_plural = "Permisos de Asistencia Archivados"
+        indexes = [
+            models.Index(fields=['estudiante_id'], name='permiso_archivado_est_idx'),
+            models.Index(fields=['gestion'], name='permiso_archivado_gestion_idx'),
+        ]
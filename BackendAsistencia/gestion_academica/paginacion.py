@@ -0,0 +1,49 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+def paginacion_desactivada(request):
+    """
+    Modo compatibilidad para los clientes que esperan una lista plana:
+    cabecera `X-Paginacion: desactivada` o parámetro `?paginacion=desactivada`.
+    """
+    valor = request.headers.get('X-Paginacion') or request.query_params.get('paginacion')
+    return (valor or '').lower() == 'desactivada'
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor para todos los ViewSets.
+
+    Cada ViewSet puede declarar `ordering_cursor` con un orden estable (el
+    primer campo debe ser un atributo directo del modelo y estar indexado).
+    En modo compatibilidad se devuelve una lista plana, pero nunca más de
+    `max_sin_paginar` elementos.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+    max_sin_paginar = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering_cursor', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.sin_paginar = paginacion_desactivada(request)
+        if not self.sin_paginar:
+            return super().paginate_queryset(queryset, request, view)
+
+        # Se pide un elemento extra solo para saber si la lista fue truncada
+        resultados = list(queryset[:self.max_sin_paginar + 1])
+        self.truncado = len(resultados) > self.max_sin_paginar
+        return resultados[:self.max_sin_paginar]
+
+    def get_paginated_response(self, data):
+        if not self.sin_paginar:
+            return super().get_paginated_response(data)
+        headers = {'X-Resultados-Truncados': 'true'} if self.truncado else None
+        return Response(data, headers=headers)
@@ -0,0 +1,331 @@
+"""
+Particionado declarativo (PostgreSQL) de RegistroAsistencia por gestión.
+
+Es opcional: la tabla se convierte con `manage.py particionar_registros
+convertir` y el ORM no cambia (el nombre de la tabla es el mismo). Cada
+partición cubre un rango de fecha_registro igual a una gestión:
+
+    'AAAA/1' -> [AAAA-01-01, AAAA-07-01)
+    'AAAA/2' -> [AAAA-07-01, AAAA+1-01-01)
+
+Hay además una partición por defecto para las filas fuera de los rangos.
+
+Limitaciones de PostgreSQL en una tabla particionada:
+- La clave primaria pasa a ser (id, fecha_registro); el id sigue saliendo de
+  una secuencia, así que en la práctica sigue siendo único.
+- Un índice único sobre (estudiante, sesion) no puede ser global porque no
+  incluye fecha_registro. La unicidad la mantiene una tabla de guarda sin
+  particionar (GUARDA, clave primaria (estudiante_id, sesion_id)) que un
+  trigger actualiza en cada INSERT / UPDATE / DELETE: un par repetido, aunque
+  llegue de una transacción concurrente, falla con unique_violation
+  (IntegrityError), igual que antes. ON CONFLICT DO NOTHING no atrapa ese
+  error; las inserciones en bloque usan `insertar_registros`.
+- El planificador solo descarta particiones cuando la consulta filtra por
+  fecha_registro; las demás recorren el índice de cada partición.
+"""
+from datetime import datetime
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import RegistroAsistencia
+
+TABLA = RegistroAsistencia._meta.db_table
+PARTICION_DEFECTO = f'{TABLA}_defecto'
+GUARDA = f'{TABLA}_par_unico'
+FUNCION_GUARDA = f'{TABLA}_guarda_par'
+
+_SQL_FUNCION_GUARDA = """
+    CREATE OR REPLACE FUNCTION {funcion}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            TRUNCATE {guarda};
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            DELETE FROM {guarda} WHERE estudiante_id = OLD.estudiante_id AND sesion_id = OLD.sesion_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            -- Espera a la transacción que insertó el mismo par; si confirma, el par ya existe
+            INSERT INTO {guarda} (estudiante_id, sesion_id) VALUES (NEW.estudiante_id, NEW.sesion_id)
+            ON CONFLICT DO NOTHING;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'Ya existe un registro del estudiante % en la sesión %',
+                    NEW.estudiante_id, NEW.sesion_id
+                    USING ERRCODE = 'unique_violation', CONSTRAINT = '{guarda_pk}';
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+class ErrorParticionado(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Gestiones
+# ----------------------------------------------------------------------
+def parsear_gestion(gestion):
+    """'2025/1' -> (2025, 1)."""
+    try:
+        anio, periodo = (int(p) for p in gestion.split('/'))
+    except (AttributeError, ValueError):
+        raise ErrorParticionado(f'Gestión inválida: {gestion!r} (formato AAAA/1 o AAAA/2)')
+    if periodo not in (1, 2):
+        raise ErrorParticionado(f'Gestión inválida: {gestion!r} (el periodo es 1 o 2)')
+    return anio, periodo
+
+
+def gestion_de_fecha(fecha):
+    return f'{fecha.year}/{1 if fecha.month < 7 else 2}'
+
+
+def siguiente_gestion(gestion):
+    anio, periodo = parsear_gestion(gestion)
+    return f'{anio}/2' if periodo == 1 else f'{anio + 1}/1'
+
+
+def rango_gestion(gestion):
+    """Límites [inicio, fin) de la gestión como datetimes en la zona horaria local."""
+    anio, periodo = parsear_gestion(gestion)
+    inicio = datetime(anio, 1 if periodo == 1 else 7, 1)
+    fin = datetime(anio, 7, 1) if periodo == 1 else datetime(anio + 1, 1, 1)
+    return timezone.make_aware(inicio), timezone.make_aware(fin)
+
+
+def nombre_particion(gestion):
+    anio, periodo = parsear_gestion(gestion)
+    return f'{TABLA}_{anio}_{periodo}'
+
+
+# ----------------------------------------------------------------------
+# Consultas al catálogo
+# ----------------------------------------------------------------------
+def _verificar_postgres():
+    if connection.vendor != 'postgresql':
+        raise ErrorParticionado('El particionado solo está disponible con PostgreSQL')
+
+
+def esta_particionada():
+    _verificar_postgres()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(%s)", [TABLA]
+        )
+        fila = cursor.fetchone()
+    return fila is not None and fila[0] == 'p'
+
+
+def particiones():
+    """Lista de (nombre, límites, filas estimadas) de las particiones actuales."""
+    _verificar_postgres()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            [TABLA],
+        )
+        return cursor.fetchall()
+
+
+# ----------------------------------------------------------------------
+# Operaciones
+# ----------------------------------------------------------------------
+def convertir(gestiones_adelante=2):
+    """
+    Convierte la tabla actual en una tabla particionada con una partición por
+    gestión desde el primer registro hasta `gestiones_adelante` gestiones
+    después de la actual. Se ejecuta en una sola transacción.
+    """
+    if esta_particionada():
+        raise ErrorParticionado('La tabla ya está particionada')
+
+    q = connection.ops.quote_name
+    anterior = f'{TABLA}_sin_particionar'
+    with connection.cursor() as cursor:
+        # Comprueba ya las claves foráneas diferidas: con eventos pendientes no se puede eliminar la tabla
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'SELECT MIN(fecha_registro) FROM {q(TABLA)}')
+        primera = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(f'ALTER TABLE {q(TABLA)} RENAME TO {q(anterior)}')
+        cursor.execute(
+            f'CREATE TABLE {q(TABLA)} (LIKE {q(anterior)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (fecha_registro)'
+        )
+
+        # El id sale de una secuencia propia que continúa la numeración actual
+        # (la secuencia o identity anterior pertenece a la tabla que se elimina)
+        secuencia = f'{TABLA}_particionada_id_seq'
+        cursor.execute(f'CREATE SEQUENCE {q(secuencia)} OWNED BY {q(TABLA)}.id')
+        cursor.execute(
+            f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {q(anterior)}), 0) + 1, false)", [secuencia]
+        )
+        cursor.execute(f"ALTER TABLE {q(TABLA)} ALTER COLUMN id SET DEFAULT nextval(%s)", [secuencia])
+        cursor.execute(f'ALTER TABLE {q(TABLA)} ADD PRIMARY KEY (id, fecha_registro)')
+
+        gestion = gestion_de_fecha(timezone.localtime(primera))
+        ultima = gestion_de_fecha(timezone.localdate())
+        for _ in range(gestiones_adelante):
+            ultima = siguiente_gestion(ultima)
+        while True:
+            _crear_particion(cursor, gestion)
+            if gestion == ultima:
+                break
+            gestion = siguiente_gestion(gestion)
+        cursor.execute(f'CREATE TABLE {q(PARTICION_DEFECTO)} PARTITION OF {q(TABLA)} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {q(TABLA)} SELECT * FROM {q(anterior)}')
+        cursor.execute(f'DROP TABLE {q(anterior)}')
+        _crear_guarda(cursor)
+
+        # Claves foráneas e índices se recrean en la tabla particionada (y sus particiones)
+        for campo in RegistroAsistencia._meta.concrete_fields:
+            if campo.remote_field is None:
+                continue
+            destino = campo.related_model._meta
+            cursor.execute(
+                f'ALTER TABLE {q(TABLA)} ADD FOREIGN KEY ({q(campo.column)}) '
+                f'REFERENCES {q(destino.db_table)} ({q(destino.pk.column)}) DEFERRABLE INITIALLY DEFERRED'
+            )
+            cursor.execute(f'CREATE INDEX ON {q(TABLA)} ({q(campo.column)})')
+        # Reemplaza al índice único de (estudiante, sesion) en el historial de un estudiante
+        cursor.execute(f'CREATE INDEX ON {q(TABLA)} (estudiante_id, sesion_id)')
+
+    with connection.schema_editor(atomic=False) as editor:
+        for indice in RegistroAsistencia._meta.indexes:
+            editor.add_index(RegistroAsistencia, indice)
+
+
+def _crear_guarda(cursor):
+    """Tabla de guarda de (estudiante, sesion), llenada con los registros actuales, y sus triggers."""
+    q = connection.ops.quote_name
+    cursor.execute(
+        f'CREATE TABLE {q(GUARDA)} (estudiante_id bigint NOT NULL, sesion_id bigint NOT NULL, '
+        f'CONSTRAINT {q(GUARDA + "_pk")} PRIMARY KEY (estudiante_id, sesion_id))'
+    )
+    cursor.execute(f'INSERT INTO {q(GUARDA)} SELECT estudiante_id, sesion_id FROM {q(TABLA)}')
+    cursor.execute(_SQL_FUNCION_GUARDA.format(funcion=q(FUNCION_GUARDA), guarda=q(GUARDA), guarda_pk=GUARDA + '_pk'))
+    cursor.execute(
+        f'CREATE TRIGGER {q(FUNCION_GUARDA)} AFTER INSERT OR DELETE OR UPDATE OF estudiante_id, sesion_id '
+        f'ON {q(TABLA)} FOR EACH ROW EXECUTE FUNCTION {q(FUNCION_GUARDA)}()'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER {q(FUNCION_GUARDA + "_truncate")} AFTER TRUNCATE '
+        f'ON {q(TABLA)} FOR EACH STATEMENT EXECUTE FUNCTION {q(FUNCION_GUARDA)}()'
+    )
+
+
+def insertar_registros(registros):
+    """
+    bulk_create(ignore_conflicts=True) de RegistroAsistencia que también omite
+    los pares rechazados por la guarda de la tabla particionada: si un INSERT
+    concurrente la dispara, se descartan los pares que ya existen y se reintenta.
+    """
+    registros = list(registros)
+    while registros:
+        try:
+            with transaction.atomic():
+                return RegistroAsistencia.objects.bulk_create(registros, ignore_conflicts=True)
+        except IntegrityError:
+            existentes = set(RegistroAsistencia.objects.filter(
+                sesion_id__in={r.sesion_id for r in registros},
+                estudiante_id__in={r.estudiante_id for r in registros},
+            ).values_list('sesion_id', 'estudiante_id'))
+            pendientes = [r for r in registros if (r.sesion_id, r.estudiante_id) not in existentes]
+            if len(pendientes) == len(registros):
+                raise  # No era un par repetido
+            registros = pendientes
+    return []
+
+
+def _crear_particion(cursor, gestion):
+    q = connection.ops.quote_name
+    inicio, fin = rango_gestion(gestion)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {q(nombre_particion(gestion))} PARTITION OF {q(TABLA)} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [inicio, fin],
+    )
+
+
+def crear_particiones(gestiones_adelante=2):
+    """
+    Crea las particiones de la gestión actual y de las siguientes. Si la
+    partición por defecto ya tiene filas de ese rango, se mueven primero a la
+    partición nueva (si no, PostgreSQL rechaza la creación).
+    Retorna los nombres de las particiones creadas.
+    """
+    if not esta_particionada():
+        raise ErrorParticionado('La tabla no está particionada (ejecute primero "convertir")')
+
+    q = connection.ops.quote_name
+    existentes = {nombre for nombre, _, _ in particiones()}
+    creadas = []
+    gestion = gestion_de_fecha(timezone.localdate())
+    with connection.cursor() as cursor:
+        for _ in range(gestiones_adelante + 1):
+            nombre = nombre_particion(gestion)
+            if nombre not in existentes:
+                inicio, fin = rango_gestion(gestion)
+                cursor.execute(
+                    f'CREATE TABLE {q(nombre)} (LIKE {q(TABLA)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                )
+                cursor.execute(
+                    f'WITH movidas AS (DELETE FROM {q(PARTICION_DEFECTO)} '
+                    f'WHERE fecha_registro >= %s AND fecha_registro < %s RETURNING *) '
+                    f'INSERT INTO {q(nombre)} SELECT * FROM movidas',
+                    [inicio, fin],
+                )
+                cursor.execute(
+                    f'ALTER TABLE {q(TABLA)} ATTACH PARTITION {q(nombre)} FOR VALUES FROM (%s) TO (%s)',
+                    [inicio, fin],
+                )
+                # El DELETE de la partición por defecto quitó esos pares de la guarda
+                cursor.execute(
+                    f'INSERT INTO {q(GUARDA)} SELECT estudiante_id, sesion_id FROM {q(nombre)} '
+                    f'ON CONFLICT DO NOTHING'
+                )
+                creadas.append(nombre)
+            gestion = siguiente_gestion(gestion)
+    return creadas
+
+
+def desprender_particiones(antes_de, eliminar=False):
+    """
+    Desprende las particiones de las gestiones anteriores a `antes_de`. Las
+    tablas quedan como tablas normales (para archivarlas) salvo que se pida
+    eliminarlas. Retorna los nombres de las particiones afectadas.
+    """
+    if not esta_particionada():
+        raise ErrorParticionado('La tabla no está particionada')
+
+    q = connection.ops.quote_name
+    limite, _ = rango_gestion(antes_de)
+    afectadas = []
+    with connection.cursor() as cursor:
+        for nombre, _, _ in particiones():
+            if nombre == PARTICION_DEFECTO:
+                continue
+            anio, periodo = nombre.rsplit('_', 2)[-2:]
+            _, fin = rango_gestion(f'{anio}/{periodo}')
+            if fin > limite:
+                continue
+            # Los registros dejan de estar en la tabla: sus pares salen de la guarda
+            cursor.execute(
+                f'DELETE FROM {q(GUARDA)} g USING {q(nombre)} p '
+                f'WHERE g.estudiante_id = p.estudiante_id AND g.sesion_id = p.sesion_id'
+            )
+            cursor.execute(f'ALTER TABLE {q(TABLA)} DETACH PARTITION {q(nombre)}')
+            if eliminar:
+                cursor.execute(f'DROP TABLE {q(nombre)}')
+            afectadas.append(nombre)
+    return afectadas
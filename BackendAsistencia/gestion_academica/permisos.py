@@ -1,14 +1,16 @@
 # proyecto/permisos.py
 from rest_framework.permissions import BasePermission
 
+from .principal import obtener_principal
+
 class IsEstudiante(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'estudiante_perfil')
+        return obtener_principal(request).es_estudiante
 
 class IsDocente(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'docente_perfil')
+        return obtener_principal(request).es_docente
 
 class IsAdministrador(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'administrador_perfil')
\ No newline at end of file
+        return obtener_principal(request).es_administrador
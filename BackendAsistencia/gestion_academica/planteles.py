@@ -0,0 +1,91 @@
+"""
+Carga por lotes de los planteles (lista de estudiantes) de varias MateriaSemestre.
+
+La fuente se configura con settings.ROSTER_FUENTE:
+- 'cohorte': estudiantes de la carrera y semestre de la materia (comportamiento
+  original, no requiere inscripciones).
+- 'inscripcion': estudiantes inscritos en la materia (modelo Inscripcion).
+
+En ambos casos se hace una sola consulta para todas las materias.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Estudiante, Inscripcion, MateriaSemestre
+
+FUENTE_COHORTE = 'cohorte'
+FUENTE_INSCRIPCION = 'inscripcion'
+
+CAMPOS_ESTUDIANTE = ('id', 'codigo_institucional', 'usuario__nombre', 'usuario__apellido')
+# Orden de lista: el de los reportes y las pantallas del docente
+ORDEN_ESTUDIANTES = ('usuario__apellido', 'usuario__nombre', 'id')
+
+
+def fuente_planteles():
+    fuente = getattr(settings, 'ROSTER_FUENTE', FUENTE_COHORTE)
+    if fuente not in (FUENTE_COHORTE, FUENTE_INSCRIPCION):
+        raise ValueError(f'ROSTER_FUENTE desconocida: {fuente}')
+    return fuente
+
+
+def cargar_planteles(materias_semestre):
+    """
+    Retorna {materia_semestre_id: [estudiante, ...]} con cada estudiante como
+    diccionario de CAMPOS_ESTUDIANTE, por apellido y nombre. Las materias deben
+    traer su semestre cargado (select_related) para no consultar por cada una.
+    """
+    materias_semestre = list(materias_semestre)
+    planteles = {ms.id: [] for ms in materias_semestre}
+    if not materias_semestre:
+        return planteles
+
+    if fuente_planteles() == FUENTE_INSCRIPCION:
+        inscritos = Inscripcion.objects.filter(
+            materia_semestre_id__in=planteles
+        ).order_by(*(f'estudiante__{campo}' for campo in ORDEN_ESTUDIANTES)).values_list(
+            'materia_semestre_id', *(f'estudiante__{campo}' for campo in CAMPOS_ESTUDIANTE)
+        )
+        for materia_semestre_id, *valores in inscritos:
+            planteles[materia_semestre_id].append(dict(zip(CAMPOS_ESTUDIANTE, valores)))
+        return planteles
+
+    # Cohorte: una consulta por todos los semestres y agrupación por (carrera, semestre)
+    por_cohorte = defaultdict(list)
+    estudiantes = Estudiante.objects.filter(
+        semestre_actual_id__in={ms.semestre_id for ms in materias_semestre}
+    ).order_by(*ORDEN_ESTUDIANTES).values_list('carrera_id', 'semestre_actual_id', *CAMPOS_ESTUDIANTE)
+    for carrera_id, semestre_id, *valores in estudiantes:
+        por_cohorte[(carrera_id, semestre_id)].append(dict(zip(CAMPOS_ESTUDIANTE, valores)))
+
+    for ms in materias_semestre:
+        planteles[ms.id] = por_cohorte.get((ms.semestre.carrera_id, ms.semestre_id), [])
+    return planteles
+
+
+def materias_del_estudiante(estudiante):
+    """Queryset (sin evaluar) de las MateriaSemestre en cuyo plantel está el estudiante."""
+    if fuente_planteles() == FUENTE_INSCRIPCION:
+        return MateriaSemestre.objects.filter(inscripciones__estudiante_id=estudiante.id)
+    return MateriaSemestre.objects.filter(
+        semestre_id=estudiante.semestre_actual_id, semestre__carrera_id=estudiante.carrera_id
+    )
+
+
+def conteo_plantel(referencia='materia_semestre_id'):
+    """
+    Subconsulta con la cantidad de estudiantes del plantel de la
+    MateriaSemestre cuyo id es OuterRef(referencia); sirve para anotar o
+    actualizar muchas filas en una sola sentencia.
+    """
+    if fuente_planteles() == FUENTE_INSCRIPCION:
+        estudiantes = Inscripcion.objects.filter(materia_semestre_id=OuterRef(referencia))
+    else:
+        estudiantes = Estudiante.objects.filter(
+            semestre_actual__materias_ofrecidas__id=OuterRef(referencia),
+            carrera_id=F('semestre_actual__carrera_id'),
+        )
+    conteo = estudiantes.order_by().annotate(total=Func(F('id'), function='COUNT', output_field=IntegerField())).values('total')
+    return Coalesce(Subquery(conteo), 0)
@@ -0,0 +1,147 @@
+"""
+Roles y perfiles del usuario autenticado, resueltos una sola vez por petición.
+
+El access token lleva el claim `perfiles` ({rol: id de perfil}), así que para
+las peticiones con token no hace falta consultar Administrador / Docente /
+Estudiante. El refresh token no lleva roles: cada access token nuevo (login o
+/api/token/refresh/) los resuelve de nuevo, y un perfil eliminado deja de
+valer como mucho al vencer el access token. Con sesión (o tokens sin el
+claim) los perfiles se resuelven con una sola consulta y quedan guardados en
+la petición.
+"""
+from django.utils.functional import cached_property
+from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Administrador, Docente, DocenteMateriaSemestre, Estudiante, Usuario
+
+ADMINISTRADOR = 'administrador'
+DOCENTE = 'docente'
+ESTUDIANTE = 'estudiante'
+
+# Orden de precedencia del rol principal cuando un usuario tiene más de un perfil
+MODELOS_PERFIL = {
+    ADMINISTRADOR: Administrador,
+    DOCENTE: Docente,
+    ESTUDIANTE: Estudiante,
+}
+
+CLAIM_PERFILES = 'perfiles'
+
+
+def perfiles_de_usuario(usuario_id):
+    """{rol: id de perfil} del usuario, con una sola consulta sobre las tres relaciones."""
+    ids = Usuario.objects.filter(pk=usuario_id).values_list(
+        'administrador_perfil__id', 'docente_perfil__id', 'estudiante_perfil__id'
+    ).first() or (None, None, None)
+    return {rol: perfil_id for rol, perfil_id in zip(MODELOS_PERFIL, ids) if perfil_id is not None}
+
+
+class Principal:
+    """Usuario autenticado con sus perfiles ({rol: id}) y datos derivados perezosos."""
+
+    def __init__(self, usuario, perfiles=None):
+        self.usuario = usuario
+        self.perfiles = {
+            rol: perfil_id for rol, perfil_id in (perfiles or {}).items()
+            if rol in MODELOS_PERFIL and perfil_id is not None
+        }
+
+    @classmethod
+    def desde_usuario(cls, usuario):
+        if not usuario or not usuario.is_authenticated:
+            return cls(usuario)
+        return cls(usuario, perfiles_de_usuario(usuario.pk))
+
+    @property
+    def rol(self):
+        """Rol principal (según MODELOS_PERFIL) o None si el usuario no tiene perfil."""
+        return next((rol for rol in MODELOS_PERFIL if rol in self.perfiles), None)
+
+    @property
+    def es_administrador(self):
+        return ADMINISTRADOR in self.perfiles
+
+    @property
+    def es_docente(self):
+        return DOCENTE in self.perfiles
+
+    @property
+    def es_estudiante(self):
+        return ESTUDIANTE in self.perfiles
+
+    def perfil_id(self, rol):
+        return self.perfiles.get(rol)
+
+    def perfil(self, rol):
+        """
+        Instancia del perfil de `rol` (una consulta por rol, solo si se usa).
+        Si el token dice que existe pero ya se eliminó, responde 403.
+        """
+        if rol not in self._perfiles_cargados:
+            perfil_id = self.perfiles.get(rol)
+            self._perfiles_cargados[rol] = (
+                MODELOS_PERFIL[rol].objects.filter(pk=perfil_id).first() if perfil_id is not None else None
+            )
+        perfil = self._perfiles_cargados[rol]
+        if perfil is None:
+            raise PermissionDenied(f"El usuario no tiene un perfil de {rol}.")
+        return perfil
+
+    @cached_property
+    def _perfiles_cargados(self):
+        return {}
+
+    @cached_property
+    def materias_semestre_ids(self):
+        """Ids de las MateriaSemestre asignadas al docente (vacío si no es docente)."""
+        if not self.es_docente:
+            return frozenset()
+        return frozenset(
+            DocenteMateriaSemestre.objects.filter(
+                docente_id=self.perfiles[DOCENTE]
+            ).values_list('materia_semestre_id', flat=True)
+        )
+
+
+def obtener_principal(request):
+    """Retorna el Principal de la petición, calculándolo la primera vez."""
+    principal = getattr(request, '_principal', None)
+    if principal is not None:
+        return principal
+
+    token = getattr(request, 'auth', None)
+    perfiles = token.get(CLAIM_PERFILES) if hasattr(token, 'get') else None
+    if isinstance(perfiles, dict):
+        principal = Principal(request.user, perfiles)
+    else:
+        principal = Principal.desde_usuario(request.user)
+
+    request._principal = principal
+    return principal
+
+
+class RefreshConPerfiles(RefreshToken):
+    """RefreshToken sin roles: cada access token recibe los perfiles vigentes."""
+
+    def access_con_perfiles(self, perfiles):
+        access = super().access_token
+        access[CLAIM_PERFILES] = perfiles
+        return access
+
+    @property
+    def access_token(self):
+        return self.access_con_perfiles(perfiles_de_usuario(self[api_settings.USER_ID_CLAIM]))
+
+
+class RefreshConPerfilesSerializer(TokenRefreshSerializer):
+    """Serializer de /api/token/refresh/ (SIMPLE_JWT['TOKEN_REFRESH_SERIALIZER'])."""
+    token_class = RefreshConPerfiles
+
+
+def tokens_para_principal(principal):
+    """(refresh, access) del login; los perfiles ya resueltos van solo en el access token."""
+    refresh = RefreshConPerfiles.for_user(principal.usuario)
+    return refresh, refresh.access_con_perfiles(principal.perfiles)
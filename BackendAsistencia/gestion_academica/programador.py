@@ -0,0 +1,71 @@
+"""
+Creación automática de las sesiones del día según el horario semanal.
+
+`manage.py programar_sesiones` crea, en una sola sentencia, las SesionClase
+de las materias que están en clase o que empiezan en los próximos
+ANTICIPACION_MINUTOS (las mismas reglas que SesionClaseViewSet.create: no se
+crean sesiones en días especiales). Puede ejecutarse desde cron cada minuto
+o quedarse en un bucle con --bucle. Si una sesión ya existe (la creó el
+docente o una pasada anterior) se respeta gracias a unique_together.
+"""
+from django.db import transaction
+
+from .cache_respuestas import incrementar_version
+from .contadores import recalcular_contadores
+from .horarios import ANTICIPACION_MINUTOS, indice_horario
+from .matriz_asistencia import invalidar_matriz
+from .models import DiaEspecial, MateriaSemestre, SesionClase
+
+
+def crear_sesiones(momento, todo_el_dia=False, anticipacion=ANTICIPACION_MINUTOS):
+    """
+    Crea (o abre, si estaban planificadas) las sesiones que tocan en
+    `momento` (datetime local). Con `todo_el_dia` lo hace para todas las
+    materias del día. Retorna los ids de las MateriaSemestre afectadas.
+    """
+    fecha = momento.date()
+    if DiaEspecial.es_dia_especial(fecha):
+        return []
+
+    indice = indice_horario()
+    if todo_el_dia:
+        ids = indice.del_dia(momento.weekday())
+    else:
+        ids = set(indice.en_curso(momento)) | set(indice.proximas(momento, anticipacion))
+    if not ids:
+        return []
+
+    with transaction.atomic():
+        # Las planificadas del calendario se abren en lugar de crear otra
+        planificadas = SesionClase.objects.planificadas().filter(materia_semestre_id__in=ids, fecha=fecha)
+        abiertas = list(planificadas.values_list('materia_semestre_id', flat=True))
+        planificadas.update(origen='AUTOMATICA')
+
+        existentes = set(
+            SesionClase.objects.filter(materia_semestre_id__in=ids, fecha=fecha)
+            .values_list('materia_semestre_id', flat=True)
+        )
+        pendientes = list(
+            MateriaSemestre.objects.filter(id__in=ids).exclude(id__in=existentes)
+            .only('id', 'hora_inicio', 'hora_fin')
+        )
+        # ignore_conflicts: un docente pudo crear la misma sesión entre la consulta y el INSERT
+        SesionClase.objects.bulk_create([
+            SesionClase(
+                materia_semestre_id=ms.id,
+                fecha=fecha,
+                hora_inicio=ms.hora_inicio,
+                hora_fin=ms.hora_fin,
+                origen='AUTOMATICA',
+            )
+            for ms in pendientes
+        ], ignore_conflicts=True)
+
+    # bulk_create y update no emiten post_save: se invalida aquí lo que harían las señales
+    abiertas += [ms.id for ms in pendientes]
+    if abiertas:
+        recalcular_contadores(SesionClase.objects.filter(materia_semestre_id__in=abiertas, fecha=fecha))
+        incrementar_version('asistencia')
+        for materia_semestre_id in abiertas:
+            invalidar_matriz(materia_semestre_id)
+    return abiertas
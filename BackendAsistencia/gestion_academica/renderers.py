@@ -0,0 +1,73 @@
+"""
+Renderer y parser JSON basados en orjson.
+
+orjson serializa de forma nativa UUID y las subclases de dict/list que usa
+DRF (ReturnDict, ReturnList). Las fechas y horas se delegan al codificador de
+DRF (OPT_PASSTHROUGH_DATETIME), igual que lo que orjson no soporta (Decimal,
+textos perezosos, QuerySet, arreglos de numpy...), para que su formato
+(microsegundos, sufijo Z) sea el mismo que con el renderer de DRF. Los
+serializadores ya entregan las fechas como texto, así que esto solo afecta a
+las respuestas armadas a mano.
+
+Diferencias que quedan: la indentación siempre es de 2 espacios, NaN e
+infinito salen como null (DRF los rechaza) y los enteros de más de 64 bits
+fallan. Si orjson no está instalado se usa el JSON estándar de DRF.
+"""
+from django.conf import settings
+from rest_framework.utils import encoders
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+if orjson is not None:
+    OPCIONES_ORJSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_codificador_drf = encoders.JSONEncoder()
+
+
+def _serializar_otros(obj):
+    # datetime/date/time -> isoformat de DRF, Decimal -> float, Promise -> str, QuerySet -> tupla, etc.
+    return _codificador_drf.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer con orjson; mismo media type y, salvo lo indicado arriba, misma salida que el de DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        opciones = OPCIONES_ORJSON
+        # orjson solo indenta con 2 espacios (API navegable, ?indent=)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opciones |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_serializar_otros, option=opciones)
+
+        # Igual que DRF: U+2028 y U+2029 escapados para que sea JavaScript válido
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser con orjson (solo UTF-8; otras codificaciones usan el parser de DRF)."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,144 @@
+"""
+Lecturas en la réplica para los endpoints pesados de solo lectura.
+
+Solo las lecturas (GET) de las vistas marcadas con @lectura_replica van a la
+réplica; el resto del sistema sigue usando la base principal. Se usa la
+principal en cualquiera de estos casos:
+
+- no hay alias 'replica' en DATABASES o la réplica no responde;
+- el usuario escribió hace menos de REPLICA_RETRASO_MAXIMO segundos (leer
+  lo que uno mismo escribió; lo marca FijarPrimariaMiddleware);
+- la petición ya escribió algo en la principal;
+- la vista llena la caché de respuestas y alguno de sus dominios se escribió
+  hace menos de REPLICA_RETRASO_MAXIMO segundos (`leer_de_principal`): una
+  réplica atrasada guardaría datos viejos bajo la versión nueva.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+from rest_framework.permissions import SAFE_METHODS
+
+from .principal import obtener_principal
+
+ALIAS_REPLICA = 'replica'
+RETRASO_MAXIMO = 5  # segundos que se lee de la principal tras una escritura propia
+PAUSA_REPLICA_CAIDA = 30  # segundos sin intentar la réplica tras un error de conexión
+
+# 'replica' mientras corre una vista marcada; 'default' si la petición ya escribió
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def _clave_fijada(usuario_id):
+    return f'replica_fijada:{usuario_id}'
+
+
+def retraso_maximo():
+    """Segundos que se supone que tarda la réplica en recibir una escritura."""
+    return getattr(settings, 'REPLICA_RETRASO_MAXIMO', RETRASO_MAXIMO)
+
+
+def fijar_primaria(usuario_id):
+    """Las próximas lecturas del usuario van a la principal mientras la réplica se pone al día."""
+    cache.set(_clave_fijada(usuario_id), True, retraso_maximo())
+
+
+def _replica_disponible():
+    if cache.get('replica_caida'):
+        return False
+    try:
+        connections[ALIAS_REPLICA].ensure_connection()
+    except DatabaseError:
+        cache.set('replica_caida', True, PAUSA_REPLICA_CAIDA)
+        return False
+    return True
+
+
+def _puede_usar_replica(request):
+    if not replica_configurada() or request.method not in SAFE_METHODS:
+        return False
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated and cache.get(_clave_fijada(usuario.pk)):
+        return False
+    return _replica_disponible()
+
+
+class ReplicaRouter:
+    """Router de DATABASE_ROUTERS: lee de la réplica solo dentro de las vistas marcadas."""
+
+    def db_for_read(self, model, **hints):
+        if _alias_lectura.get() != ALIAS_REPLICA:
+            return None
+        return ALIAS_REPLICA
+
+    def db_for_write(self, model, **hints):
+        # Tras la primera escritura, el resto de la petición lee de la principal
+        if _alias_lectura.get() == ALIAS_REPLICA:
+            _alias_lectura.set(DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que la principal
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != ALIAS_REPLICA
+
+
+def lectura_replica(func):
+    """
+    Marca una vista (función con @api_view o acción de un ViewSet) para que sus
+    lecturas vayan a la réplica. Se coloca debajo de @api_view / @action, así
+    la autenticación y los permisos ya se resolvieron en la principal.
+    """
+    @wraps(func)
+    def envoltura(*args, **kwargs):
+        # En una acción de ViewSet el primer argumento es self
+        request = args[0] if hasattr(args[0], 'query_params') else args[1]
+        if _alias_lectura.get() == DEFAULT_DB_ALIAS or not _puede_usar_replica(request):
+            return func(*args, **kwargs)
+        # El rol se resuelve en la principal, una réplica atrasada no debe negar el acceso
+        obtener_principal(request)
+        token = _alias_lectura.set(ALIAS_REPLICA)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _alias_lectura.reset(token)
+    return envoltura
+
+
+@contextmanager
+def leer_de_principal():
+    """Dentro del bloque, las vistas marcadas con @lectura_replica leen de la principal."""
+    token = _alias_lectura.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        _alias_lectura.reset(token)
+
+
+class FijarPrimariaMiddleware:
+    """
+    Después de una escritura exitosa de un usuario autenticado, fija sus
+    lecturas a la principal por REPLICA_RETRASO_MAXIMO segundos.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_configurada() and request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF deja en request.user el usuario autenticado por JWT
+            usuario = getattr(request, 'user', None)
+            if usuario is not None and usuario.is_authenticated:
+                fijar_primaria(usuario.pk)
+        return response
@@ -1,15 +1,136 @@
 from rest_framework import serializers
-from datetime import datetime, time
 from django.db import transaction # Importa transaction para asegurar la atomicidad
 from .models import (
     Usuario, Carrera, Semestre, Materia,
     Estudiante, Docente, Administrador,
     MateriaSemestre, DocenteMateriaSemestre, SesionClase,
-    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, Inscripcion, DiaEspecial
+    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, Inscripcion, DiaEspecial,
+    numero_dia_semana
 )
+from django.db.models import Count, Prefetch, Q
+from rest_framework.permissions import SAFE_METHODS
+from .planteles import cargar_planteles
+from .justificaciones import asignar_sesiones, sesiones_del_rango
+
+
+def _lista_parametro(request, nombre):
+    valor = request.query_params.get(nombre, '')
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+def aplicar_rutas(queryset, rutas):
+    """
+    Aplica un conjunto de rutas de relaciones (a__b__c) a un queryset.
+    Las rutas a uno van a select_related; las que pasan por una relación a
+    muchos se agrupan en un Prefetch por relación, cuyo queryset aplica a su
+    vez el resto de la ruta. Así cada nivel a muchos cuesta una sola consulta.
+    """
+    select, grupos = set(), {}
+    for ruta in rutas:
+        partes = ruta.split('__')
+        modelo = queryset.model
+        for i, nombre in enumerate(partes):
+            campo = modelo._meta.get_field(nombre)
+            if campo.many_to_many or campo.one_to_many:
+                clave = ('__'.join(partes[:i + 1]), campo.related_model)
+                resto = grupos.setdefault(clave, set())
+                if i + 1 < len(partes):
+                    resto.add('__'.join(partes[i + 1:]))
+                break
+            modelo = campo.related_model
+        else:
+            select.add(ruta)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    for (prefijo, relacionado), resto in sorted(grupos.items(), key=lambda g: g[0][0]):
+        queryset = queryset.prefetch_related(
+            Prefetch(prefijo, queryset=aplicar_rutas(relacionado._default_manager.all(), resto))
+        )
+    return queryset
+
+
+class CamposDinamicosMixin:
+    """
+    Soporte de ?fields= y ?expand= para los serializadores.
+
+    - `relaciones` mapea cada campo a las relaciones que necesita al serializar.
+      Los serializadores anidados aportan su propio plan automáticamente.
+    - `expandibles` son los campos anidados pesados: en los listados se omiten
+      salvo que se pidan con ?expand=campo1,campo2 (o se nombren en ?fields=).
+    - ?fields=campo1,campo2 limita la respuesta a esos campos.
+
+    Solo aplica en lecturas y al serializador raíz. La vista usa
+    optimizar_queryset() para aplicar select_related/prefetch_related/only
+    según los campos que quedaron.
+    """
+    relaciones = {}
+    expandibles = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        campos = _lista_parametro(request, 'fields')
+        expandir = _lista_parametro(request, 'expand')
+        es_listado = self.context.get('es_listado', False)
+        for nombre in list(self.fields):
+            if nombre in self.expandibles and es_listado and nombre not in expandir | campos:
+                self.fields.pop(nombre)
+            elif campos and nombre not in campos and nombre not in expandir:
+                self.fields.pop(nombre)
+        self._campos_limitados = bool(campos)
+
+    def rutas_relaciones(self):
+        """
+        Plan de consulta: rutas de relaciones que leen los campos actuales,
+        incluyendo las de los serializadores anidados (con su `source` como prefijo).
+        """
+        rutas = set()
+        for nombre, campo in self.fields.items():
+            if campo.write_only:
+                continue
+            rutas.update(self.relaciones.get(nombre, ()))
+            anidado = getattr(campo, 'child', campo)
+            if isinstance(anidado, CamposDinamicosMixin) and campo.source != '*':
+                base = campo.source.replace('.', '__')
+                rutas.add(base)
+                rutas.update(f'{base}__{ruta}' for ruta in anidado.rutas_relaciones())
+        return rutas
+
+    def optimizar_queryset(self, queryset):
+        """Aplica al queryset las relaciones y columnas que usan los campos actuales."""
+        queryset = aplicar_rutas(queryset, self.rutas_relaciones())
+
+        if getattr(self, '_campos_limitados', False):
+            columnas = self._columnas_modelo(queryset.model, queryset)
+            if columnas is not None:
+                queryset = queryset.only(*columnas)
+        return queryset
+
+    def _columnas_modelo(self, modelo, queryset):
+        """
+        Columnas del modelo que leen los campos actuales, o None si algún
+        campo necesita el objeto completo (p. ej. un SerializerMethodField).
+        """
+        columnas = {modelo._meta.pk.name}
+        for campo in self.fields.values():
+            if campo.write_only:
+                continue
+            if campo.source == '*':
+                return None
+            columnas.add(campo.source.split('.')[0])
+        # Las relaciones seleccionadas no pueden quedar diferidas
+        if isinstance(queryset.query.select_related, dict):
+            columnas.update(queryset.query.select_related)
+        concretos = {f.name for f in modelo._meta.concrete_fields}
+        if not columnas <= concretos | {f.name for f in modelo._meta.many_to_many}:
+            return None
+        return sorted(columnas & concretos)
+
 
 # Serializador para el modelo Usuario
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = ['id', 'email', 'nombre', 'apellido', 'password', 'is_active']
@@ -43,30 +164,32 @@ class UsuarioSerializer(serializers.ModelSerializer):
 
 
 # Serializador para el modelo Carrera
-class CarreraSerializer(serializers.ModelSerializer):
+class CarreraSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Carrera
         fields = '__all__'
 
 
 # Serializador para el modelo Semestre
-class SemestreSerializer(serializers.ModelSerializer):
+class SemestreSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     carrera_nombre = serializers.CharField(source='carrera.nombre', read_only=True)
 
+    relaciones = {'carrera_nombre': ['carrera']}
+
     class Meta:
         model = Semestre
         # 'carrera' (FK) es necesario para que PrimaryKeyRelatedField funcione en MateriaSemestreSerializer
         fields = ['id', 'nombre', 'carrera', 'carrera_nombre'] 
 
 # Serializador para el modelo Materia
-class MateriaSerializer(serializers.ModelSerializer): # Usando tu nombre original
+class MateriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer): # Usando tu nombre original
     class Meta:
         model = Materia
         fields = ['id', 'nombre', 'descripcion']
 
 
 # Serializador para el modelo Estudiante
-class EstudianteSerializer(serializers.ModelSerializer):
+class EstudianteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Hacemos que UsuarioSerializer sea de lectura/escritura y se anide
     usuario = UsuarioSerializer()
 
@@ -77,6 +200,11 @@ class EstudianteSerializer(serializers.ModelSerializer):
     # CAMBIO CLAVE: Usamos SerializerMethodField para obtener el nombre del semestre
     semestre_nombre = serializers.SerializerMethodField()
 
+    relaciones = {
+        'carrera_nombre': ['carrera'],
+        'semestre_nombre': ['semestre_actual'],
+    }
+
     class Meta:
         model = Estudiante
         # CAMBIO CLAVE: Especificamos explícitamente todos los campos a incluir
@@ -130,7 +258,7 @@ class EstudianteSerializer(serializers.ModelSerializer):
 
 
 # Serializador para el modelo Docente
-class DocenteSerializer(serializers.ModelSerializer):
+class DocenteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     usuario = UsuarioSerializer()
 
     class Meta:
@@ -173,7 +301,7 @@ class DocenteSerializer(serializers.ModelSerializer):
 
 
 # Serializador para el modelo Administrador
-class AdministradorSerializer(serializers.ModelSerializer):
+class AdministradorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # ¡CAMBIO CLAVE AQUÍ! Hacemos que UsuarioSerializer sea de lectura/escritura y se anide
     usuario = UsuarioSerializer() 
     # Eliminamos usuario_id
@@ -211,7 +339,7 @@ class AdministradorSerializer(serializers.ModelSerializer):
 
 
 # Serializador para MateriaSemestre
-class MateriaSemestreSerializer(serializers.ModelSerializer):
+class MateriaSemestreSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo MateriaSemestre.
     Maneja la lógica de "obtener o crear" la materia por su nombre.
@@ -229,17 +357,28 @@ class MateriaSemestreSerializer(serializers.ModelSerializer):
         queryset=Semestre.objects.all(),
         write_only=True
     )
+
+    relaciones = {
+        'materia_nombre': ['materia'],
+        'semestre_nombre': ['semestre'],
+        'carrera_semestre': ['semestre__carrera'],
+    }
     
     class Meta:
         model = MateriaSemestre
         fields = [
             'id', 
             'semestre', 
-            'gestion', 'dia_semana', 'hora_inicio', 'hora_fin', 
+            'gestion', 'dia_semana', 'dia_semana_num', 'hora_inicio', 'hora_fin', 'tolerancia_minutos',
             'materia_nombre', 'semestre_nombre', 'carrera_semestre',
             'nombre_materia_a_crear_o_seleccionar'
         ]
 
+    def validate_dia_semana(self, value):
+        if numero_dia_semana(value) is None:
+            raise serializers.ValidationError('Día de la semana inválido (Lunes a Domingo).')
+        return value
+
     @transaction.atomic
     def create(self, validated_data):
         # Extraer el nombre de la materia del validated_data
@@ -270,7 +409,7 @@ class MateriaSemestreSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 # Serializador para DocenteMateriaSemestre
-class DocenteMateriaSemestreSerializer(serializers.ModelSerializer):
+class DocenteMateriaSemestreSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador principal que maneja la asignación de docentes a materias-semestres.
     """
@@ -280,6 +419,8 @@ class DocenteMateriaSemestreSerializer(serializers.ModelSerializer):
     docente = serializers.PrimaryKeyRelatedField(queryset=Docente.objects.all(), write_only=True)
     materia_semestre = MateriaSemestreSerializer(write_only=True)
 
+    expandibles = ('docente_info', 'materia_semestre_info')
+
     class Meta:
         model = DocenteMateriaSemestre
         fields = [
@@ -330,19 +471,27 @@ class DocenteMateriaSemestreSerializer(serializers.ModelSerializer):
         return instance
 
 # Serializador para SesionClase
-class SesionClaseSerializer(serializers.ModelSerializer):
+class SesionClaseSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Campo anidado solo para lectura
     materia_semestre_info = MateriaSemestreSerializer(source='materia_semestre', read_only=True)
 
+    expandibles = ('materia_semestre_info',)
+
     class Meta:
         model = SesionClase
-        fields = ['id', 'materia_semestre', 'materia_semestre_info', 'fecha', 'hora_inicio', 'hora_fin', 'tema']
+        fields = [
+            'id', 'materia_semestre', 'materia_semestre_info', 'fecha', 'hora_inicio', 'hora_fin', 'tema', 'origen',
+            'presentes', 'retrasos', 'faltas', 'faltas_justificadas', 'total_estudiantes',
+        ]
+        read_only_fields = ('origen',)
 
 
 # Serializador para CredencialQR
-class CredencialQRSerializer(serializers.ModelSerializer):
+class CredencialQRSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante_info = EstudianteSerializer(source='estudiante', read_only=True)
 
+    expandibles = ('estudiante_info',)
+
     class Meta:
         model = CredencialQR
         fields = '__all__'
@@ -350,36 +499,77 @@ class CredencialQRSerializer(serializers.ModelSerializer):
 
 
 # Serializador para PermisoAsistencia
-class PermisoAsistenciaSerializer(serializers.ModelSerializer):
+class PermisoAsistenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante_info = EstudianteSerializer(source='estudiante', read_only=True)
     administrador_aprobador_info = AdministradorSerializer(source='administrador_aprobador', read_only=True)
     
-    sesiones_cubiertas = serializers.PrimaryKeyRelatedField(
-        queryset=SesionClase.objects.all(), many=True, write_only=True
+    # Ids de sesión; si no se envían, el servidor cubre las sesiones del rango de fechas
+    sesiones_cubiertas = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), write_only=True, required=False
     )
     sesiones_cubiertas_info = SesionClaseSerializer(source='sesiones_cubiertas', many=True, read_only=True)
 
+    expandibles = ('estudiante_info', 'administrador_aprobador_info', 'sesiones_cubiertas_info')
+
     class Meta:
         model = PermisoAsistencia
         fields = '__all__'
-        read_only_fields = ('fecha_solicitud',)
+        # El estado solo cambia con las acciones aprobar/rechazar (solo administradores)
+        read_only_fields = ('fecha_solicitud', 'estado', 'administrador_aprobador')
 
         
     def validate_sesiones_cubiertas(self, value):
-        estudiante = self.initial_data.get('estudiante')
-        if estudiante:
-            estudiante_obj = Estudiante.objects.get(pk=estudiante)
-            # Verificar que todas las sesiones sean del mismo semestre que el estudiante
-            semestres = {s.materia_semestre.semestre for s in value}
-            if len(semestres) > 1 or (semestres and estudiante_obj.semestre_actual not in semestres):
-                raise serializers.ValidationError(
-                    "Las sesiones deben pertenecer al semestre actual del estudiante."
-                )
+        value = list(dict.fromkeys(value))
+        if not value:
+            return value
+        # Una consulta agregada en lugar de cargar cada sesión con su semestre
+        estudiante = self.initial_data.get('estudiante') or getattr(self.instance, 'estudiante_id', None)
+        semestre_id = Estudiante.objects.filter(pk=estudiante).values_list('semestre_actual_id', flat=True).first()
+        conteos = {'encontradas': Count('id')}
+        if semestre_id is not None:
+            conteos['de_otro_semestre'] = Count('id', filter=~Q(materia_semestre__semestre_id=semestre_id))
+        conteo = SesionClase.objects.filter(pk__in=value).aggregate(**conteos)
+        if conteo['encontradas'] != len(value):
+            raise serializers.ValidationError("Alguna de las sesiones indicadas no existe.")
+        if conteo.get('de_otro_semestre'):
+            raise serializers.ValidationError(
+                "Las sesiones deben pertenecer al semestre actual del estudiante."
+            )
         return value
 
+    def validate(self, attrs):
+        fecha_inicio = attrs.get('fecha_inicio', getattr(self.instance, 'fecha_inicio', None))
+        fecha_fin = attrs.get('fecha_fin', getattr(self.instance, 'fecha_fin', None))
+        if fecha_inicio and fecha_fin and fecha_fin < fecha_inicio:
+            raise serializers.ValidationError({'fecha_fin': 'La fecha de fin no puede ser anterior a la de inicio.'})
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        sesion_ids = validated_data.pop('sesiones_cubiertas', None)
+        permiso = super().create(validated_data)
+        if sesion_ids is None:
+            sesion_ids = sesiones_del_rango(permiso.estudiante, permiso.fecha_inicio, permiso.fecha_fin)
+        asignar_sesiones(permiso, sesion_ids)
+        return permiso
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        sesion_ids = validated_data.pop('sesiones_cubiertas', None)
+        rango_cambiado = any(
+            campo in validated_data and validated_data[campo] != getattr(instance, campo)
+            for campo in ('estudiante', 'fecha_inicio', 'fecha_fin')
+        )
+        permiso = super().update(instance, validated_data)
+        if sesion_ids is None and rango_cambiado:
+            sesion_ids = sesiones_del_rango(permiso.estudiante, permiso.fecha_inicio, permiso.fecha_fin)
+        if sesion_ids is not None:
+            asignar_sesiones(permiso, sesion_ids)
+        return permiso
+
 
 # Serializador para RegistroAsistencia
-class RegistroAsistenciaSerializer(serializers.ModelSerializer):
+class RegistroAsistenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante_info = EstudianteSerializer(source='estudiante', read_only=True)
     sesion_info = SesionClaseSerializer(source='sesion', read_only=True)
     permiso_asistencia_info = PermisoAsistenciaSerializer(source='permiso_asistencia', read_only=True)
@@ -388,6 +578,8 @@ class RegistroAsistenciaSerializer(serializers.ModelSerializer):
         queryset=PermisoAsistencia.objects.all(), source='permiso_asistencia', write_only=True, allow_null=True
     )
 
+    expandibles = ('estudiante_info', 'sesion_info', 'permiso_asistencia_info')
+
     class Meta:
         model = RegistroAsistencia
         fields = '__all__'
@@ -407,7 +599,7 @@ class RegistroAsistenciaSerializer(serializers.ModelSerializer):
 
 
 # Serializador para Reporte
-class ReporteSerializer(serializers.ModelSerializer):
+class ReporteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     generado_por_docente_info = DocenteSerializer(source='generado_por_docente', read_only=True)
     generado_por_administrador_info = AdministradorSerializer(source='generado_por_administrador', read_only=True)
 
@@ -418,6 +610,8 @@ class ReporteSerializer(serializers.ModelSerializer):
         queryset=Administrador.objects.all(), source='generado_por_administrador', write_only=True, allow_null=True
     )
 
+    expandibles = ('generado_por_docente_info', 'generado_por_administrador_info')
+
     class Meta:
         model = Reporte
         fields = '__all__'
@@ -434,6 +628,7 @@ class MisMateriasSerializer(serializers.ModelSerializer):
     semestre_nombre = serializers.CharField(source='materia_semestre.semestre.nombre', read_only=True)
     gestion = serializers.CharField(source='materia_semestre.gestion', read_only=True)
     dia_semana = serializers.CharField(source='materia_semestre.dia_semana', read_only=True)
+    dia_semana_num = serializers.IntegerField(source='materia_semestre.dia_semana_num', read_only=True)
     hora_inicio = serializers.CharField(source='materia_semestre.hora_inicio', read_only=True)
     hora_fin = serializers.CharField(source='materia_semestre.hora_fin', read_only=True)
 
@@ -446,6 +641,7 @@ class MisMateriasSerializer(serializers.ModelSerializer):
             'semestre_nombre',
             'gestion', 
             'dia_semana', 
+            'dia_semana_num', 
             'hora_inicio', 
             'hora_fin',
         ]
@@ -475,6 +671,7 @@ class MisMateriasConEstudiantesSerializer(serializers.ModelSerializer):
     semestre_nombre = serializers.CharField(source='materia_semestre.semestre.nombre')
     gestion = serializers.CharField(source='materia_semestre.gestion')
     dia_semana = serializers.CharField(source='materia_semestre.dia_semana')
+    dia_semana_num = serializers.IntegerField(source='materia_semestre.dia_semana_num')
     hora_inicio = serializers.TimeField(source='materia_semestre.hora_inicio')
     hora_fin = serializers.TimeField(source='materia_semestre.hora_fin')
     estudiantes = serializers.SerializerMethodField()
@@ -483,23 +680,22 @@ class MisMateriasConEstudiantesSerializer(serializers.ModelSerializer):
         model = DocenteMateriaSemestre
         fields = [
             'id', 'materia_nombre', 'carrera_nombre', 'semestre_nombre',
-            'gestion', 'dia_semana', 'hora_inicio', 'hora_fin', 'estudiantes'
+            'gestion', 'dia_semana', 'dia_semana_num', 'hora_inicio', 'hora_fin', 'estudiantes'
         ]
 
     def get_estudiantes(self, obj):
-        # Estudiantes que coinciden con la carrera y semestre de la materia
-        return Estudiante.objects.filter(
-            carrera=obj.materia_semestre.semestre.carrera,
-            semestre_actual=obj.materia_semestre.semestre
-        ).select_related('usuario').values(
-            'id', 'codigo_institucional', 'usuario__nombre', 'usuario__apellido'
-        )
+        # La vista carga los planteles de todas las filas en una sola consulta
+        planteles = self.context.get('planteles')
+        if planteles is None:
+            planteles = cargar_planteles([obj.materia_semestre])
+        return planteles.get(obj.materia_semestre_id, [])
         
     
-class InscripcionSerializer(serializers.ModelSerializer):
+class InscripcionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante = EstudianteSerializer(read_only=True)
     materia_semestre = MateriaSemestreSerializer(read_only=True)
 
+
     class Meta:
         model = Inscripcion
         fields = '__all__'
@@ -532,18 +728,26 @@ class MateriaConDocentesSerializer(serializers.ModelSerializer):
 from rest_framework import serializers
 
 class MateriaEstudianteSerializer(serializers.ModelSerializer):
+    """
+    Materias del estudiante para la app móvil. La sesión activa y su ventana
+    vienen anotadas en el queryset (ver MisMateriasEstudianteView).
+    """
     materia_nombre = serializers.CharField(source='materia.nombre')
     semestre_nombre = serializers.CharField(source='semestre.nombre')
     carrera_nombre = serializers.CharField(source='semestre.carrera.nombre')
     materia_id = serializers.IntegerField(source='materia.id')  # Añadir ID de Materia
     docentes = serializers.SerializerMethodField()
-    sesion_activa = serializers.SerializerMethodField()
+    sesion_activa = serializers.BooleanField(read_only=True)
+    sesion_activa_id = serializers.IntegerField(read_only=True)
+    sesion_activa_inicio = serializers.TimeField(read_only=True)
+    sesion_activa_fin = serializers.TimeField(read_only=True)
 
     class Meta:
         model = MateriaSemestre
         fields = [
             'id', 'materia_id', 'materia_nombre', 'semestre_nombre', 'carrera_nombre',
-            'gestion', 'dia_semana', 'hora_inicio', 'hora_fin', 'docentes', 'sesion_activa'
+            'gestion', 'dia_semana', 'hora_inicio', 'hora_fin', 'docentes', 'sesion_activa',
+            'sesion_activa_id', 'sesion_activa_inicio', 'sesion_activa_fin'
         ]
 
     def get_docentes(self, obj):
@@ -551,17 +755,6 @@ class MateriaEstudianteSerializer(serializers.ModelSerializer):
             {'nombre': d.docente.usuario.nombre, 'apellido': d.docente.usuario.apellido}
             for d in obj.docentes_asignados.all()
         ]
-
-    def get_sesion_activa(self, obj):
-        hoy = datetime.now().date()
-        ahora = datetime.now().time()
-        sesiones = SesionClase.objects.filter(
-            materia_semestre=obj,
-            fecha=hoy,
-            hora_inicio__lte=ahora,
-            hora_fin__gte=ahora
-        )
-        return sesiones.exists()
     
 class MateriaSemestreDetalleSerializer(serializers.ModelSerializer):
     materia = MateriaSerializer()
@@ -578,12 +771,14 @@ class MateriaSemestreMiniSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MateriaSemestre
-        fields = ['id', 'materia', 'gestion', 'dia_semana', 'hora_inicio', 'hora_fin']
+        fields = ['id', 'materia', 'gestion', 'dia_semana', 'dia_semana_num', 'hora_inicio', 'hora_fin']
 
 # Serializador para DiaEspecial
-class DiaEspecialSerializer(serializers.ModelSerializer):
+class DiaEspecialSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     creado_por_info = serializers.SerializerMethodField(read_only=True)
 
+    relaciones = {'creado_por_info': ['creado_por__usuario']}
+
     class Meta:
         model = DiaEspecial
         fields = ['id', 'fecha', 'tipo', 'descripcion', 'afecta_asistencia', 'creado_por', 'creado_por_info', 'fecha_creacion']
@@ -1,6 +1,17 @@
-from django.db.models.signals import post_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
-from .models import DocenteMateriaSemestre, MateriaSemestre
+from .models import (
+    Usuario, Carrera, Semestre, Materia, Estudiante, Docente,
+    MateriaSemestre, DocenteMateriaSemestre, SesionClase,
+    PermisoAsistencia, RegistroAsistencia, Inscripcion, DiaEspecial
+)
+from .matriz_asistencia import invalidar_matriz
+from .cache_respuestas import incrementar_version, nombre_tabla
+from .calendario import quitar_fecha, restaurar_fecha
+from .contadores import ajustar_contadores, recalcular_contadores
+from .tolerancia import recalcular_estados
+from .justificaciones import justificar_sesiones, quitar_justificacion
 
 @receiver(post_delete, sender=DocenteMateriaSemestre)
 def eliminar_materia_semestre_si_sin_docente(sender, instance, **kwargs):
@@ -9,3 +20,195 @@ def eliminar_materia_semestre_si_sin_docente(sender, instance, **kwargs):
     # Si ya no hay ninguna asignación a docentes
     if not materia_semestre.docentes_asignados.exists():
         materia_semestre.delete()
+
+
+# Descartar las matrices de asistencia en caché (se reconstruyen al leerlas)
+@receiver([post_save, post_delete], sender=RegistroAsistencia)
+def invalidar_matriz_por_registro(sender, instance, **kwargs):
+    invalidar_matriz(instance.sesion.materia_semestre_id)
+
+@receiver([post_save, post_delete], sender=SesionClase)
+def invalidar_matriz_por_sesion(sender, instance, **kwargs):
+    # Una sesión nueva o eliminada cambia las columnas de la matriz
+    invalidar_matriz(instance.materia_semestre_id)
+
+# Contadores de asistencia de cada sesión (ver contadores.py)
+@receiver(pre_save, sender=RegistroAsistencia)
+def recordar_registro_anterior(sender, instance, **kwargs):
+    instance._anterior = None
+    update_fields = kwargs.get('update_fields')
+    if instance.pk and (update_fields is None or {'estado', 'sesion'} & set(update_fields)):
+        instance._anterior = RegistroAsistencia.objects.filter(pk=instance.pk).values_list(
+            'sesion_id', 'estado'
+        ).first()
+
+@receiver(post_save, sender=RegistroAsistencia)
+def actualizar_contadores_por_registro(sender, instance, created, **kwargs):
+    if created:
+        ajustar_contadores(instance.sesion_id, estado_nuevo=instance.estado)
+        return
+    anterior = getattr(instance, '_anterior', None)
+    if anterior is None:
+        return
+    sesion_anterior, estado_anterior = anterior
+    if sesion_anterior != instance.sesion_id:
+        ajustar_contadores(sesion_anterior, estado_anterior=estado_anterior)
+        ajustar_contadores(instance.sesion_id, estado_nuevo=instance.estado)
+    else:
+        ajustar_contadores(instance.sesion_id, estado_anterior, instance.estado)
+
+@receiver(post_delete, sender=RegistroAsistencia)
+def descontar_registro_eliminado(sender, instance, **kwargs):
+    ajustar_contadores(instance.sesion_id, estado_anterior=instance.estado)
+
+@receiver(post_save, sender=SesionClase)
+def contar_plantel_de_sesion(sender, instance, created, update_fields=None, **kwargs):
+    # Al crear o abrir una sesión se fija el tamaño de su plantel
+    if created or (update_fields and 'origen' in update_fields):
+        sesion = SesionClase.objects.filter(pk=instance.pk)
+        recalcular_contadores(sesion)
+        instance.total_estudiantes = sesion.values_list('total_estudiantes', flat=True).first() or 0
+
+@receiver(pre_save, sender=Estudiante)
+def recordar_semestre_anterior(sender, instance, **kwargs):
+    instance._semestre_anterior = None
+    if instance.pk:
+        instance._semestre_anterior = Estudiante.objects.filter(pk=instance.pk).values_list(
+            'semestre_actual_id', flat=True
+        ).first()
+
+@receiver(post_save, sender=Estudiante)
+def invalidar_matrices_por_estudiante(sender, instance, **kwargs):
+    # Un cambio de semestre o carrera cambia las filas de las matrices del
+    # semestre nuevo y del que dejó
+    semestres = {instance.semestre_actual_id, getattr(instance, '_semestre_anterior', None)} - {None}
+    for materia_semestre_id in MateriaSemestre.objects.filter(
+        semestre_id__in=semestres
+    ).values_list('id', flat=True):
+        invalidar_matriz(materia_semestre_id)
+
+
+# Versiones de la caché de respuestas por dominio
+MODELOS_POR_DOMINIO = {
+    'asistencia': [RegistroAsistencia, SesionClase, PermisoAsistencia],
+    'catalogo': [Usuario, Carrera, Semestre, Materia, Estudiante, Docente, MateriaSemestre, DocenteMateriaSemestre, Inscripcion],
+    'calendario': [DiaEspecial],
+}
+
+def _conectar_invalidacion(dominio, modelo):
+    def invalidar(sender, instance, **kwargs):
+        # El login solo actualiza last_login, no invalida el catálogo
+        if kwargs.get('update_fields') == frozenset({'last_login'}):
+            return
+        # Al confirmar: antes, otra petición podría cachear las filas viejas bajo la versión nueva
+        transaction.on_commit(lambda: incrementar_version(dominio))
+    post_save.connect(invalidar, sender=modelo, weak=False, dispatch_uid=f'version_{dominio}_{modelo.__name__}_save')
+    post_delete.connect(invalidar, sender=modelo, weak=False, dispatch_uid=f'version_{dominio}_{modelo.__name__}_delete')
+
+for dominio, modelos in MODELOS_POR_DOMINIO.items():
+    for modelo in modelos:
+        _conectar_invalidacion(dominio, modelo)
+
+@receiver(m2m_changed, sender=PermisoAsistencia.sesiones_cubiertas.through)
+def invalidar_asistencia_por_sesiones_cubiertas(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: incrementar_version('asistencia'))
+
+
+# Permisos aprobados: justificación y reversión en bloque (ver justificaciones.py).
+# aprobar_permiso / revertir_permiso usan update() y no pasan por aquí.
+@receiver(pre_save, sender=PermisoAsistencia)
+def recordar_estado_permiso(sender, instance, **kwargs):
+    instance._estado_anterior = None
+    if instance.pk:
+        instance._estado_anterior = PermisoAsistencia.objects.filter(pk=instance.pk).values_list(
+            'estado', flat=True
+        ).first()
+
+@receiver(post_save, sender=PermisoAsistencia)
+def aplicar_cambio_estado_permiso(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_estado_anterior', None)
+    if instance.estado == anterior:
+        return
+    if instance.estado == 'APROBADO':
+        justificar_sesiones(instance)
+    elif anterior == 'APROBADO':
+        quitar_justificacion(instance)
+
+@receiver(pre_delete, sender=PermisoAsistencia)
+def revertir_permiso_eliminado(sender, instance, **kwargs):
+    # on_delete=SET_NULL dejaría las faltas justificadas sin permiso
+    quitar_justificacion(instance)
+
+@receiver(m2m_changed, sender=PermisoAsistencia.sesiones_cubiertas.through)
+def justificar_por_sesiones_cubiertas(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse or instance.estado != 'APROBADO':
+        return
+    if action == 'post_add':
+        justificar_sesiones(instance, pk_set)
+    elif action == 'post_remove':
+        quitar_justificacion(instance, pk_set)
+    elif action == 'pre_clear':
+        quitar_justificacion(instance)
+
+
+# Versiones por tabla para los ETag de los catálogos (ver cache_condicional.py)
+TABLAS_VERSIONADAS = [Carrera, Semestre, Materia, MateriaSemestre, Estudiante]
+
+def _conectar_version_tabla(modelo):
+    def invalidar(sender, instance, **kwargs):
+        transaction.on_commit(lambda: incrementar_version(nombre_tabla(modelo)))
+    post_save.connect(invalidar, sender=modelo, weak=False, dispatch_uid=f'version_tabla_{modelo.__name__}_save')
+    post_delete.connect(invalidar, sender=modelo, weak=False, dispatch_uid=f'version_tabla_{modelo.__name__}_delete')
+
+for modelo in TABLAS_VERSIONADAS:
+    _conectar_version_tabla(modelo)
+
+
+# Sesiones planificadas: un día especial solo afecta a su fecha (ver calendario.py)
+@receiver(pre_save, sender=DiaEspecial)
+def recordar_dia_especial_anterior(sender, instance, **kwargs):
+    instance._anterior = None
+    if instance.pk:
+        instance._anterior = DiaEspecial.objects.filter(pk=instance.pk).values_list(
+            'fecha', 'afecta_asistencia'
+        ).first()
+
+@receiver(post_save, sender=DiaEspecial)
+def sincronizar_calendario_por_dia_especial(sender, instance, **kwargs):
+    anterior = getattr(instance, '_anterior', None)
+    if anterior is not None:
+        fecha_anterior, afectaba = anterior
+        if afectaba and (fecha_anterior != instance.fecha or not instance.afecta_asistencia):
+            restaurar_fecha(fecha_anterior)
+    if instance.afecta_asistencia:
+        quitar_fecha(instance.fecha)
+
+@receiver(post_delete, sender=DiaEspecial)
+def restaurar_calendario_por_dia_especial(sender, instance, **kwargs):
+    if instance.afecta_asistencia:
+        restaurar_fecha(instance.fecha)
+
+
+# Tolerancia: al cambiarla se reclasifican los registros de las materias afectadas (ver tolerancia.py)
+@receiver(pre_save, sender=Carrera)
+@receiver(pre_save, sender=MateriaSemestre)
+def recordar_tolerancia_anterior(sender, instance, **kwargs):
+    instance._tolerancia_anterior = None
+    if instance.pk:
+        instance._tolerancia_anterior = sender.objects.filter(pk=instance.pk).values_list(
+            'tolerancia_minutos', flat=True
+        ).first()
+
+@receiver(post_save, sender=Carrera)
+@receiver(post_save, sender=MateriaSemestre)
+def reclasificar_por_tolerancia(sender, instance, created, **kwargs):
+    if created or instance.tolerancia_minutos == getattr(instance, '_tolerancia_anterior', None):
+        return
+    if sender is Carrera:
+        # Puede abarcar cientos de materias: se reclasifica fuera de la petición
+        # (recalcular_tolerancia --pendientes)
+        Carrera.objects.filter(pk=instance.pk).update(tolerancia_pendiente=True)
+        return
+    materias = MateriaSemestre.objects.filter(pk=instance.pk)
+    transaction.on_commit(lambda: recalcular_estados(materias))
@@ -1,3 +1,1160 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import re
+import tempfile
+import unittest
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import calendario, cierre, compresion, particiones
+from .cache_respuestas import (
+    incrementar_version, nombre_tabla, obtener_version, revisar_cache_compartida, verificar_cache_compartida,
+)
+from .calendario import generar_calendario
+from .cierre import asistencia_de_sesion, cerrar_sesiones
+from .compresion import CompresionMiddleware
+from .contadores import sesiones_desincronizadas
+from .horarios import IndiceHorario, indice_horario
+from .matriz_asistencia import MatrizAsistencia, obtener_matriz
+from .models import (
+    Usuario, Carrera, Semestre, Materia, Estudiante, Docente, Administrador,
+    MateriaSemestre, DocenteMateriaSemestre, SesionClase, CredencialQR, PermisoAsistencia, RegistroAsistencia, DiaEspecial,
+    GestionArchivada, Inscripcion, PermisoAsistenciaArchivado, RegistroAsistenciaArchivado, SesionClaseArchivada,
+)
+from .planteles import cargar_planteles
+from .renderers import ORJSONRenderer
+from .serializers import SemestreSerializer, UsuarioSerializer
+from .tolerancia import _reclasificar_sql, estado_por_hora, reclasificar_pendientes
+
+
+class ConsultasListadosTests(TestCase):
+    """
+    Fija la cantidad de consultas de los listados con todos los campos
+    anidados expandidos: no debe crecer con el tamaño de la lista.
+    """
+    TAMANOS = (10, 100, 1000)
+    EXPANDIR = {
+        '/api/registros-asistencia/': 'estudiante_info,sesion_info,permiso_asistencia_info',
+        '/api/permisos-asistencia/': 'estudiante_info,administrador_aprobador_info,sesiones_cubiertas_info',
+        '/api/credenciales-qr/': 'estudiante_info',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre='Sistemas')
+        cls.semestre = Semestre.objects.create(nombre='1', carrera=cls.carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=cls.semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        usuario_admin = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        cls.administrador = Administrador.objects.create(usuario=usuario_admin)
+        cls.usuario_admin = usuario_admin
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario_admin)
+
+    def _crear_estudiantes(self, cantidad):
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(email=f'est{i}@est.emi.edu.bo', nombre=f'Nombre{i}', apellido=f'Apellido{i}', password='!')
+            for i in range(cantidad)
+        ])
+        return Estudiante.objects.bulk_create([
+            Estudiante(usuario=u, codigo_institucional=f'C{u.pk}', carrera=self.carrera, semestre_actual=self.semestre)
+            for u in usuarios
+        ])
+
+    def _crear_sesiones(self, cantidad):
+        return SesionClase.objects.bulk_create([
+            SesionClase(
+                materia_semestre=self.materia_semestre, fecha=date(2025, 2, 3) + timedelta(days=7 * i),
+                hora_inicio=time(8), hora_fin=time(10),
+            )
+            for i in range(cantidad)
+        ])
+
+    def _crear_registros(self, cantidad):
+        sesiones = self._crear_sesiones(10)
+        estudiantes = self._crear_estudiantes(max(1, cantidad // len(sesiones)))
+        permiso = PermisoAsistencia.objects.create(
+            estudiante=estudiantes[0], administrador_aprobador=self.administrador, motivo='Salud', estado='APROBADO'
+        )
+        permiso.sesiones_cubiertas.set(sesiones[:2])
+        RegistroAsistencia.objects.bulk_create([
+            RegistroAsistencia(
+                estudiante=e, sesion=s, estado='PRESENTE',
+                permiso_asistencia=permiso if e == estudiantes[0] else None,
+            )
+            for e in estudiantes for s in sesiones
+        ][:cantidad])
+
+    def _crear_permisos(self, cantidad):
+        sesiones = self._crear_sesiones(3)
+        estudiantes = self._crear_estudiantes(10)
+        permisos = PermisoAsistencia.objects.bulk_create([
+            PermisoAsistencia(
+                estudiante=estudiantes[i % len(estudiantes)], administrador_aprobador=self.administrador,
+                motivo='Viaje', estado='APROBADO',
+            )
+            for i in range(cantidad)
+        ])
+        Cubiertas = PermisoAsistencia.sesiones_cubiertas.through
+        Cubiertas.objects.bulk_create([
+            Cubiertas(permisoasistencia_id=p.pk, sesionclase_id=s.pk) for p in permisos for s in sesiones
+        ])
+
+    def _crear_credenciales(self, cantidad):
+        CredencialQR.objects.bulk_create([CredencialQR(estudiante=e) for e in self._crear_estudiantes(cantidad)])
+
+    def _consultas_listado(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(
+                url, {'expand': self.EXPANDIR[url]}, HTTP_X_PAGINACION='desactivada'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(consultas), len(response.json())
+
+    def _verificar_constante(self, url, crear, esperado):
+        for tamano in self.TAMANOS:
+            with self.subTest(tamano=tamano):
+                # Cada tamaño se mide sobre tablas vacías
+                RegistroAsistencia.objects.all().delete()
+                PermisoAsistencia.objects.all().delete()
+                CredencialQR.objects.all().delete()
+                SesionClase.objects.all().delete()
+                Estudiante.objects.all().delete()
+                Usuario.objects.exclude(pk=self.usuario_admin.pk).delete()
+                crear(tamano)
+                consultas, filas = self._consultas_listado(url)
+                self.assertEqual(filas, tamano)
+                self.assertEqual(consultas, esperado)
+
+    def test_registros_asistencia(self):
+        # Registros con estudiante, sesión y permiso (+ sesiones cubiertas del permiso)
+        self._verificar_constante('/api/registros-asistencia/', self._crear_registros, 2)
+
+    def test_permisos_asistencia(self):
+        # Permisos + sesiones cubiertas
+        self._verificar_constante('/api/permisos-asistencia/', self._crear_permisos, 2)
+
+    def test_credenciales_qr(self):
+        self._verificar_constante('/api/credenciales-qr/', self._crear_credenciales, 1)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de los índices solo en PostgreSQL')
+class PlanesConsultasFrecuentesTests(TestCase):
+    """
+    Verifica con EXPLAIN que las consultas frecuentes usan un índice.
+    Con enable_seqscan desactivado el planificador solo recorre la tabla
+    completa si ningún índice sirve, así que el resultado no depende de la
+    cantidad de filas de prueba.
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertUsaIndice(self, queryset, *indices):
+        plan = queryset.explain()
+        tabla = queryset.model._meta.db_table
+        self.assertNotRegex(plan, rf'Seq Scan on "?{tabla}"?\b', plan)
+        self.assertRegex(plan, r'Index (Only )?Scan|Bitmap Index Scan', plan)
+        if indices:
+            self.assertTrue(any(re.search(rf'\b{i}\b', plan) for i in indices), plan)
+
+    def test_sesion_activa(self):
+        self.assertUsaIndice(
+            SesionClase.objects.filter(
+                materia_semestre_id=1, fecha=date(2025, 3, 3),
+                hora_inicio__lte=time(9), hora_fin__gte=time(9),
+            ).values('id', 'hora_inicio', 'hora_fin'),
+            'sesion_activa_idx',
+        )
+
+    def test_registros_por_sesion_y_estado(self):
+        self.assertUsaIndice(
+            RegistroAsistencia.objects.filter(sesion_id=1, estado='PRESENTE').values('estudiante_id'),
+            'registro_sesion_estado_idx',
+        )
+
+    def test_registros_estudiante_por_materia(self):
+        self.assertUsaIndice(
+            RegistroAsistencia.objects.filter(estudiante_id=1, sesion__materia_semestre_id=1).values('estado'),
+            # El de la clave foránea estudiante o el único de (estudiante, sesion),
+            # según prefiera el planificador; sus nombres llevan un hash
+            r'gestion_academica_registroasistencia_estudiante_id_[0-9a-f]{8}',
+            r'\w+_estudiante_id_sesion_id_[0-9a-f]{8}_uniq',
+        )
+
+    def test_plantel_cohorte(self):
+        self.assertUsaIndice(
+            Estudiante.objects.filter(carrera_id=1, semestre_actual_id=1).order_by().values('id', 'codigo_institucional'),
+            'estudiante_cohorte_idx',
+        )
+
+    def test_dias_especiales_que_afectan(self):
+        self.assertUsaIndice(
+            DiaEspecial.objects.filter(
+                fecha__gte=date(2025, 1, 1), fecha__lte=date(2025, 6, 30), afecta_asistencia=True
+            ).order_by().values('fecha'),
+            'dia_especial_afecta_idx',
+        )
+
+    def test_permisos_por_estudiante_y_estado(self):
+        self.assertUsaIndice(
+            PermisoAsistencia.objects.filter(estudiante_id=1, estado='APROBADO').order_by(),
+            'permiso_estudiante_estado_idx',
+        )
+
+    def test_permisos_pendientes(self):
+        self.assertUsaIndice(
+            PermisoAsistencia.objects.filter(estado='PENDIENTE').order_by('-fecha_solicitud'),
+            'permiso_pendiente_idx',
+        )
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, 'Requiere el alias replica (DB_REPLICA_HOST)')
+class LecturaReplicaTests(TestCase):
+    """
+    Con dos alias (la réplica es un espejo de default en las pruebas) se
+    verifica a qué conexión van las consultas de cada endpoint.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario_admin = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        Administrador.objects.create(usuario=cls.usuario_admin)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario_admin)
+
+    def _consultas_por_alias(self, metodo, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as principal, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, metodo)(url, **kwargs)
+        self.assertLess(response.status_code, 400)
+        return len(principal), len(replica)
+
+    def test_endpoint_marcado_lee_de_la_replica(self):
+        _, replica = self._consultas_por_alias('get', '/api/listar-reportes-admin/')
+        self.assertGreater(replica, 0)
+
+    def test_endpoint_no_marcado_lee_de_la_principal(self):
+        _, replica = self._consultas_por_alias('get', '/api/carreras/')
+        self.assertEqual(replica, 0)
+
+    def test_cache_de_respuestas_se_llena_desde_la_replica(self):
+        # Sin escrituras recientes en los dominios del endpoint
+        cache.set('version:asistencia', 1, None)
+        cache.set('version:catalogo', 1, None)
+        _, replica = self._consultas_por_alias('get', '/api/resumen-asistencias-general/')
+        self.assertGreater(replica, 0)
+
+    def test_cache_de_respuestas_tras_una_escritura_se_llena_desde_la_principal(self):
+        cache.set('version:catalogo', 1, None)
+        incrementar_version('asistencia')
+        principal, replica = self._consultas_por_alias('get', '/api/resumen-asistencias-general/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(principal, 0)
+
+    def test_lee_de_la_principal_tras_escritura_propia(self):
+        self._consultas_por_alias('post', '/api/carreras/', data={'nombre': 'Sistemas'}, format='json')
+        principal, replica = self._consultas_por_alias('get', '/api/listar-reportes-admin/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(principal, 0)
+
+
+class JustificacionPermisosTests(TestCase):
+    """Aprobar, rechazar y eliminar un permiso justifica o revierte sus faltas en bloque."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        cls.usuario_admin = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        Administrador.objects.create(usuario=cls.usuario_admin)
+        cls.usuario_estudiante = Usuario.objects.create_user('est@est.emi.edu.bo', 'Eva', 'Estudiante', 'clave')
+        cls.estudiante = Estudiante.objects.create(
+            usuario=cls.usuario_estudiante, codigo_institucional='E1', carrera=carrera, semestre_actual=semestre
+        )
+        # Una sesión cerrada con FALTA y otra cerrada sin registro
+        cls.sesiones = [
+            SesionClase.objects.create(
+                materia_semestre=materia_semestre, fecha=date(2025, 3, 3) + timedelta(days=7 * i),
+                hora_inicio=time(8), hora_fin=time(10), cerrada=True,
+            )
+            for i in range(2)
+        ]
+        RegistroAsistencia.objects.create(estudiante=cls.estudiante, sesion=cls.sesiones[0], estado='FALTA')
+
+    def setUp(self):
+        self.permiso = PermisoAsistencia.objects.create(
+            estudiante=self.estudiante, motivo='Salud', fecha_inicio=date(2025, 3, 3), fecha_fin=date(2025, 3, 10)
+        )
+        self.permiso.sesiones_cubiertas.set(self.sesiones)
+        self.admin = APIClient()
+        self.admin.force_authenticate(user=self.usuario_admin)
+
+    def _estados(self):
+        return dict(
+            RegistroAsistencia.objects.filter(estudiante=self.estudiante).values_list('sesion_id', 'estado')
+        )
+
+    def _aprobar(self):
+        response = self.admin.post(f'/api/permisos-asistencia/{self.permiso.pk}/aprobar/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_aprobar_justifica_faltas_y_sesiones_cerradas(self):
+        response = self._aprobar()
+        self.assertEqual((response.json()['registros_justificados'], response.json()['registros_creados']), (1, 1))
+        self.assertEqual(self._estados(), {s.pk: 'FALTA_JUSTIFICADA' for s in self.sesiones})
+        self.assertEqual(
+            RegistroAsistencia.objects.filter(permiso_asistencia=self.permiso).count(), len(self.sesiones)
+        )
+        self.sesiones[0].refresh_from_db()
+        self.assertEqual((self.sesiones[0].faltas, self.sesiones[0].faltas_justificadas), (0, 1))
+
+    def test_rechazar_revierte_a_falta(self):
+        self._aprobar()
+        response = self.admin.post(f'/api/permisos-asistencia/{self.permiso.pk}/rechazar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['registros_revertidos'], 2)
+        self.assertEqual(self._estados(), {s.pk: 'FALTA' for s in self.sesiones})
+        self.permiso.refresh_from_db()
+        self.assertEqual(self.permiso.estado, 'RECHAZADO')
+
+    def test_eliminar_permiso_aprobado_revierte_a_falta(self):
+        self._aprobar()
+        response = self.admin.delete(f'/api/permisos-asistencia/{self.permiso.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self._estados(), {s.pk: 'FALTA' for s in self.sesiones})
+        self.assertFalse(RegistroAsistencia.objects.filter(permiso_asistencia__isnull=False).exists())
+
+    def test_estudiante_no_puede_aprobar(self):
+        estudiante = APIClient()
+        estudiante.force_authenticate(user=self.usuario_estudiante)
+        response = estudiante.post(f'/api/permisos-asistencia/{self.permiso.pk}/aprobar/')
+        self.assertEqual(response.status_code, 403)
+        # estado y administrador_aprobador son de solo lectura en el serializer
+        response = estudiante.patch(
+            f'/api/permisos-asistencia/{self.permiso.pk}/', {'estado': 'APROBADO'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.permiso.refresh_from_db()
+        self.assertEqual(self.permiso.estado, 'PENDIENTE')
+        self.assertEqual(self._estados(), {self.sesiones[0].pk: 'FALTA'})
+
+
+class PrincipalTokenTests(TestCase):
+    """Perfiles del JWT: solo en el access token, por pertenencia y renovados en cada refresh."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        cls.semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=cls.semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        cls.usuario = Usuario.objects.create_user('doc@doc.emi.edu.bo', 'Dora', 'Docente', 'clave')
+        Administrador.objects.create(usuario=cls.usuario)
+        docente = Docente.objects.create(usuario=cls.usuario)
+        DocenteMateriaSemestre.objects.create(docente=docente, materia_semestre=cls.materia_semestre)
+        cls.usuario_estudiante = Usuario.objects.create_user('est@est.emi.edu.bo', 'Eva', 'Estudiante', 'clave')
+        Estudiante.objects.create(
+            usuario=cls.usuario_estudiante, codigo_institucional='E1', carrera=carrera, semestre_actual=cls.semestre
+        )
+
+    def _login(self, email):
+        response = APIClient().post('/api/login/', {'email': email, 'password': 'clave', 'modo': 'token'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _cliente(self, access):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return cliente
+
+    def test_perfiles_solo_en_el_access_token(self):
+        tokens = self._login(self.usuario.email)
+        self.assertEqual(tokens['role'], 'administrador')
+        self.assertEqual(set(AccessToken(tokens['access'])['perfiles']), {'administrador', 'docente'})
+        self.assertNotIn('perfiles', RefreshToken(tokens['refresh']))
+
+    def test_administrador_y_docente_pasa_como_docente(self):
+        cliente = self._cliente(self._login(self.usuario.email)['access'])
+        response = cliente.get('/api/mis-materias/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_refresh_vuelve_a_resolver_los_perfiles(self):
+        tokens = self._login(self.usuario.email)
+        Docente.objects.filter(usuario=self.usuario).delete()
+        response = APIClient().post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(AccessToken(response.json()['access'])['perfiles']), {'administrador'})
+        self.assertEqual(self._cliente(response.json()['access']).get('/api/mis-materias/').status_code, 403)
+
+    def test_perfil_del_token_eliminado_responde_403(self):
+        access = self._login(self.usuario_estudiante.email)['access']
+        Estudiante.objects.filter(usuario=self.usuario_estudiante).delete()
+        response = self._cliente(access).get('/api/sesiones-clase/')
+        self.assertEqual(response.status_code, 403)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'El particionado solo existe en PostgreSQL')
+class ParticionadoRegistrosTests(TestCase):
+    """Tras convertir la tabla, la guarda mantiene la unicidad de (estudiante, sesion)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        cls.estudiantes = [
+            Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f'e{i}@est.emi.edu.bo', 'Eva', f'E{i}', 'clave'),
+                codigo_institucional=f'E{i}', carrera=carrera, semestre_actual=semestre,
+            )
+            for i in range(2)
+        ]
+        cls.sesion = SesionClase.objects.create(
+            materia_semestre=materia_semestre, fecha=date(2025, 3, 3), hora_inicio=time(8), hora_fin=time(10),
+        )
+
+    def setUp(self):
+        RegistroAsistencia.objects.create(estudiante=self.estudiantes[0], sesion=self.sesion, estado='PRESENTE')
+        particiones.convertir()
+
+    def test_par_repetido_rechazado(self):
+        self.assertTrue(particiones.esta_particionada())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RegistroAsistencia.objects.create(estudiante=self.estudiantes[0], sesion=self.sesion, estado='FALTA')
+        self.assertEqual(RegistroAsistencia.objects.count(), 1)
+
+    def test_insertar_registros_omite_pares_existentes(self):
+        particiones.insertar_registros([
+            RegistroAsistencia(estudiante=e, sesion=self.sesion, estado='FALTA', materializado=True)
+            for e in self.estudiantes
+        ])
+        self.assertEqual(
+            dict(RegistroAsistencia.objects.values_list('estudiante_id', 'estado')),
+            {self.estudiantes[0].pk: 'PRESENTE', self.estudiantes[1].pk: 'FALTA'},
+        )
+
+    def test_eliminar_libera_el_par(self):
+        RegistroAsistencia.objects.all().delete()
+        RegistroAsistencia.objects.create(estudiante=self.estudiantes[0], sesion=self.sesion, estado='FALTA')
+        self.assertEqual(RegistroAsistencia.objects.count(), 1)
+
+
+class IndiceHorarioTests(TestCase):
+    """Búsquedas del índice del horario y su reconstrucción a partir de la base."""
+
+    def setUp(self):
+        # (id, día, inicio, fin); 0 = lunes
+        self.indice = IndiceHorario([
+            (1, 0, time(8), time(10)),
+            (2, 0, time(9), time(11)),
+            (3, 0, time(23, 50), time(23, 59)),
+            (4, 1, time(0, 5), time(1)),
+            (5, 2, time(8), time(9)),
+        ])
+
+    def test_en_curso(self):
+        lunes = datetime(2025, 3, 3)
+        self.assertEqual(self.indice.en_curso(lunes.replace(hour=7, minute=59)), frozenset())
+        self.assertEqual(self.indice.en_curso(lunes.replace(hour=8)), {1})
+        self.assertEqual(self.indice.en_curso(lunes.replace(hour=9, minute=30)), {1, 2})
+        # La hora de fin no forma parte de la clase
+        self.assertEqual(self.indice.en_curso(lunes.replace(hour=10)), {2})
+        self.assertEqual(self.indice.en_curso(lunes.replace(hour=12)), frozenset())
+        self.assertEqual(self.indice.en_curso(datetime(2025, 3, 6, 9)), frozenset())
+
+    def test_proximas(self):
+        lunes = datetime(2025, 3, 3)
+        self.assertEqual(self.indice.proximas(lunes.replace(hour=7, minute=50), 15), [1])
+        # Solo las que empiezan después del momento
+        self.assertEqual(self.indice.proximas(lunes.replace(hour=8), 15), [])
+        self.assertEqual(self.indice.proximas(lunes.replace(hour=8, minute=50), 10), [2])
+
+    def test_proximas_cruza_la_medianoche(self):
+        self.assertEqual(self.indice.proximas(datetime(2025, 3, 3, 23, 45), 30), [3, 4])
+        self.assertEqual(self.indice.proximas(datetime(2025, 3, 3, 23, 55), 5), [])
+        # Del domingo al lunes
+        self.assertEqual(IndiceHorario([(7, 0, time(0), time(1))]).proximas(datetime(2025, 3, 9, 23, 50), 15), [7])
+
+    def test_se_reconstruye_con_cambios_sin_senales(self):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'),
+            semestre=Semestre.objects.create(nombre='1', carrera=carrera),
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        lunes = datetime(2025, 3, 3, 9)
+        self.assertEqual(indice_horario().en_curso(lunes), {materia_semestre.pk})
+        # update() no emite señales ni cambia versiones de la caché (como otro proceso)
+        MateriaSemestre.objects.filter(pk=materia_semestre.pk).update(hora_inicio=time(9, 30))
+        self.assertEqual(indice_horario().en_curso(lunes), frozenset())
+        GestionArchivada.objects.create(gestion='2025/1')
+        self.assertEqual(len(indice_horario()), 0)
+
+
+CACHE_ARCHIVOS = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'asistencia_pruebas_cache'),
+}}
+
+
+class CatalogoCondicionalTests(TestCase):
+    """ETag / 304 de los catálogos; solo con una caché compartida entre procesos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre='Sistemas')
+        Semestre.objects.create(nombre='1', carrera=cls.carrera)
+        cls.usuario_admin = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        Administrador.objects.create(usuario=cls.usuario_admin)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario_admin)
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_304_sin_consultar_la_base(self):
+        cache.clear()
+        response = self.client.get('/api/semestres/')
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as consultas:
+            condicional = self.client.get('/api/semestres/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(condicional.status_code, 304)
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual(
+            self.client.get('/api/semestres/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_cambio_en_tabla_dependiente_invalida(self):
+        cache.clear()
+        response = self.client.get('/api/semestres/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrera.nombre = 'Informática'
+            self.carrera.save()
+        condicional = self.client.get('/api/semestres/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(condicional.status_code, 200)
+        self.assertNotEqual(condicional['ETag'], response['ETag'])
+        self.assertIn('Informática', condicional.content.decode())
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_las_versiones_cambian_al_confirmar(self):
+        cache.clear()
+        antes = (obtener_version('catalogo'), obtener_version(nombre_tabla(Carrera)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrera.nombre = 'Informática'
+            self.carrera.save()
+            # Dentro de la transacción otra petición aún ve las versiones anteriores
+            self.assertEqual((obtener_version('catalogo'), obtener_version(nombre_tabla(Carrera))), antes)
+        despues = (obtener_version('catalogo'), obtener_version(nombre_tabla(Carrera)))
+        self.assertTrue(all(nueva > vieja for nueva, vieja in zip(despues, antes)))
+
+    def test_sin_validadores_con_cache_local(self):
+        response = self.client.get('/api/semestres/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class ContadoresSesionTests(TestCase):
+    """Los contadores de SesionClase siguen a sus registros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        cls.estudiantes = [
+            Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f'e{i}@est.emi.edu.bo', 'Eva', f'E{i}', 'clave'),
+                codigo_institucional=f'E{i}', carrera=carrera, semestre_actual=semestre,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.sesion = SesionClase.objects.create(
+            materia_semestre=self.materia_semestre, fecha=date(2025, 3, 3), hora_inicio=time(8), hora_fin=time(10),
+        )
+
+    def _contadores(self):
+        return dict(SesionClase.objects.filter(pk=self.sesion.pk).values(*SesionClase.CAMPOS_CONTADORES)[0])
+
+    def test_crear_cambiar_y_eliminar_registro(self):
+        self.assertEqual(self._contadores()['total_estudiantes'], 3)
+        registro = RegistroAsistencia.objects.create(estudiante=self.estudiantes[0], sesion=self.sesion, estado='PRESENTE')
+        RegistroAsistencia.objects.create(estudiante=self.estudiantes[1], sesion=self.sesion, estado='FALTA')
+        self.assertEqual(self._contadores(), {
+            'presentes': 1, 'retrasos': 0, 'faltas': 1, 'faltas_justificadas': 0, 'total_estudiantes': 3,
+        })
+        registro.estado = 'RETRASO'
+        registro.save()
+        self.assertEqual((self._contadores()['presentes'], self._contadores()['retrasos']), (0, 1))
+        registro.delete()
+        self.assertEqual((self._contadores()['retrasos'], self._contadores()['faltas']), (0, 1))
+
+    def test_save_completo_no_pisa_los_contadores(self):
+        # Instancia cargada antes de que otro proceso registre asistencia
+        sesion = SesionClase.objects.get(pk=self.sesion.pk)
+        RegistroAsistencia.objects.create(estudiante=self.estudiantes[0], sesion=self.sesion, estado='PRESENTE')
+        sesion.tema = 'Límites'
+        sesion.save()
+        self.assertEqual(self._contadores()['presentes'], 1)
+        self.assertEqual(SesionClase.objects.get(pk=self.sesion.pk).tema, 'Límites')
+
+    def test_calendario_fija_el_plantel_de_las_planificadas(self):
+        creadas, _ = generar_calendario('2025/1', date(2025, 3, 1), date(2025, 4, 30))
+        self.assertGreater(creadas, 0)
+        self.assertFalse(sesiones_desincronizadas().exists())
+        self.assertEqual(
+            set(SesionClase.objects.planificadas().values_list('total_estudiantes', flat=True)), {3}
+        )
+
+    def test_solo_verificar_consulta_una_vez(self):
+        SesionClase.objects.filter(pk=self.sesion.pk).update(faltas=5)
+        salida = io.StringIO()
+        with self.assertNumQueries(1):
+            call_command('recalcular_contadores_sesion', solo_verificar=True, stdout=salida)
+        self.assertIn(f'1 sesiones con contadores incorrectos (ids: {self.sesion.pk})', salida.getvalue())
+        call_command('recalcular_contadores_sesion', stdout=io.StringIO())
+        self.assertFalse(sesiones_desincronizadas().exists())
+
+
+class MatrizAsistenciaTests(TestCase):
+    """Tasas y rachas de la matriz, su construcción y su invalidación en caché."""
+
+    def _matriz(self):
+        # 1 PRESENTE, 2 RETRASO, 3 FALTA, 4 FALTA_JUSTIFICADA, 0 sin registro
+        return MatrizAsistencia(1, [10, 20, 30], [1, 2, 3, 4, 5], [
+            [1, 3, 3, 0, 2],
+            [4, 3, 1, 3, 3],
+            [0, 0, 0, 0, 0],
+        ])
+
+    def test_tasas(self):
+        matriz = self._matriz()
+        self.assertEqual(matriz.tasas_por_estudiante().tolist(), [40.0, 20.0, 0.0])
+        self.assertEqual(
+            [round(t, 2) for t in matriz.tasas_por_sesion().tolist()], [33.33, 0.0, 33.33, 0.0, 33.33]
+        )
+        vacia = MatrizAsistencia(1, [10], [], [[]])
+        self.assertEqual(vacia.tasas_por_estudiante().tolist(), [0.0])
+
+    def test_rachas_de_faltas(self):
+        matriz = self._matriz()
+        # La falta justificada corta la racha
+        self.assertEqual(matriz.rachas_maximas_faltas().tolist(), [3, 2, 5])
+        self.assertEqual(matriz.rachas_actuales_faltas().tolist(), [0, 2, 5])
+
+    def test_conteos_estudiante(self):
+        matriz = self._matriz()
+        self.assertEqual(
+            matriz.conteos_estudiante(20), {'PRESENTE': 1, 'RETRASO': 0, 'FALTA': 3, 'FALTA_JUSTIFICADA': 1}
+        )
+        self.assertEqual(set(matriz.conteos_estudiante(99).values()), {0})
+
+    def _datos(self):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        estudiantes = [
+            Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f'e{i}@est.emi.edu.bo', 'Eva', f'E{i}', 'clave'),
+                codigo_institucional=f'E{i}', carrera=carrera, semestre_actual=semestre,
+            )
+            for i in range(2)
+        ]
+        sesiones = [
+            SesionClase.objects.create(
+                materia_semestre=materia_semestre, fecha=date(2025, 3, 3) + timedelta(days=7 * i),
+                hora_inicio=time(8), hora_fin=time(10),
+            )
+            for i in range(2)
+        ]
+        return materia_semestre, estudiantes, sesiones
+
+    def test_construir(self):
+        materia_semestre, estudiantes, sesiones = self._datos()
+        RegistroAsistencia.objects.create(estudiante=estudiantes[0], sesion=sesiones[1], estado='RETRASO')
+        matriz = MatrizAsistencia.construir(materia_semestre.pk)
+        self.assertEqual(matriz.estudiante_ids.tolist(), [e.pk for e in estudiantes])
+        self.assertEqual(matriz.sesion_ids.tolist(), [s.pk for s in sesiones])
+        self.assertEqual(matriz.codigos.tolist(), [[0, 2], [0, 0]])
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_registro_nuevo_invalida_la_matriz_en_cache(self):
+        cache.clear()
+        materia_semestre, estudiantes, sesiones = self._datos()
+        self.assertEqual(obtener_matriz(materia_semestre.pk).conteos_estudiante(estudiantes[0].pk)['PRESENTE'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            RegistroAsistencia.objects.create(estudiante=estudiantes[0], sesion=sesiones[0], estado='PRESENTE')
+        self.assertEqual(obtener_matriz(materia_semestre.pk).conteos_estudiante(estudiantes[0].pk)['PRESENTE'], 1)
+
+    def _resumen(self):
+        materia_semestre, estudiantes, sesiones = self._datos()
+        RegistroAsistencia.objects.create(estudiante=estudiantes[0], sesion=sesiones[0], estado='PRESENTE')
+        RegistroAsistencia.objects.create(estudiante=estudiantes[0], sesion=sesiones[1], estado='FALTA')
+        cliente = APIClient()
+        cliente.force_authenticate(user=estudiantes[0].usuario)
+        resumen = cliente.get('/api/estudiantes/resumen-asistencias/').json()
+        self.assertEqual(
+            {clave: resumen[0][clave] for clave in ('total_clases', 'asistencias', 'faltas', 'tardanzas', 'porcentaje_asistencia')},
+            {'total_clases': 2, 'asistencias': 1, 'faltas': 1, 'tardanzas': 0, 'porcentaje_asistencia': 50.0},
+        )
+
+    def test_resumen_sin_cache_compartida_no_construye_la_matriz(self):
+        with mock.patch.object(MatrizAsistencia, 'construir', side_effect=AssertionError('matriz construida')):
+            self._resumen()
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_resumen_con_cache_compartida_usa_la_matriz(self):
+        cache.clear()
+        with mock.patch.object(MatrizAsistencia, 'construir', wraps=MatrizAsistencia.construir) as construir:
+            self._resumen()
+        construir.assert_called_once()
+
+    @override_settings(CACHES=CACHE_ARCHIVOS)
+    def test_cambio_de_semestre_invalida_las_dos_matrices(self):
+        cache.clear()
+        materia_semestre, estudiantes, sesiones = self._datos()
+        otro_semestre = Semestre.objects.create(nombre='2', carrera=materia_semestre.semestre.carrera)
+        otra_materia = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Física I'), semestre=otro_semestre,
+            gestion='2025/1', dia_semana='Martes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        self.assertIn(estudiantes[0].pk, obtener_matriz(materia_semestre.pk).estudiante_ids.tolist())
+        self.assertNotIn(estudiantes[0].pk, obtener_matriz(otra_materia.pk).estudiante_ids.tolist())
+        with self.captureOnCommitCallbacks(execute=True):
+            estudiantes[0].semestre_actual = otro_semestre
+            estudiantes[0].save()
+        self.assertNotIn(estudiantes[0].pk, obtener_matriz(materia_semestre.pk).estudiante_ids.tolist())
+        self.assertIn(estudiantes[0].pk, obtener_matriz(otra_materia.pk).estudiante_ids.tolist())
+
+
+class ToleranciaTests(TestCase):
+    """Reclasificación PRESENTE / RETRASO al cambiar la tolerancia de una materia o carrera."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=cls.carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(20), hora_fin=time(22),
+        )
+        # 20:00 en La Paz son las 00:00 UTC del día siguiente
+        sesion = SesionClase.objects.create(
+            materia_semestre=cls.materia_semestre, fecha=date(2025, 3, 3), hora_inicio=time(20), hora_fin=time(22),
+        )
+        zona = timezone.get_current_timezone()
+        minutos = [0, 5, 10, 11, 30, 130]
+        for i, minuto in enumerate(minutos):
+            estudiante = Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f't{i}@est.emi.edu.bo', 'Tina', f'T{i}', 'clave'),
+                codigo_institucional=f'T{i}', carrera=cls.carrera, semestre_actual=semestre,
+            )
+            registro = RegistroAsistencia.objects.create(estudiante=estudiante, sesion=sesion, estado='RETRASO')
+            RegistroAsistencia.objects.filter(pk=registro.pk).update(
+                fecha_registro=datetime(2025, 3, 3, 20, tzinfo=zona) + timedelta(minutes=minuto)
+            )
+        # Las faltas materializadas no se reclasifican
+        RegistroAsistencia.objects.filter(estudiante__codigo_institucional='T5').update(
+            estado='FALTA', materializado=True
+        )
+
+    def _estados(self):
+        return list(RegistroAsistencia.objects.order_by('estudiante__codigo_institucional').values_list('estado', flat=True))
+
+    def test_cambio_en_la_materia_reclasifica_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materia_semestre.tolerancia_minutos = 10
+            self.materia_semestre.save()
+        self.assertEqual(self._estados(), ['PRESENTE', 'PRESENTE', 'PRESENTE', 'RETRASO', 'RETRASO', 'FALTA'])
+
+    def test_cambio_en_la_carrera_queda_pendiente(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrera.tolerancia_minutos = 30
+            self.carrera.save()
+        self.assertTrue(Carrera.objects.get(pk=self.carrera.pk).tolerancia_pendiente)
+        self.assertEqual(set(self._estados()), {'RETRASO', 'FALTA'})
+
+        self.assertEqual(reclasificar_pendientes(), (1, 1, 5))
+        self.assertFalse(Carrera.objects.get(pk=self.carrera.pk).tolerancia_pendiente)
+        self.assertEqual(self._estados(), ['PRESENTE'] * 5 + ['FALTA'])
+        self.assertEqual(reclasificar_pendientes(), (0, 0, 0))
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'AT TIME ZONE se prueba en PostgreSQL')
+    def test_update_sql_coincide_con_estado_por_hora(self):
+        for tolerancia in (0, 10, 60):
+            with self.subTest(tolerancia=tolerancia):
+                _reclasificar_sql(self.materia_semestre.pk, tolerancia)
+                for estado, fecha_registro, fecha, hora_inicio, materializado in RegistroAsistencia.objects.values_list(
+                    'estado', 'fecha_registro', 'sesion__fecha', 'sesion__hora_inicio', 'materializado'
+                ):
+                    esperado = 'FALTA' if materializado else estado_por_hora(fecha_registro, fecha, hora_inicio, tolerancia)
+                    self.assertEqual(estado, esperado)
+
+
+class PlantelesTests(TestCase):
+    """Los planteles salen por apellido y nombre, con cualquiera de las dos fuentes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        # Creados en un orden distinto del alfabético
+        for i, (nombre, apellido) in enumerate([('Zoe', 'Rojas'), ('Ana', 'Vargas'), ('Luis', 'Mamani'), ('Ana', 'Rojas')]):
+            estudiante = Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f'p{i}@est.emi.edu.bo', nombre, apellido, 'clave'),
+                codigo_institucional=f'P{i}', carrera=carrera, semestre_actual=semestre,
+            )
+            Inscripcion.objects.create(estudiante=estudiante, materia_semestre=cls.materia_semestre)
+
+    def _nombres(self):
+        plantel = cargar_planteles([self.materia_semestre])[self.materia_semestre.pk]
+        return [(e['usuario__apellido'], e['usuario__nombre']) for e in plantel]
+
+    def test_orden_alfabetico(self):
+        esperado = [('Mamani', 'Luis'), ('Rojas', 'Ana'), ('Rojas', 'Zoe'), ('Vargas', 'Ana')]
+        for fuente in ('cohorte', 'inscripcion'):
+            with self.subTest(fuente=fuente), override_settings(ROSTER_FUENTE=fuente):
+                self.assertEqual(self._nombres(), esperado)
+
+
+class CierreSesionesTests(TestCase):
+    """cerrar_sesiones: faltas, faltas justificadas, repetición y escaneos concurrentes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        cls.materia_semestre = MateriaSemestre.objects.create(
+            materia=Materia.objects.create(nombre='Cálculo I'), semestre=semestre,
+            gestion='2025/1', dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(10),
+        )
+        cls.estudiantes = {}
+        for i, apellido in enumerate(['Rojas', 'Mamani', 'Vargas']):
+            cls.estudiantes[apellido] = Estudiante.objects.create(
+                usuario=Usuario.objects.create_user(f'c{i}@est.emi.edu.bo', 'Eva', apellido, 'clave'),
+                codigo_institucional=f'C{i}', carrera=carrera, semestre_actual=semestre,
+            )
+        cls.sesion = SesionClase.objects.create(
+            materia_semestre=cls.materia_semestre, fecha=date(2025, 3, 3), hora_inicio=time(8), hora_fin=time(10),
+        )
+        RegistroAsistencia.objects.create(estudiante=cls.estudiantes['Rojas'], sesion=cls.sesion, estado='PRESENTE')
+        cls.permiso = PermisoAsistencia.objects.create(
+            estudiante=cls.estudiantes['Vargas'], motivo='Salud', estado='APROBADO',
+            fecha_inicio=date(2025, 3, 3), fecha_fin=date(2025, 3, 3),
+        )
+        cls.permiso.sesiones_cubiertas.add(cls.sesion)
+        cls.momento = datetime(2025, 3, 3, 11)
+
+    def _registros(self):
+        return {
+            apellido: (estado, permiso_id, materializado)
+            for apellido, estado, permiso_id, materializado in RegistroAsistencia.objects.values_list(
+                'estudiante__usuario__apellido', 'estado', 'permiso_asistencia_id', 'materializado'
+            )
+        }
+
+    def _contadores(self):
+        return SesionClase.objects.values_list(
+            'cerrada', 'presentes', 'faltas', 'faltas_justificadas', 'total_estudiantes'
+        ).get(pk=self.sesion.pk)
+
+    def test_inserta_faltas_y_faltas_justificadas(self):
+        self.assertEqual(cerrar_sesiones(datetime(2025, 3, 3, 9, 59)), (0, 0, 0))
+        self.assertEqual(cerrar_sesiones(self.momento), (1, 1, 1))
+        self.assertEqual(self._registros(), {
+            'Rojas': ('PRESENTE', None, False),
+            'Mamani': ('FALTA', None, True),
+            'Vargas': ('FALTA_JUSTIFICADA', self.permiso.pk, True),
+        })
+        self.assertEqual(self._contadores(), (True, 1, 1, 1, 3))
+
+    def test_repetir_el_cierre_no_cambia_nada(self):
+        cerrar_sesiones(self.momento)
+        registros = self._registros()
+        self.assertEqual(cerrar_sesiones(self.momento), (0, 0, 0))
+        SesionClase.objects.filter(pk=self.sesion.pk).update(cerrada=False)
+        cerrar_sesiones(self.momento)
+        self.assertEqual(self._registros(), registros)
+        self.assertEqual(self._contadores(), (True, 1, 1, 1, 3))
+
+    def test_justifica_las_faltas_existentes_en_un_solo_update(self):
+        otra = SesionClase.objects.create(
+            materia_semestre=self.materia_semestre, fecha=date(2025, 3, 10), hora_inicio=time(8), hora_fin=time(10),
+        )
+        self.permiso.sesiones_cubiertas.add(otra)
+        # FALTA registradas antes de que el permiso las cubriera (update() no emite señales)
+        for sesion in (self.sesion, otra):
+            RegistroAsistencia.objects.create(estudiante=self.estudiantes['Vargas'], sesion=sesion, estado='FALTA')
+        RegistroAsistencia.objects.filter(estudiante=self.estudiantes['Vargas']).update(
+            estado='FALTA', permiso_asistencia=None
+        )
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(cerrar_sesiones(datetime(2025, 3, 10, 11)), (2, 3, 2))
+        tabla = RegistroAsistencia._meta.db_table
+        actualizaciones = [q['sql'] for q in consultas if q['sql'].startswith(f'UPDATE "{tabla}"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertEqual(
+            set(RegistroAsistencia.objects.filter(estudiante=self.estudiantes['Vargas']).values_list(
+                'estado', 'permiso_asistencia_id'
+            )),
+            {('FALTA_JUSTIFICADA', self.permiso.pk)},
+        )
+
+    def test_escaneo_durante_el_cierre(self):
+        coberturas = cierre._coberturas
+
+        def escanear_y_leer(sesion_ids):
+            # El escaneo llega después de que el cierre leyó los registros existentes
+            RegistroAsistencia.objects.create(estudiante=self.estudiantes['Mamani'], sesion=self.sesion, estado='RETRASO')
+            return coberturas(sesion_ids)
+
+        with mock.patch.object(cierre, '_coberturas', escanear_y_leer):
+            cerrar_sesiones(self.momento)
+        self.assertEqual(self._registros()['Mamani'], ('RETRASO', None, False))
+        self.assertEqual(RegistroAsistencia.objects.count(), 3)
+        self.assertEqual(
+            SesionClase.objects.values_list('presentes', 'retrasos', 'faltas').get(pk=self.sesion.pk), (1, 1, 0)
+        )
+
+    def test_lista_de_la_sesion_por_apellido(self):
+        orden = ['Mamani', 'Rojas', 'Vargas']
+        abierta = asistencia_de_sesion(self.sesion)
+        self.assertEqual([estudiante['usuario__apellido'] for estudiante, _ in abierta], orden)
+        cerrar_sesiones(self.momento)
+        self.sesion.refresh_from_db()
+        cerrada = asistencia_de_sesion(self.sesion)
+        self.assertEqual([estudiante['usuario__apellido'] for estudiante, _ in cerrada], orden)
+        self.assertEqual([registro.estado for _, registro in cerrada], ['FALTA', 'PRESENTE', 'FALTA_JUSTIFICADA'])
+
+
+class CompresionTests(TestCase):
+    """Mitigación de BREACH y estadísticas de compresión en la caché."""
+
+    contenido = ('{"materias": [' + ', '.join(f'{{"id": {i}, "nombre": "Materia {i}"}}' for i in range(200)) + ']}').encode()
+
+    def _comprimir(self, ruta, **cabeceras):
+        request = RequestFactory().get(ruta, HTTP_ACCEPT_ENCODING='gzip, br', **cabeceras)
+        request.resolver_match = resolve(ruta)
+        respuesta = HttpResponse(self.contenido, content_type='application/json')
+        return CompresionMiddleware(lambda request: respuesta).process_response(request, respuesta)
+
+    def test_rutas_con_secretos_no_se_comprimen(self):
+        for ruta in ('/api/login/', '/api/token/refresh/', '/api/csrf_token/'):
+            with self.subTest(ruta=ruta):
+                self.assertFalse(self._comprimir(ruta).has_header('Content-Encoding'))
+
+    def test_gzip_con_relleno_aleatorio(self):
+        primera, segunda = self._comprimir('/api/materias/'), self._comprimir('/api/materias/')
+        self.assertEqual(primera['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(primera.content), self.contenido)
+        self.assertNotEqual(primera.content, segunda.content)
+
+    def test_con_credenciales_no_se_usa_brotli(self):
+        anonima = RequestFactory().get('/api/materias/', HTTP_ACCEPT_ENCODING='br, gzip')
+        con_token = RequestFactory().get('/api/materias/', HTTP_ACCEPT_ENCODING='br, gzip', HTTP_AUTHORIZATION='Bearer x')
+        con_sesion = RequestFactory().get('/api/materias/', HTTP_ACCEPT_ENCODING='br, gzip')
+        con_sesion.COOKIES[settings.SESSION_COOKIE_NAME] = 'x'
+        with mock.patch.object(compresion, 'brotli', object()):
+            self.assertEqual(compresion._negociar(anonima), 'br')
+            self.assertEqual(compresion._negociar(con_token), 'gzip')
+            self.assertEqual(compresion._negociar(con_sesion), 'gzip')
+
+    @override_settings(CACHES=CACHE_ARCHIVOS, COMPRESION_ESTADISTICAS=True)
+    def test_estadisticas_en_la_cache(self):
+        cache.clear()
+        compresion._registrar('materia-list', 1000, 200)
+        compresion._registrar('materia-list', 1000, 300)
+        compresion._registrar('carrera-list', 500, 100)
+        estadisticas = compresion.estadisticas()
+        self.assertEqual(list(estadisticas), ['carrera-list', 'materia-list'])
+        self.assertEqual(
+            estadisticas['materia-list'],
+            {'respuestas': 2, 'bytes_originales': 2000, 'bytes_comprimidos': 500,
+             'bytes_ahorrados': 1500, 'porcentaje_ahorro': 75.0},
+        )
+
+    def test_estadisticas_desactivadas(self):
+        cache.clear()
+        compresion._registrar('materia-list', 1000, 200)
+        self.assertEqual(compresion.estadisticas(), {})
+
+
+class ArchivoIdsTests(TestCase):
+    """Las tablas de archivo guardan los ids originales, que son bigint."""
+
+    def test_ids_mayores_que_int32(self):
+        grande = 2 ** 40
+        RegistroAsistenciaArchivado.objects.create(
+            id=grande, gestion='2025/1', estudiante_id=grande + 1, sesion_id=grande + 2,
+            fecha_registro=timezone.now(), estado='PRESENTE', permiso_asistencia_id=grande + 3,
+        )
+        self.assertEqual(
+            RegistroAsistenciaArchivado.objects.values_list(
+                'id', 'estudiante_id', 'sesion_id', 'permiso_asistencia_id'
+            ).get(sesion_id=grande + 2),
+            (grande, grande + 1, grande + 2, grande + 3),
+        )
+        for modelo in (SesionClaseArchivada, RegistroAsistenciaArchivado, PermisoAsistenciaArchivado):
+            with self.subTest(modelo=modelo.__name__):
+                enteros = [campo for campo in modelo._meta.concrete_fields if campo.name == 'id' or campo.name.endswith('_id')]
+                self.assertTrue(enteros)
+                self.assertTrue(all(campo.get_internal_type() == 'BigIntegerField' for campo in enteros))
+
+
+class ORJSONRendererTests(TestCase):
+    """ORJSONRenderer produce los mismos bytes que el JSONRenderer de DRF."""
+
+    def test_misma_salida_que_drf(self):
+        zona = timezone.get_current_timezone()
+        datos = ReturnDict({
+            'utc': datetime(2025, 3, 3, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'local': datetime(2025, 3, 3, 8, 30, 15, 987654, tzinfo=zona),
+            'sin_zona': datetime(2025, 3, 3, 8, 30),
+            'fecha': date(2025, 3, 3),
+            'hora': time(8, 5, 0, 250000),
+            'decimal': Decimal('-16.500000'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'texto': 'Cálculo I',
+            'perezoso': gettext_lazy('Falta'),
+            'numpy': np.array([1, 2, 3]),
+            1: ReturnList([{'estado': 'PRESENTE', 'porcentaje': 87.5}], serializer=None),
+        }, serializer=None)
+        self.assertEqual(ORJSONRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_misma_salida_con_datos_de_la_api(self):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        Semestre.objects.create(nombre='1', carrera=carrera)
+        usuario = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        Administrador.objects.create(usuario=usuario)
+        datos = SemestreSerializer(Semestre.objects.all(), many=True).data
+        datos.append(UsuarioSerializer(usuario).data)
+        self.assertEqual(ORJSONRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_benchmark(self):
+        usuario = Usuario.objects.create_user('admin@emi.edu.bo', 'Ana', 'Admin', 'clave')
+        Administrador.objects.create(usuario=usuario)
+        salida = io.StringIO()
+        call_command('benchmark_json', repeticiones=1, stdout=salida)
+        for carga in ('registros-asistencia', 'resumen-asistencias-general', 'planteles'):
+            self.assertRegex(salida.getvalue(), rf'{carga}: [\d.]+ KB \| DRF [\d.]+ ms \| orjson [\d.]+ ms')
+
+
+class CacheCompartidaTests(TestCase):
+    """Varios workers exigen una caché compartida entre procesos."""
+
+    @override_settings(WEB_CONCURRENCY=2)
+    def test_varios_workers_con_memoria_local(self):
+        with self.assertRaises(ImproperlyConfigured):
+            verificar_cache_compartida()
+        with override_settings(CACHES=CACHE_ARCHIVOS):
+            verificar_cache_compartida()
+
+    def test_un_worker_con_memoria_local(self):
+        verificar_cache_compartida()
+
+    def test_check_deploy(self):
+        self.assertEqual([aviso.id for aviso in revisar_cache_compartida(None)], ['gestion_academica.W001'])
+        with override_settings(CACHES=CACHE_ARCHIVOS):
+            self.assertEqual(revisar_cache_compartida(None), [])
+
+
+class CalendarioTests(TestCase):
+    """Quitar sesiones planificadas: borrado en bloque e invalidación una vez por materia."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre='Sistemas')
+        semestre = Semestre.objects.create(nombre='1', carrera=carrera)
+        cls.materias = [
+            MateriaSemestre.objects.create(
+                materia=Materia.objects.create(nombre=nombre), semestre=semestre,
+                gestion='2025/1', dia_semana=dia, hora_inicio=time(8), hora_fin=time(10),
+            )
+            for nombre, dia in (('Cálculo I', 'Lunes'), ('Física I', 'Martes'))
+        ]
+        cls.estudiante = Estudiante.objects.create(
+            usuario=Usuario.objects.create_user('e@est.emi.edu.bo', 'Eva', 'E', 'clave'),
+            codigo_institucional='E1', carrera=carrera, semestre_actual=semestre,
+        )
+
+    def test_acortar_el_rango_borra_en_bloque(self):
+        generar_calendario('2025/1', date(2025, 3, 1), date(2025, 4, 30))
+        permiso = PermisoAsistencia.objects.create(estudiante=self.estudiante, motivo='Salud')
+        permiso.sesiones_cubiertas.set(SesionClase.objects.filter(fecha__gte=date(2025, 4, 1)))
+
+        with mock.patch.object(calendario, 'incrementar_version') as incrementar, \
+                mock.patch.object(calendario, 'invalidar_matriz') as invalidar, \
+                mock.patch('gestion_academica.signals.invalidar_matriz') as invalidar_por_senal:
+            creadas, eliminadas = generar_calendario('2025/1', date(2025, 3, 1), date(2025, 3, 31))
+        self.assertEqual(creadas, 0)
+        self.assertEqual(eliminadas, 9)  # lunes y martes de abril
+        self.assertFalse(SesionClase.objects.filter(fecha__gte=date(2025, 4, 1)).exists())
+        self.assertFalse(permiso.sesiones_cubiertas.exists())
+        # Una versión y una invalidación por materia, sin señales por sesión
+        incrementar.assert_called_once_with('asistencia')
+        self.assertEqual(sorted(c.args[0] for c in invalidar.call_args_list), [ms.pk for ms in self.materias])
+        invalidar_por_senal.assert_not_called()
+
+    def test_dia_especial_quita_las_sesiones_de_la_fecha(self):
+        generar_calendario('2025/1', date(2025, 3, 1), date(2025, 3, 31))
+        with mock.patch.object(calendario, 'invalidar_matriz') as invalidar:
+            DiaEspecial.objects.create(fecha=date(2025, 3, 3), tipo='FERIADO', descripcion='Feriado')
+        self.assertFalse(SesionClase.objects.filter(fecha=date(2025, 3, 3)).exists())
+        invalidar.assert_called_once_with(self.materias[0].pk)
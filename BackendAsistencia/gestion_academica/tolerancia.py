@@ -0,0 +1,157 @@
+"""
+Reclasificación PRESENTE / RETRASO cuando cambia la tolerancia.
+
+La tolerancia de una MateriaSemestre es la suya, si no la de su carrera y si
+no settings.ASISTENCIA_TOLERANCIA_MINUTOS (ver MateriaSemestre.tolerancia_efectiva).
+Al cambiar la de una materia se reclasifica solo esa materia al confirmar; al
+cambiar la de una carrera, que puede abarcar cientos de materias, la carrera
+queda marcada (tolerancia_pendiente) y `reclasificar_pendientes` la procesa
+fuera de la petición (recalcular_tolerancia --pendientes, desde cron).
+
+`recalcular_estados` emite un UPDATE ... CASE por
+cada materia afectada: compara fecha_registro, convertida a la hora local en
+SQL, con fecha + hora_inicio de la sesión más la tolerancia, y solo escribe
+las filas cuyo estado cambia. Las faltas y faltas justificadas no se tocan.
+
+Luego recalcula los contadores de las sesiones modificadas (contadores.py) e
+invalida la caché de asistencia y las matrices, porque el UPDATE no emite
+señales. La conversión a hora local en SQL requiere PostgreSQL; con otro
+motor (SQLite en desarrollo) se calcula por lotes en Python con la misma regla.
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .archivo import gestiones_archivadas
+from .cache_respuestas import incrementar_version
+from .contadores import recalcular_contadores
+from .matriz_asistencia import invalidar_matriz
+from .models import Carrera, MateriaSemestre, RegistroAsistencia, SesionClase, tolerancia_global
+
+TAMANO_LOTE = 2000
+
+
+def estado_por_hora(fecha_registro, fecha, hora_inicio, tolerancia_minutos, zona=None):
+    """PRESENTE o RETRASO según los minutos entre el inicio de la sesión y la hora local del registro."""
+    if timezone.is_aware(fecha_registro):
+        fecha_registro = fecha_registro.astimezone(zona or timezone.get_current_timezone()).replace(tzinfo=None)
+    diferencia = (fecha_registro - datetime.combine(fecha, hora_inicio)).total_seconds()
+    return 'PRESENTE' if diferencia <= tolerancia_minutos * 60 else 'RETRASO'
+
+
+def con_tolerancia(materias_semestre):
+    """Anota `tolerancia` (materia, carrera o global) en un queryset de MateriaSemestre."""
+    return materias_semestre.annotate(tolerancia=Coalesce(
+        F('tolerancia_minutos'), F('semestre__carrera__tolerancia_minutos'), Value(tolerancia_global())
+    ))
+
+
+_SQL_RECLASIFICAR = """
+    UPDATE {registro} AS r
+    SET estado = {nuevo_estado}
+    FROM {sesion} AS s
+    WHERE r.sesion_id = s.id
+      AND s.materia_semestre_id = %s
+      AND r.estado IN ('PRESENTE', 'RETRASO')
+      AND NOT r.materializado
+      AND r.estado <> {nuevo_estado}
+    RETURNING r.sesion_id
+"""
+_CASE_ESTADO = (
+    "CASE WHEN (r.fecha_registro AT TIME ZONE %s) <= s.fecha + s.hora_inicio + %s * INTERVAL '1 minute' "
+    "THEN 'PRESENTE' ELSE 'RETRASO' END"
+)
+
+
+def _reclasificar_sql(materia_semestre_id, tolerancia):
+    """Un UPDATE ... CASE para la materia. Retorna los ids de sesión de las filas modificadas."""
+    q = connection.ops.quote_name
+    sql = _SQL_RECLASIFICAR.format(
+        registro=q(RegistroAsistencia._meta.db_table),
+        sesion=q(SesionClase._meta.db_table),
+        nuevo_estado=_CASE_ESTADO,
+    )
+    zona = timezone.get_current_timezone_name()
+    with connection.cursor() as cursor:
+        # El CASE aparece dos veces (SET y WHERE), cada una con sus parámetros
+        cursor.execute(sql, [zona, tolerancia, materia_semestre_id, zona, tolerancia])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _reclasificar_python(materia_semestre_id, tolerancia, tamano_lote=TAMANO_LOTE):
+    """Misma reclasificación por lotes en Python, para motores sin AT TIME ZONE."""
+    registros = RegistroAsistencia.objects.filter(
+        sesion__materia_semestre_id=materia_semestre_id,
+        estado__in=('PRESENTE', 'RETRASO'),
+        materializado=False,
+    ).order_by('id')
+    zona = timezone.get_current_timezone()
+    sesiones = []
+    ultimo_id = 0
+    while True:
+        filas = list(registros.filter(id__gt=ultimo_id).values_list(
+            'id', 'estado', 'fecha_registro', 'sesion_id', 'sesion__fecha', 'sesion__hora_inicio'
+        )[:tamano_lote])
+        if not filas:
+            return sesiones
+        ultimo_id = filas[-1][0]
+        cambios = []
+        for registro_id, estado, fecha_registro, sesion_id, fecha, hora_inicio in filas:
+            nuevo = estado_por_hora(fecha_registro, fecha, hora_inicio, tolerancia, zona)
+            if nuevo != estado:
+                cambios.append(RegistroAsistencia(id=registro_id, estado=nuevo))
+                sesiones.append(sesion_id)
+        if cambios:
+            RegistroAsistencia.objects.bulk_update(cambios, ['estado'])
+
+
+def recalcular_estados(materias_semestre=None, progreso=None):
+    """
+    Reclasifica los registros de `materias_semestre` (queryset; por defecto
+    todas las de gestiones no archivadas) con su tolerancia efectiva.
+    Retorna (materias, registros modificados).
+    """
+    if materias_semestre is None:
+        materias_semestre = MateriaSemestre.objects.all()
+    materias = list(
+        con_tolerancia(materias_semestre.exclude(gestion__in=gestiones_archivadas()))
+        .order_by('id').values_list('id', 'tolerancia')
+    )
+    reclasificar = _reclasificar_sql if connection.vendor == 'postgresql' else _reclasificar_python
+
+    modificados = 0
+    for materia_semestre_id, tolerancia in materias:
+        # Los estados y los contadores de sus sesiones cambian juntos
+        with transaction.atomic():
+            sesiones = reclasificar(materia_semestre_id, tolerancia)
+            if sesiones:
+                recalcular_contadores(SesionClase.objects.filter(pk__in=set(sesiones)))
+        if sesiones:
+            modificados += len(sesiones)
+            invalidar_matriz(materia_semestre_id)
+            if progreso:
+                progreso(f'MateriaSemestre {materia_semestre_id} (tolerancia {tolerancia} min): '
+                         f'{len(sesiones)} registros reclasificados')
+    if modificados:
+        incrementar_version('asistencia')
+    return len(materias), modificados
+
+
+def reclasificar_pendientes(progreso=None):
+    """
+    Reclasifica las materias que heredan la tolerancia de las carreras
+    marcadas y quita la marca. Retorna (carreras, materias, registros modificados).
+    """
+    carreras = list(Carrera.objects.filter(tolerancia_pendiente=True).values_list('id', flat=True))
+    if not carreras:
+        return 0, 0, 0
+    # La marca se quita antes: un cambio durante la reclasificación vuelve a marcarla
+    Carrera.objects.filter(pk__in=carreras).update(tolerancia_pendiente=False)
+    total_materias, modificados = recalcular_estados(
+        MateriaSemestre.objects.filter(semestre__carrera__in=carreras, tolerancia_minutos__isnull=True),
+        progreso=progreso,
+    )
+    return len(carreras), total_materias, modificados
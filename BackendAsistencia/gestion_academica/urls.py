@@ -7,7 +7,8 @@ from .views import (
     SemestreViewSet, MateriaViewSet, MateriaSemestreViewSet, DocenteMateriaSemestreViewSet,
     SesionClaseViewSet, CredencialQRViewSet, PermisoAsistenciaViewSet, RegistroAsistenciaViewSet, ReporteViewSet, MisMateriasListView,
     MisMateriasConEstudiantesListView, InscripcionViewSet, MisMateriasEstudianteView, DiaEspecialViewSet, csrf_token, get_csrf_token,
-    generar_reporte_asistencia, listar_reportes_admin, descargar_reporte_pdf, enviar_notificacion_prueba, resumen_asistencias_general, get_filtros_asistencia
+    generar_reporte_asistencia, listar_reportes_admin, descargar_reporte_pdf, enviar_notificacion_prueba, resumen_asistencias_general, get_filtros_asistencia,
+    estadisticas_cache, estadisticas_compresion, horario_actual, generar_calendario_gestion
 )
 
 # Crea una instancia de DefaultRouter
@@ -57,5 +58,9 @@ urlpatterns = [
     path('enviar-notificacion-prueba/', enviar_notificacion_prueba),
     path('resumen-asistencias-general/', resumen_asistencias_general, name='resumen-asistencias-general'),
     path('filtros-asistencia/', get_filtros_asistencia, name='get-filtros-asistencia'),
+    path('horario-actual/', horario_actual, name='horario-actual'),
+    path('generar-calendario/', generar_calendario_gestion, name='generar-calendario'),
+    path('estadisticas-cache/', estadisticas_cache, name='estadisticas-cache'),
+    path('estadisticas-compresion/', estadisticas_compresion, name='estadisticas-compresion'),
 ]
 
@@ -7,22 +7,26 @@ from rest_framework.decorators import api_view, permission_classes
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework_simplejwt.tokens import RefreshToken
 import qrcode
 import base64
 import json
 from io import BytesIO
 from rest_framework import status
-from datetime import datetime, timedelta
+from datetime import datetime
 from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from .permisos import IsEstudiante, IsDocente, IsAdministrador
+from .principal import ADMINISTRADOR, DOCENTE, ESTUDIANTE, Principal, obtener_principal, tokens_para_principal
+from .planteles import cargar_planteles
+from .cierre import asistencia_de_sesion
+from .justificaciones import aprobar_permiso, revertir_permiso
 from django.middleware.csrf import get_token
 import calendar
-from datetime import date, timedelta
+from datetime import date
+from django.db import IntegrityError, transaction
 from django.db.models import Prefetch
-from django.db.models import Exists, OuterRef
-from django.db.models import Count, Case, When, F, Q, Sum
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models import Count, F, Q, Sum
 from django.http import HttpResponse
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
@@ -38,7 +42,6 @@ from exponent_server_sdk import PushClient, PushMessage
 from math import radians, sin, cos, sqrt, atan2
 from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action, permission_classes
-from django.db.models import Count, Case, When, F, Q
 from django.db.models import Prefetch
 
 dias_semana_map = {
@@ -50,7 +53,8 @@ from .models import (
     Usuario, Carrera, Semestre, Materia,
     Estudiante, Docente, Administrador,
     MateriaSemestre, DocenteMateriaSemestre, SesionClase,
-    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, Inscripcion, DiaEspecial
+    CredencialQR, PermisoAsistencia, RegistroAsistencia, Reporte, Inscripcion, DiaEspecial,
+    ResumenAsistenciaArchivado, ResumenMateriaArchivado, numero_dia_semana
 )
 from .serializers import (
     UsuarioSerializer, CarreraSerializer, SemestreSerializer, MateriaSerializer,
@@ -59,6 +63,33 @@ from .serializers import (
     CredencialQRSerializer, PermisoAsistenciaSerializer, RegistroAsistenciaSerializer, ReporteSerializer, MisMateriasSerializer,
     MisMateriasConEstudiantesSerializer, InscripcionSerializer, InscripcionCreateSerializer, MateriaEstudianteSerializer, MateriaSemestreMiniSerializer, DiaEspecialSerializer
 )
+from .cache_respuestas import cache_compartida, cachear_respuesta, estadisticas as estadisticas_cache_respuestas
+from .cache_condicional import CatalogoCondicionalMixin
+from .matriz_asistencia import obtener_matriz
+from .compresion import estadisticas as estadisticas_compresion_respuestas
+from .replicas import lectura_replica
+from .horarios import ANTICIPACION_MINUTOS, indice_horario
+from .calendario import ErrorCalendario, generar_calendario
+from .archivo import gestiones_archivadas, historial_archivado, totales_archivados_por_materia
+
+class ConsultaOptimizadaMixin:
+    """
+    Aplica los ?fields= / ?expand= del serializador al queryset de las lecturas:
+    select_related, prefetch_related y only() según los campos de la respuesta.
+    Los listados usan la versión plana del serializador salvo que se pida ?expand=.
+    """
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['es_listado'] = self.action == 'list'
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in permissions.SAFE_METHODS:
+            serializer = self.get_serializer()
+            if hasattr(serializer, 'optimizar_queryset'):
+                queryset = serializer.optimizar_queryset(queryset)
+        return queryset
 
 # ----------------------------------------------------
 # Vistas para la gestión de usuarios y autenticación (estas NO son ViewSets)
@@ -74,7 +105,7 @@ def csrf_token(request):
     token = get_token(request)
     return Response({'csrfToken': token})
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
     permission_classes = [permissions.AllowAny] # Ajustar según necesidades de registro/seguridad
@@ -84,29 +115,30 @@ class UsuarioViewSet(viewsets.ModelViewSet):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
+    """
+    Autentica y emite el par JWT. Con `modo: 'token'` (clientes de la API, app
+    móvil) no se crea la sesión de Django: no hay fila en django_session ni cookie.
+    """
     email = request.data.get('email')
     password = request.data.get('password')
+    solo_token = request.data.get('modo') == 'token'
 
     user = authenticate(request, email=email, password=password)
 
     if user is not None:
-        login(request, user)
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
-
-        # Lógica final y precisa para determinar el rol del usuario
-        role = None
-        if hasattr(user, 'administrador_perfil'):
-            role = 'administrador'
-        elif hasattr(user, 'docente_perfil'):
-            role = 'docente'
-        elif hasattr(user, 'estudiante_perfil'):
-            role = 'estudiante'
+        # Perfiles en una sola consulta; viajan como claim del access token
+        principal = Principal.desde_usuario(user)
+        role = principal.rol
 
         if role is None:
             # Puedes manejar aquí el caso de un usuario sin un perfil definido
             return Response({'detail': 'Rol de usuario no asignado'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not solo_token:
+            login(request, user)
+        refresh, access = tokens_para_principal(principal)
+        access_token = str(access)
+
         return Response({
             'access': access_token,
             'refresh': str(refresh),
@@ -135,12 +167,14 @@ def csrf_token(request):
 # ViewSets para los modelos de la aplicación (¡Usando ModelViewSet!)
 # ----------------------------------------------------
 
-class CarreraViewSet(viewsets.ModelViewSet):
+class CarreraViewSet(CatalogoCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Carrera.objects.all()
     serializer_class = CarreraSerializer
+    ordering_cursor = 'nombre'
+    tablas_catalogo = (Carrera,)
     permission_classes = [permissions.IsAuthenticated]
 
-class EstudianteViewSet(viewsets.ModelViewSet):
+class EstudianteViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar estudiantes.
     """
@@ -148,6 +182,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         'usuario', 'carrera', 'semestre_actual'
     )
     serializer_class = EstudianteSerializer
+    ordering_cursor = 'codigo_institucional'
     permission_classes = [permissions.IsAuthenticated, IsEstudiante | IsAdministrador]
 
     def get_queryset(self):
@@ -225,6 +260,24 @@ class EstudianteViewSet(viewsets.ModelViewSet):
 
         resumen = []
 
+        # Las gestiones archivadas se leen de los resúmenes congelados
+        archivadas = gestiones_archivadas()
+        resumenes_archivados = {}
+        sesiones_archivadas = {}
+        if archivadas:
+            resumenes_archivados = {
+                r.materia_semestre_id: r
+                for r in ResumenAsistenciaArchivado.objects.filter(
+                    estudiante=estudiante,
+                    materia_semestre__semestre=estudiante.semestre_actual,
+                )
+            }
+            sesiones_archivadas = dict(
+                ResumenMateriaArchivado.objects.filter(
+                    materia_semestre__semestre=estudiante.semestre_actual
+                ).values_list('materia_semestre_id', 'total_sesiones')
+            )
+
         for materia in materias:
             # Obtener todos los materia_semestre para esta materia en el semestre
             materia_semestres = MateriaSemestre.objects.filter(
@@ -233,27 +286,47 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             )
 
             total_clases = 0
+            clases_planificadas = 0
             asistencias = 0
             faltas = 0
             tardanzas = 0
 
             for ms in materia_semestres:
-                # Contar clases por materia_semestre
-                total_clases += SesionClase.objects.filter(materia_semestre=ms).count()
-
-                # Agregar asistencias por materia_semestre
-                asis = RegistroAsistencia.objects.filter(
-                    estudiante=estudiante,
-                    sesion__materia_semestre=ms
-                ).aggregate(
-                    asistencias=Count(Case(When(estado='PRESENTE', then=1))),
-                    faltas=Count(Case(When(estado='FALTA', then=1))),
-                    tardanzas=Count(Case(When(estado='RETRASO', then=1))),
+                if ms.gestion in archivadas:
+                    total_clases += sesiones_archivadas.get(ms.id, 0)
+                    clases_planificadas += sesiones_archivadas.get(ms.id, 0)
+                    archivado = resumenes_archivados.get(ms.id)
+                    if archivado:
+                        asistencias += archivado.presentes
+                        faltas += archivado.faltas
+                        tardanzas += archivado.retrasos
+                    continue
+
+                # Contar clases por materia_semestre: realizadas y todas las del
+                # calendario (realizadas más las planificadas que faltan)
+                clases = SesionClase.objects.filter(materia_semestre=ms).aggregate(
+                    realizadas=Count('id', filter=~Q(origen='PLANIFICADA')),
+                    calendario=Count('id'),
                 )
-
-                asistencias += asis['asistencias'] or 0
-                faltas += asis['faltas'] or 0
-                tardanzas += asis['tardanzas'] or 0
+                total_clases += clases['realizadas']
+                clases_planificadas += clases['calendario']
+
+                if cache_compartida():
+                    # Fila del estudiante en la matriz de la materia (una por plantel, en caché)
+                    conteos = obtener_matriz(ms.id).conteos_estudiante(estudiante.id)
+                else:
+                    # Sin caché compartida la matriz se construiría entera en cada
+                    # petición: basta con los registros de este estudiante
+                    conteos = RegistroAsistencia.objects.filter(
+                        estudiante=estudiante, sesion__materia_semestre=ms
+                    ).aggregate(
+                        PRESENTE=Count('id', filter=Q(estado='PRESENTE')),
+                        FALTA=Count('id', filter=Q(estado='FALTA')),
+                        RETRASO=Count('id', filter=Q(estado='RETRASO')),
+                    )
+                asistencias += conteos['PRESENTE']
+                faltas += conteos['FALTA']
+                tardanzas += conteos['RETRASO']
 
             porcentaje = (asistencias / total_clases * 100) if total_clases else 0
 
@@ -261,6 +334,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
                 'materia_id': materia.id,
                 'materia_nombre': materia.nombre,
                 'total_clases': total_clases,
+                'clases_planificadas': clases_planificadas,
                 'asistencias': asistencias,
                 'faltas': faltas,
                 'tardanzas': tardanzas,
@@ -288,6 +362,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['get'], url_path='resumen-asistencias')
+    @cachear_respuesta('resumen-asistencias-estudiante', ['asistencia', 'catalogo'], por_usuario=True)
     def resumen_asistencias_estudiante(self, request):
         """
         Devuelve el resumen de asistencias del estudiante autenticado.
@@ -324,18 +399,34 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         except MateriaSemestre.DoesNotExist:
             raise ValueError('Materia no encontrada.')
 
+        # Las MateriaSemestre de gestiones archivadas se leen del archivo
+        archivadas = gestiones_archivadas()
+        materia_semestres_archivadas = [
+            ms for ms in materia_semestres.select_related('materia', 'semestre__carrera')
+            if ms.gestion in archivadas
+        ]
+
         # Todas las sesiones de los materia_semestre de esta materia
-        sesiones = SesionClase.objects.filter(
+        sesiones = SesionClase.objects.realizadas().filter(
             materia_semestre__in=materia_semestres
+        ).exclude(
+            materia_semestre__gestion__in=archivadas
+        ).select_related(
+            'materia_semestre__materia', 'materia_semestre__semestre__carrera'
         ).order_by('-fecha')
 
+        # Registros del estudiante en esas sesiones, en una consulta (las cerradas
+        # tienen uno por estudiante; en las abiertas la ausencia es falta)
+        registros = {
+            registro.sesion_id: registro
+            for registro in RegistroAsistencia.objects.filter(
+                estudiante=estudiante, sesion__in=sesiones
+            ).only('id', 'sesion_id', 'estado', 'fecha_registro', 'materializado')
+        }
+
         historial = []
         for sesion in sesiones:
-            # Buscar el registro de asistencia del estudiante para esta sesión
-            registro = RegistroAsistencia.objects.filter(
-                estudiante=estudiante,
-                sesion=sesion
-            ).first()
+            registro = registros.get(sesion.id)
 
             historial.append({
                 'id': registro.id if registro else None,
@@ -352,12 +443,17 @@ class EstudianteViewSet(viewsets.ModelViewSet):
                     }
                 },
                 'estado': registro.estado if registro else 'FALTA',
-                'fecha_registro': registro.fecha_registro if registro else None,
+                'fecha_registro': registro.fecha_registro if registro and not registro.materializado else None,
             })
 
+        if materia_semestres_archivadas:
+            historial.extend(historial_archivado(estudiante.id, materia_semestres_archivadas))
+            historial.sort(key=lambda fila: fila['sesion']['fecha'], reverse=True)
+
         return historial
 
     @action(detail=False, methods=['get'], url_path='historial-asistencias')
+    @lectura_replica
     def historial_asistencias_estudiante(self, request):
         """
         Devuelve el historial detallado de asistencias del estudiante autenticado
@@ -380,6 +476,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['get'], url_path='historial_asistencias')
+    @lectura_replica
     def historial_asistencias(self, request, pk=None):
         """
         Devuelve el historial detallado de asistencias de un estudiante
@@ -403,6 +500,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'], url_path='historial-sesiones')
+    @lectura_replica
     def historial_sesiones(self, request):
         estudiante_id = request.query_params.get('estudiante_id')
         materia_id = request.query_params.get('materia_id')
@@ -411,7 +509,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         estudiante = get_object_or_404(Estudiante, pk=estudiante_id)
         historial = self._obtener_historial_asistencias(estudiante, materia_id)
         return Response(historial, 200)
-class DocenteViewSet(viewsets.ModelViewSet):
+class DocenteViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Docente.objects.all()
     serializer_class = DocenteSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -438,14 +536,15 @@ class DocenteViewSet(viewsets.ModelViewSet):
         except Docente.DoesNotExist:
             return Response({'error': 'Docente no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         
-class AdministradorViewSet(viewsets.ModelViewSet):
+class AdministradorViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Administrador.objects.all()
     serializer_class = AdministradorSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class SemestreViewSet(viewsets.ModelViewSet):
+class SemestreViewSet(CatalogoCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Semestre.objects.all()
     serializer_class = SemestreSerializer
+    tablas_catalogo = (Semestre, Carrera)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -455,17 +554,21 @@ class SemestreViewSet(viewsets.ModelViewSet):
             return queryset.filter(carrera_id=carrera_id)
         return queryset
 
-class MateriaViewSet(viewsets.ModelViewSet):
+class MateriaViewSet(CatalogoCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Materia.objects.all()
     serializer_class = MateriaSerializer
+    ordering_cursor = 'nombre'
+    tablas_catalogo = (Materia,)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Materia.objects.all()
 
-class MateriaSemestreViewSet(viewsets.ModelViewSet):
+class MateriaSemestreViewSet(CatalogoCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = MateriaSemestre.objects.all().select_related('materia', 'semestre__carrera')
     serializer_class = MateriaSemestreSerializer
+    # Estudiante: el filtro ?estudiante_id= depende de su semestre actual
+    tablas_catalogo = (MateriaSemestre, Materia, Semestre, Carrera, Estudiante)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -480,16 +583,16 @@ class MateriaSemestreViewSet(viewsets.ModelViewSet):
         if self.request.query_params.get('estudiante_id'):
             return MateriaSemestreMiniSerializer  # el que incluye materia.nombre
         return MateriaSemestreSerializer
-class DocenteMateriaSemestreViewSet(viewsets.ModelViewSet):
+class DocenteMateriaSemestreViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = DocenteMateriaSemestreSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = obtener_principal(self.request)
         
         # LÓGICA CORREGIDA:
         # 1. Revisa si el usuario tiene un perfil de Administrador.
-        if Administrador.objects.filter(usuario=user).exists():
+        if principal.es_administrador:
             # Si tiene un perfil de admin, le mostramos todas las asignaciones.
             return DocenteMateriaSemestre.objects.all().select_related(
                 'docente__usuario',
@@ -497,17 +600,16 @@ class DocenteMateriaSemestreViewSet(viewsets.ModelViewSet):
                 'materia_semestre__semestre__carrera'
             )
         
-        # 2. Si no es administrador, intentamos encontrar su perfil de Docente.
-        try:
-            docente = get_object_or_404(Docente, usuario=user)
-            return DocenteMateriaSemestre.objects.filter(docente=docente).select_related(
+        # 2. Si no es administrador, solo ve sus asignaciones de docente.
+        if principal.es_docente:
+            return DocenteMateriaSemestre.objects.filter(docente_id=principal.perfil_id(DOCENTE)).select_related(
                 'docente__usuario',
                 'materia_semestre__materia',
                 'materia_semestre__semestre__carrera'
             )
-        except Docente.DoesNotExist:
-            # 3. Si no es ni admin ni docente, no tiene permisos.
-            raise PermissionDenied("El usuario no tiene los permisos necesarios.")
+
+        # 3. Si no es ni admin ni docente, no tiene permisos.
+        raise PermissionDenied("El usuario no tiene los permisos necesarios.")
 
     def create(self, request, *args, **kwargs):
         docente_id = request.data.get('docente')
@@ -532,6 +634,11 @@ class DocenteMateriaSemestreViewSet(viewsets.ModelViewSet):
                 {"detail": "Datos incompletos en materia_semestre."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if numero_dia_semana(dia_semana) is None:
+            return Response(
+                {"detail": "Día de la semana inválido (Lunes a Domingo)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Buscar la materia
         from .models import Materia, Semestre, DocenteMateriaSemestre, Docente, MateriaSemestre
@@ -587,39 +694,35 @@ class DocenteMateriaSemestreViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(asignacion)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
-class SesionClaseViewSet(viewsets.ModelViewSet):
+class SesionClaseViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = SesionClaseSerializer
+    ordering_cursor = ('-fecha', '-hora_inicio', '-id')
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         """
         Filtra las sesiones según los permisos del usuario y parámetros de consulta
         """
-        user = self.request.user
+        principal = obtener_principal(self.request)
         queryset = SesionClase.objects.select_related(
             'materia_semestre__materia',
             'materia_semestre__semestre__carrera'
         )
 
         # Si es administrador, puede ver todas las sesiones
-        if Administrador.objects.filter(usuario=user).exists():
+        if principal.es_administrador:
             pass  # No aplicar filtros adicionales
         
-        # Si es docente, solo puede ver sus sesiones
-        elif Docente.objects.filter(usuario=user).exists():
-            docente = get_object_or_404(Docente, usuario=user)
-            # Filtrar solo las sesiones de las materias asignadas al docente
-            materias_docente = DocenteMateriaSemestre.objects.filter(
-                docente=docente
-            ).values_list('materia_semestre', flat=True)
-            queryset = queryset.filter(materia_semestre__in=materias_docente)
+        # Si es docente, solo puede ver las sesiones de sus materias asignadas
+        elif principal.es_docente:
+            queryset = queryset.filter(materia_semestre__in=principal.materias_semestre_ids)
         
         # Si es estudiante, puede ver las sesiones de su semestre/carrera
-        elif Estudiante.objects.filter(usuario=user).exists():
-            estudiante = get_object_or_404(Estudiante, usuario=user)
+        elif principal.es_estudiante:
+            estudiante = principal.perfil(ESTUDIANTE)
             queryset = queryset.filter(
-                materia_semestre__semestre=estudiante.semestre_actual,
-                materia_semestre__semestre__carrera=estudiante.carrera
+                materia_semestre__semestre_id=estudiante.semestre_actual_id,
+                materia_semestre__semestre__carrera_id=estudiante.carrera_id
             )
         else:
             # Si no tiene ningún rol, no puede ver ninguna sesión
@@ -634,11 +737,37 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         if fecha:
             queryset = queryset.filter(fecha=fecha)
 
+        # Las sesiones planificadas del calendario solo se listan si se piden
+        if self.action == 'list' and self.request.query_params.get('planificadas') not in ('1', 'true'):
+            queryset = queryset.realizadas()
+
         return queryset.order_by('-fecha', '-hora_inicio')
 
+    def _sesion_de_hoy(self, materia_semestre_id, fecha):
+        """Sesión ya creada hoy para la materia, solo si la materia es del docente autenticado."""
+        return SesionClase.objects.filter(
+            materia_semestre_id=materia_semestre_id,
+            fecha=fecha,
+            materia_semestre__docentes_asignados__docente__usuario=self.request.user,
+        ).select_related('materia_semestre__materia', 'materia_semestre__semestre__carrera').first()
+
     def create(self, request, *args, **kwargs):
+        """
+        Crea la sesión de hoy. Es idempotente: si la sesión ya existe (la creó
+        otra pestaña, otro intento o el programador de sesiones) se retorna la
+        existente con 200 en lugar de fallar.
+        """
         materia_semestre_id = request.data.get('materia_semestre')
 
+        # Camino rápido: una sola consulta por índice cuando la sesión ya existe.
+        # Una sesión solo planificada todavía debe pasar las validaciones.
+        try:
+            existente = self._sesion_de_hoy(materia_semestre_id, datetime.now().date())
+        except (TypeError, ValueError):
+            existente = None
+        if existente is not None and existente.origen != 'PLANIFICADA':
+            return Response(self.get_serializer(existente).data, status=status.HTTP_200_OK)
+
         # Verificar que el docente tiene permiso para crear sesiones en esta materia
         if not DocenteMateriaSemestre.objects.filter(
             docente__usuario=self.request.user,
@@ -658,12 +787,7 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
 
             ahora = datetime.now()
             fecha_actual = ahora.date()
-            dias_semana_map = {
-                0: 'Lunes', 1: 'Martes', 2: 'Miércoles', 3: 'Jueves',
-                4: 'Viernes', 5: 'Sábado', 6: 'Domingo'
-            }
             dia_actual_nombre = dias_semana_map.get(ahora.weekday())
-            hora_actual = ahora.time()
 
             # 0. Validación de día especial (feriado o día sin clases)
             if DiaEspecial.es_dia_especial(fecha_actual):
@@ -674,16 +798,14 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
                 )
 
             # 1. Validación de día
-            if dia_materia != dia_actual_nombre:
+            if materia_semestre_obj.dia_semana_num != ahora.weekday():
                 return Response(
                     {"detail": f"No se puede iniciar la sesión. La materia está programada para el día '{dia_materia}', no para hoy '{dia_actual_nombre}'."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             # 2. Validación de horario (permitir inicio 15 minutos antes)
-            hora_inicio_con_gracia = (datetime.combine(date.min, hora_inicio_materia) - timedelta(minutes=15)).time()
-
-            if not (hora_inicio_con_gracia <= hora_actual < hora_fin_materia):
+            if not indice_horario().en_horario(materia_semestre_obj.id, ahora, anticipacion=ANTICIPACION_MINUTOS):
                 return Response(
                     {"detail": f"La sesión de clase solo puede iniciarse entre las {hora_inicio_materia.strftime('%H:%M')} y las {hora_fin_materia.strftime('%H:%M')}."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -695,15 +817,37 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 3. Establecer los horarios automáticamente
+        # 3. La sesión planificada del calendario se abre en lugar de crear otra
+        if existente is not None:
+            existente.origen = 'DOCENTE'
+            campos = ['origen']
+            if request.data.get('tema'):
+                existente.tema = request.data['tema']
+                campos.append('tema')
+            existente.save(update_fields=campos)
+            return Response(self.get_serializer(existente).data, status=status.HTTP_200_OK)
+
+        # Establecer los horarios automáticamente
         request.data['hora_inicio'] = hora_inicio_materia
         request.data['hora_fin'] = hora_fin_materia
         request.data['fecha'] = fecha_actual
 
-        # 4. Crear la sesión
+        # 4. Crear la sesión. Si otra petición la creó entre la consulta y el
+        # INSERT (validación única o IntegrityError), se retorna esa.
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        if not serializer.is_valid():
+            existente = self._sesion_de_hoy(materia_semestre_id, fecha_actual)
+            if existente is not None:
+                return Response(self.get_serializer(existente).data, status=status.HTTP_200_OK)
+            raise ValidationError(serializer.errors)
+        try:
+            with transaction.atomic():
+                self.perform_create(serializer)
+        except IntegrityError:
+            existente = self._sesion_de_hoy(materia_semestre_id, fecha_actual)
+            if existente is None:
+                raise
+            return Response(self.get_serializer(existente).data, status=status.HTTP_200_OK)
         headers = self.get_success_headers(serializer.data)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -724,38 +868,20 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
             )
 
         # Verificar que el usuario tenga permiso para ver esta sesión
-        user = request.user
+        principal = obtener_principal(request)
         
         # Si es docente, verificar que esté asignado a esta materia
-        if Docente.objects.filter(usuario=user).exists():
-            docente = get_object_or_404(Docente, usuario=user)
-            if not DocenteMateriaSemestre.objects.filter(
-                docente=docente, 
-                materia_semestre=sesion.materia_semestre
-            ).exists():
+        if principal.es_docente:
+            if sesion.materia_semestre_id not in principal.materias_semestre_ids:
                 raise PermissionDenied("No tiene permiso para ver esta sesión.")
         
         # Si es administrador, puede ver cualquier sesión (no se aplica filtro)
-        elif not Administrador.objects.filter(usuario=user).exists():
+        elif not principal.es_administrador:
             raise PermissionDenied("No tiene permisos para ver esta información.")
 
-        materia_semestre = sesion.materia_semestre
-        
-        # Obtener estudiantes que deberían estar en esta materia
-        # Basado en la carrera y semestre de la materia
-        estudiantes = Estudiante.objects.filter(
-            carrera=materia_semestre.semestre.carrera,
-            semestre_actual=materia_semestre.semestre
-        ).select_related('usuario')
-
         lista_asistencia = []
-        for estudiante in estudiantes:
-            # Buscar el registro de asistencia para este estudiante en esta sesión
-            registro = RegistroAsistencia.objects.filter(
-                estudiante=estudiante, 
-                sesion=sesion
-            ).first()
-            
+        # Cerrada: un registro por estudiante; abierta: plantel cruzado con los registros
+        for estudiante, registro in asistencia_de_sesion(sesion):
             if registro:
                 estado = registro.get_estado_display()
             else:
@@ -768,11 +894,12 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
                 ubicacion = "No registrada"
 
             lista_asistencia.append({
-                "id": estudiante.id,
-                "nombre_completo": estudiante.usuario.get_full_name(),
-                "codigo_institucional": estudiante.codigo_institucional,
+                "id": estudiante['id'],
+                "nombre_completo": f"{estudiante['usuario__nombre']} {estudiante['usuario__apellido']}",
+                "codigo_institucional": estudiante['codigo_institucional'],
                 "estado": estado,
-                "fecha_registro": registro.fecha_registro if registro else None,
+                # Una falta materializada no tiene hora de registro real
+                "fecha_registro": registro.fecha_registro if registro and not registro.materializado else None,
                 "ubicacion": ubicacion,
             })
 
@@ -782,6 +909,7 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         return Response(lista_asistencia, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['get'], url_path='generar-pdf-asistencia')
+    @lectura_replica
     def generar_pdf_asistencia(self, request, pk=None):
         """
         Genera un PDF con la lista de asistencia de una sesión específica
@@ -795,15 +923,11 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
             )
 
         # Verificar permisos (similar al método anterior)
-        user = request.user
-        if Docente.objects.filter(usuario=user).exists():
-            docente = get_object_or_404(Docente, usuario=user)
-            if not DocenteMateriaSemestre.objects.filter(
-                docente=docente, 
-                materia_semestre=sesion.materia_semestre
-            ).exists():
+        principal = obtener_principal(request)
+        if principal.es_docente:
+            if sesion.materia_semestre_id not in principal.materias_semestre_ids:
                 raise PermissionDenied("No tiene permiso para generar este reporte.")
-        elif not Administrador.objects.filter(usuario=user).exists():
+        elif not principal.es_administrador:
             raise PermissionDenied("No tiene permisos para generar este reporte.")
 
         # Crear el PDF en memoria
@@ -817,10 +941,10 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         carrera = semestre.carrera
         
         # Obtener estudiantes y sus asistencias
-        estudiantes = Estudiante.objects.filter(
-            carrera=carrera,
-            semestre_actual=semestre
-        ).select_related('usuario').order_by('usuario__apellido', 'usuario__nombre')
+        asistencia = sorted(
+            asistencia_de_sesion(sesion),
+            key=lambda fila: (fila[0]['usuario__apellido'], fila[0]['usuario__nombre'])
+        )
         
         # Preparar contenido del PDF
         elementos = []
@@ -871,12 +995,8 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         # Contadores para resumen
         contadores = {'Presente': 0, 'Presente con retraso': 0, 'Falta': 0, 'Falta justificada': 0}
 
-        for estudiante in estudiantes:
-            registro = RegistroAsistencia.objects.filter(
-                estudiante=estudiante,
-                sesion=sesion
-            ).first()
-
+        estados = []
+        for estudiante, registro in asistencia:
             if registro:
                 estado = registro.get_estado_display()
                 ubicacion = f"{registro.latitud}, {registro.longitud}" if registro.latitud and registro.longitud else "No registrada"
@@ -885,10 +1005,11 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
                 ubicacion = "No registrada"
 
             contadores[estado] = contadores.get(estado, 0) + 1
+            estados.append(estado)
 
             data.append([
-                estudiante.usuario.get_full_name(),
-                estudiante.codigo_institucional,
+                f"{estudiante['usuario__nombre']} {estudiante['usuario__apellido']}",
+                estudiante['codigo_institucional'],
                 estado,
                 ubicacion
             ])
@@ -915,17 +1036,7 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         ]))
 
         # Aplicar colores según el estado
-        for i, estudiante in enumerate(estudiantes, 1):
-            registro = RegistroAsistencia.objects.filter(
-                estudiante=estudiante,
-                sesion=sesion
-            ).first()
-
-            if registro:
-                estado = registro.get_estado_display()
-            else:
-                estado = 'Falta'
-
+        for i, estado in enumerate(estados, 1):
             if estado == 'Presente':
                 tabla.setStyle(TableStyle([('BACKGROUND', (0, i), (-1, i), colors.lightgreen)]))
             elif estado == 'Presente con retraso':
@@ -943,7 +1054,7 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
         elementos.append(resumen_titulo)
         elementos.append(Spacer(1, 10))
         
-        total_estudiantes = len(estudiantes)
+        total_estudiantes = len(asistencia)
         porcentaje_asistencia = ((contadores['Presente'] + contadores['Presente con retraso']) / total_estudiantes * 100) if total_estudiantes > 0 else 0
         
         resumen_data = [
@@ -988,7 +1099,7 @@ class SesionClaseViewSet(viewsets.ModelViewSet):
     
 
 
-class CredencialQRViewSet(viewsets.ModelViewSet):
+class CredencialQRViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = CredencialQR.objects.all()
     serializer_class = CredencialQRSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1036,11 +1147,40 @@ class CredencialQRViewSet(viewsets.ModelViewSet):
         return Response(response_data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
-class PermisoAsistenciaViewSet(viewsets.ModelViewSet):
+class PermisoAsistenciaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = PermisoAsistencia.objects.all()
     serializer_class = PermisoAsistenciaSerializer
+    ordering_cursor = ('-fecha_solicitud', '-id')
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsAdministrador])
+    def aprobar(self, request, pk=None):
+        """
+        Aprueba el permiso y, en la misma transacción, justifica en bloque las
+        faltas de sus sesiones cubiertas (ver justificaciones.py).
+        """
+        permiso = self.get_object()
+        if permiso.estado == 'APROBADO':
+            return Response({"detail": "El permiso ya está aprobado."}, status=status.HTTP_400_BAD_REQUEST)
+        actualizados, creados = aprobar_permiso(permiso, obtener_principal(request).perfil(ADMINISTRADOR))
+        return Response({
+            **self.get_serializer(permiso).data,
+            'registros_justificados': actualizados,
+            'registros_creados': creados,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsAdministrador])
+    def rechazar(self, request, pk=None):
+        """Rechaza el permiso; si estaba aprobado, sus faltas justificadas vuelven a FALTA."""
+        permiso = self.get_object()
+        if permiso.estado == 'RECHAZADO':
+            return Response({"detail": "El permiso ya está rechazado."}, status=status.HTTP_400_BAD_REQUEST)
+        revertidos = revertir_permiso(permiso, 'RECHAZADO', obtener_principal(request).perfil(ADMINISTRADOR))
+        return Response({
+            **self.get_serializer(permiso).data,
+            'registros_revertidos': revertidos,
+        }, status=status.HTTP_200_OK)
+
 
 def calcular_distancia(lat1, lon1, lat2, lon2):
     R = 6371e3  # Radio de la Tierra en metros
@@ -1052,13 +1192,11 @@ def calcular_distancia(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     return R * c
 
-class RegistroAsistenciaViewSet(viewsets.ModelViewSet):
-    queryset = RegistroAsistencia.objects.select_related(
-        'sesion__materia_semestre__materia',
-        'sesion__materia_semestre__semestre',
-        'estudiante__usuario' # También precargamos el usuario del estudiante
-    )
+class RegistroAsistenciaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    # Las relaciones que se precargan las decide el plan de RegistroAsistenciaSerializer
+    queryset = RegistroAsistencia.objects.all()
     serializer_class = RegistroAsistenciaSerializer
+    ordering_cursor = ('-fecha_registro', '-id')
     permission_classes_list = [IsAuthenticated]
 
     @action(detail=False, methods=['post'], url_path='registrar-qr')
@@ -1149,7 +1287,7 @@ class RegistroAsistenciaViewSet(viewsets.ModelViewSet):
             return Response(response_data, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            sesion = SesionClase.objects.get(
+            sesion = SesionClase.objects.realizadas().get(
                 materia_semestre=materia_semestre,
                 fecha=today,
                 hora_inicio__lte=current_time,
@@ -1216,9 +1354,10 @@ class RegistroAsistenciaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(estudiante_id=estudiante_id)
         return queryset
             
-class ReporteViewSet(viewsets.ModelViewSet):
+class ReporteViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Reporte.objects.all()
     serializer_class = ReporteSerializer
+    ordering_cursor = ('-fecha_generacion', '-id')
     permission_classes = [permissions.IsAuthenticated]
 
 @api_view(['POST'])
@@ -1229,10 +1368,11 @@ def generar_reporte_asistencia(request):
     """
     try:
         # Verificar que el usuario es docente
-        if not hasattr(request.user, 'docente_perfil'):
+        principal = obtener_principal(request)
+        if not principal.es_docente:
             return Response({'error': 'Solo los docentes pueden generar reportes'}, status=status.HTTP_403_FORBIDDEN)
         
-        docente = request.user.docente_perfil
+        docente = principal.perfil(DOCENTE)
         sesion_id = request.data.get('sesion_id')
         
         if not sesion_id:
@@ -1288,6 +1428,9 @@ def generar_reporte_asistencia(request):
         
         return response
         
+    except PermissionDenied:
+        # Perfil de docente del token ya eliminado: 403, no error interno
+        raise
     except Exception as e:
         print(f"Error al generar reporte: {e}")
         return Response({'error': 'Error interno del servidor'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1335,12 +1478,27 @@ def generar_pdf_asistencia(sesion, asistencias):
     elements.append(info_table)
     elements.append(Spacer(1, 20))
 
-    # Obtener todos los estudiantes de la materia
-    materia_semestre = sesion.materia_semestre
-    estudiantes = Estudiante.objects.filter(
-        carrera=materia_semestre.semestre.carrera,
-        semestre_actual=materia_semestre.semestre
-    ).select_related('usuario').order_by('usuario__apellido', 'usuario__nombre')
+    # Estudiantes de la materia con su registro: una sesión cerrada ya tiene
+    # uno por estudiante; en una abierta se cruza el plantel con los registros
+    if sesion.cerrada:
+        filas = [
+            (registro.estudiante.usuario.get_full_name(), registro.estudiante.codigo_institucional, registro)
+            for registro in asistencias
+        ]
+    else:
+        por_estudiante = {registro.estudiante_id: registro for registro in asistencias}
+        plantel = sorted(
+            cargar_planteles([sesion.materia_semestre])[sesion.materia_semestre_id],
+            key=lambda estudiante: (estudiante['usuario__apellido'], estudiante['usuario__nombre'])
+        )
+        filas = [
+            (
+                f"{estudiante['usuario__nombre']} {estudiante['usuario__apellido']}",
+                estudiante['codigo_institucional'],
+                por_estudiante.get(estudiante['id']),
+            )
+            for estudiante in plantel
+        ]
 
     # Tabla de asistencias
     data = [['Nombre', 'Código', 'Estado', 'Ubicación']]
@@ -1348,10 +1506,7 @@ def generar_pdf_asistencia(sesion, asistencias):
     # Contadores para resumen
     contadores = {'Presente': 0, 'Presente con retraso': 0, 'Falta': 0, 'Falta justificada': 0}
 
-    for estudiante in estudiantes:
-        # Buscar registro de asistencia
-        registro = asistencias.filter(estudiante=estudiante).first()
-
+    for nombre_completo, codigo_institucional, registro in filas:
         if registro:
             estado = registro.get_estado_display()
             ubicacion = f"{registro.latitud}, {registro.longitud}" if registro.latitud and registro.longitud else "No registrada"
@@ -1362,8 +1517,8 @@ def generar_pdf_asistencia(sesion, asistencias):
         contadores[estado] = contadores.get(estado, 0) + 1
 
         data.append([
-            estudiante.usuario.get_full_name(),
-            estudiante.codigo_institucional,
+            nombre_completo,
+            codigo_institucional,
             estado,
             ubicacion
         ])
@@ -1386,7 +1541,7 @@ def generar_pdf_asistencia(sesion, asistencias):
     elements.append(Spacer(1, 20))
 
     # Resumen estadístico
-    total_estudiantes = len(estudiantes)
+    total_estudiantes = len(filas)
     resumen_data = [
         ['Total Estudiantes:', str(total_estudiantes)],
         ['Presentes:', str(contadores.get('Presente', 0))],
@@ -1412,13 +1567,14 @@ def generar_pdf_asistencia(sesion, asistencias):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@lectura_replica
 def listar_reportes_admin(request):
     """
     Lista todos los reportes para que los vea el administrador
     """
     try:
         # Verificar que el usuario es administrador
-        if not hasattr(request.user, 'administrador_perfil'):
+        if not obtener_principal(request).es_administrador:
             return Response({'error': 'Solo los administradores pueden ver esta información'}, status=status.HTTP_403_FORBIDDEN)
         
         # Obtener todos los reportes ordenados por fecha de generación
@@ -1453,43 +1609,43 @@ def listar_reportes_admin(request):
 class MisMateriasListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = MisMateriasSerializer
+    pagination_class = None  # Acotada a las materias del usuario
 
     def get_queryset(self):
-        # --- LÍNEA DE DIAGNÓSTICO ---
-        print(f"Usuario autenticado: {self.request.user.email}")
-        print(f"Tipo de objeto de usuario: {type(self.request.user)}")
-        # -----------------------------
-
-        try:
-            docente_perfil = get_object_or_404(Docente, usuario=self.request.user)
-        except Docente.DoesNotExist:
+        principal = obtener_principal(self.request)
+        if not principal.es_docente:
             raise PermissionDenied("No se encontró un perfil de docente para el usuario actual.")
 
-        # Si llegamos a este punto, significa que el perfil de Docente se encontró correctamente.
-        # Ahora, filtramos las materias asignadas a ese docente.
-        return DocenteMateriaSemestre.objects.filter(docente=docente_perfil)
+        # Filtramos las materias asignadas a ese docente.
+        return DocenteMateriaSemestre.objects.filter(docente_id=principal.perfil_id(DOCENTE))
 
 class MisMateriasConEstudiantesListView(generics.ListAPIView):
     serializer_class = MisMateriasConEstudiantesSerializer  # <-- nuevo
     permission_classes = [IsAuthenticated]
+    pagination_class = None  # Acotada a las materias del usuario
 
     def get_queryset(self):
-        user = self.request.user
-        try:
-            docente = get_object_or_404(Docente, usuario=user)
-        except Docente.DoesNotExist:
+        principal = obtener_principal(self.request)
+        if not principal.es_docente:
             raise PermissionDenied("No se encontró un perfil de docente.")
-        return DocenteMateriaSemestre.objects.filter(docente=docente).select_related(
+        return DocenteMateriaSemestre.objects.filter(docente_id=principal.perfil_id(DOCENTE)).select_related(
             'materia_semestre__materia',
             'materia_semestre__semestre__carrera'
-        ).prefetch_related(
-            Prefetch(
-                'materia_semestre__inscripciones',
-                queryset=Inscripcion.objects.select_related('estudiante__usuario')
-            )
         )
+
+    def list(self, request, *args, **kwargs):
+        # Dos consultas: las asignaciones y los planteles de todas sus materias
+        asignaciones = list(self.filter_queryset(self.get_queryset()))
+        self.planteles = cargar_planteles(a.materia_semestre for a in asignaciones)
+        serializer = self.get_serializer(asignaciones, many=True)
+        return Response(serializer.data)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['planteles'] = getattr(self, 'planteles', None)
+        return context
     
-class InscripcionViewSet(viewsets.ModelViewSet):
+class InscripcionViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Inscripcion.objects.select_related('estudiante__usuario', 'materia_semestre__materia')
     serializer_class = InscripcionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1502,26 +1658,45 @@ class InscripcionViewSet(viewsets.ModelViewSet):
 class MisMateriasEstudianteView(generics.ListAPIView):
     serializer_class = MateriaEstudianteSerializer
     permission_classes = [IsEstudiante]
+    pagination_class = None  # Acotada a las materias del usuario
 
     def get_queryset(self):
-        estudiante = Estudiante.objects.get(usuario=self.request.user)
-        print(f"Estudiante: id={estudiante.id}, semestre={estudiante.semestre_actual.nombre}, carrera={estudiante.carrera.nombre}")
-        queryset = MateriaSemestre.objects.filter(
-            semestre=estudiante.semestre_actual,
-            semestre__carrera=estudiante.carrera,
+        """
+        Dos consultas en total: las materias (con la sesión activa anotada) y los
+        docentes asignados. El semestre y la carrera del estudiante se leen con
+        una subconsulta a partir del perfil del token.
+        """
+        estudiante = Estudiante.objects.filter(pk=obtener_principal(self.request).perfil_id(ESTUDIANTE))
+        ahora = timezone.localtime()
+        sesiones_activas = SesionClase.objects.realizadas().filter(
+            materia_semestre=OuterRef('pk'),
+            fecha=ahora.date(),
+            hora_inicio__lte=ahora.time(),
+            hora_fin__gte=ahora.time(),
+        ).order_by('hora_inicio', 'id')
+
+        return MateriaSemestre.objects.filter(
+            semestre_id=Subquery(estudiante.values('semestre_actual_id')[:1]),
+            semestre__carrera_id=Subquery(estudiante.values('carrera_id')[:1]),
         ).filter(
             Exists(
                 DocenteMateriaSemestre.objects.filter(
                     materia_semestre=OuterRef('pk')
                 )
             )
+        ).annotate(
+            sesion_activa=Exists(sesiones_activas),
+            sesion_activa_id=Subquery(sesiones_activas.values('id')[:1]),
+            sesion_activa_inicio=Subquery(sesiones_activas.values('hora_inicio')[:1]),
+            sesion_activa_fin=Subquery(sesiones_activas.values('hora_fin')[:1]),
         ).select_related(
             'materia', 'semestre__carrera'
         ).prefetch_related(
-            'docentes_asignados__docente__usuario'
+            Prefetch(
+                'docentes_asignados',
+                queryset=DocenteMateriaSemestre.objects.select_related('docente__usuario')
+            )
         )
-        print(f"Materias encontradas: {queryset.values('id', 'materia__nombre', 'semestre__nombre', 'semestre__carrera__nombre')}")
-        return queryset
     
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -1541,7 +1716,7 @@ def descargar_reporte_pdf(request, reporte_id):
     """
     Permite al administrador descargar un reporte PDF previamente generado
     """
-    if not hasattr(request.user, 'administrador_perfil'):
+    if not obtener_principal(request).es_administrador:
         return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
 
     reporte = get_object_or_404(Reporte, id=reporte_id)
@@ -1555,6 +1730,8 @@ def descargar_reporte_pdf(request, reporte_id):
 
 @api_view(['GET'])
 @permission_classes([IsAdministrador])
+@cachear_respuesta('resumen-asistencias-general', ['asistencia', 'catalogo'])
+@lectura_replica
 def resumen_asistencias_general(request):
     """
     Devuelve el resumen general de asistencias por materia para todos los estudiantes.
@@ -1590,12 +1767,19 @@ def resumen_asistencias_general(request):
 
         resumen_general = []
 
+        # Las gestiones archivadas aportan sus totales congelados
+        archivadas = gestiones_archivadas()
+        totales_archivados = totales_archivados_por_materia() if archivadas else {}
+
         for materia in materias:
             # Obtener todas las sesiones de esta materia
-            sesiones = SesionClase.objects.filter(
+            sesiones = SesionClase.objects.realizadas().filter(
                 materia_semestre__materia=materia
+            ).exclude(
+                materia_semestre__gestion__in=archivadas
             )
-            total_sesiones = sesiones.count()
+            sesiones_archivadas, asistencias_archivadas = totales_archivados.get(materia.id, (0, 0))
+            total_sesiones = sesiones.count() + sesiones_archivadas
 
             # Obtener todos los estudiantes que deberían tener esta materia
             estudiantes_relevantes = Estudiante.objects.filter(
@@ -1607,7 +1791,7 @@ def resumen_asistencias_general(request):
             asistencias_totales = RegistroAsistencia.objects.filter(
                 sesion__in=sesiones,
                 estado__in=['PRESENTE', 'RETRASO']
-            ).count()
+            ).count() + asistencias_archivadas
 
             # Calcular porcentaje general
             if total_estudiantes == 0 or total_sesiones == 0:
@@ -1676,8 +1860,36 @@ def enviar_notificacion_prueba(request):
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
+@api_view(['POST'])
+@permission_classes([IsAdministrador])
+def generar_calendario_gestion(request):
+    """
+    Genera (o sincroniza) las sesiones planificadas de una gestión.
+    Body: {"gestion": "2025/1", "fecha_inicio": "2025-02-03", "fecha_fin": "2025-06-27"}
+    Sin fechas se usa el rango guardado de la gestión.
+    """
+    gestion = request.data.get('gestion')
+    if not gestion:
+        return Response({'error': 'Se requiere la gestión'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        fecha_inicio = request.data.get('fecha_inicio')
+        fecha_fin = request.data.get('fecha_fin')
+        fecha_inicio = date.fromisoformat(fecha_inicio) if fecha_inicio else None
+        fecha_fin = date.fromisoformat(fecha_fin) if fecha_fin else None
+    except (TypeError, ValueError):
+        return Response({'error': 'Formato de fecha inválido (AAAA-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    if (fecha_inicio is None) != (fecha_fin is None):
+        return Response({'error': 'Indique fecha_inicio y fecha_fin juntas'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        creadas, eliminadas = generar_calendario(gestion, fecha_inicio, fecha_fin)
+    except ErrorCalendario as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'gestion': gestion, 'creadas': creadas, 'eliminadas': eliminadas}, status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 @permission_classes([IsAdministrador])
+@cachear_respuesta('filtros-asistencia', ['catalogo'])
 def get_filtros_asistencia(request):
     """
     Devuelve las opciones disponibles para filtrar el resumen de asistencias.
@@ -1706,8 +1918,62 @@ def get_filtros_asistencia(request):
         print(f"Error al obtener filtros: {e}")
         return Response({'error': 'Error interno del servidor'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class DiaEspecialViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def horario_actual(request):
+    """
+    Materias en clase ahora y las que empiezan en los próximos minutos, según el
+    horario semanal. Cada rol ve solo sus materias.
+    URL: /api/horario-actual/?minutos=15
+    """
+    try:
+        minutos = int(request.query_params.get('minutos', ANTICIPACION_MINUTOS))
+    except ValueError:
+        return Response({'error': 'minutos debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+    minutos = min(max(minutos, 0), 24 * 60)
+
+    ahora = timezone.localtime()
+    indice = indice_horario()
+    en_curso = set(indice.en_curso(ahora))
+    proximas = set(indice.proximas(ahora, minutos))
+
+    principal = obtener_principal(request)
+    materias = MateriaSemestre.objects.filter(id__in=en_curso | proximas).select_related('materia')
+    if principal.es_docente:
+        materias = materias.filter(id__in=principal.materias_semestre_ids)
+    elif principal.es_estudiante:
+        materias = materias.filter(semestre_id=principal.perfil(ESTUDIANTE).semestre_actual_id)
+    elif not principal.es_administrador:
+        raise PermissionDenied("El usuario no tiene los permisos necesarios.")
+
+    materias = sorted(materias, key=lambda ms: (ms.hora_inicio, ms.id))
+    return Response({
+        'momento': ahora,
+        'en_curso': MateriaSemestreMiniSerializer([ms for ms in materias if ms.id in en_curso], many=True).data,
+        'proximas': MateriaSemestreMiniSerializer([ms for ms in materias if ms.id in proximas], many=True).data,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdministrador])
+def estadisticas_cache(request):
+    """
+    Devuelve los aciertos y fallos de la caché de respuestas por endpoint.
+    Solo accesible para administradores.
+    """
+    return Response(estadisticas_cache_respuestas(), status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAdministrador])
+def estadisticas_compresion(request):
+    """
+    Devuelve los bytes originales, comprimidos y ahorrados por ruta (vacío si
+    COMPRESION_ESTADISTICAS está desactivado). Solo accesible para administradores.
+    """
+    return Response(estadisticas_compresion_respuestas(), status=status.HTTP_200_OK)
+
+class DiaEspecialViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = DiaEspecialSerializer
+    ordering_cursor = '-fecha'
     permission_classes = [permissions.IsAuthenticated, IsAdministrador]
     queryset = DiaEspecial.objects.all().select_related('creado_por__usuario')
 
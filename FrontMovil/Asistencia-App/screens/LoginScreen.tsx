@@ -121,7 +121,8 @@ const LoginScreen: React.FC = () => {
 
     setLoading(true);
     try {
-      const response = await axios.post<LoginResponse>(LOGIN_URL, credentials, {
+      // modo 'token': la app solo usa JWT, el backend no crea una sesión de Django
+      const response = await axios.post<LoginResponse>(LOGIN_URL, { ...credentials, modo: 'token' }, {
         headers: {
           'Content-Type': 'application/json',
           'X-CSRFToken': csrfToken,
@@ -7,6 +7,8 @@ const api = axios.create({
   baseURL: 'http://127.0.0.1:8000/api/', // Asegúrate de que esta URL sea la de tu backend
   headers: {
     'Content-Type': 'application/json',
+    // Las vistas esperan listas planas; el backend pagina por cursor si no se envía
+    'X-Paginacion': 'desactivada',
   },
 });
 
@@ -106,7 +106,7 @@ const AsignacionesDocenteView: React.FC = () => {
     const fetchAsignacionesMaterias = useCallback(async () => {
         try {
             setLoading(true);
-            const response = await api.get<DocenteMateriaSemestreRegistro[]>('/docentes-materias-semestre/');
+            const response = await api.get<DocenteMateriaSemestreRegistro[]>('/docentes-materias-semestre/?expand=docente_info,materia_semestre_info');
             setAsignacionesMaterias(response.data);
         } catch (err) {
             console.error('Error al cargar asignaciones de materias:', err);
@@ -42,7 +42,7 @@ const DiasEspecialesView: React.FC = () => {
     try {
       const token = sessionStorage.getItem('authToken');
       const response = await axios.get('http://localhost:8000/api/dias-especiales/', {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}`, 'X-Paginacion': 'desactivada' }
       });
       setDiasEspeciales(response.data);
     } catch (error) {
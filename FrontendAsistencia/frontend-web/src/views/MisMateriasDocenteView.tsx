@@ -23,6 +23,7 @@ interface MateriaDocente {
     semestre_nombre: string;
     gestion: string;
     dia_semana: string;
+    dia_semana_num: number; // 0 = lunes ... 6 = domingo
     hora_inicio: string;
     hora_fin: string;
     estudiantes: Estudiante[]; 
@@ -104,18 +105,13 @@ const MisMateriasDocenteView: React.FC = () => {
 
     // Nuevo useEffect para crear sesión automáticamente cuando la clase está activa
     useEffect(() => {
+        const diaActual = currentTime.isoWeekday() - 1;
         materias.forEach(materia => {
-            const diaActual = currentTime.format('dddd');
-            const diasMap: { [key: string]: string } = {
-                'Lunes': 'Monday', 'Martes': 'Tuesday', 'Miércoles': 'Wednesday',
-                'Jueves': 'Thursday', 'Viernes': 'Friday', 'Sábado': 'Saturday', 'Domingo': 'Sunday'
-            };
-            const diaMateriaEnIngles = diasMap[materia.dia_semana];
             const horaActual = currentTime;
             const horaInicioMateria = moment(materia.hora_inicio, 'HH:mm');
             const horaFinMateria = moment(materia.hora_fin, 'HH:mm');
 
-            const isActive = diaMateriaEnIngles === diaActual && horaActual.isBetween(horaInicioMateria, horaFinMateria, undefined, '[)');
+            const isActive = materia.dia_semana_num === diaActual && horaActual.isBetween(horaInicioMateria, horaFinMateria, undefined, '[)');
 
             if (isActive && !sesionesProcesadas[materia.id] && !isDiaEspecial) {
                 // Marcar como procesada para evitar llamadas repetidas
@@ -134,23 +130,12 @@ const MisMateriasDocenteView: React.FC = () => {
             };
         }
 
-        const diaActual = currentTime.format('dddd');
-        const diaMateria = materia.dia_semana;
-
-        const diasMap: { [key: string]: string } = {
-            'Lunes': 'Monday', 'Martes': 'Tuesday', 'Miércoles': 'Wednesday',
-            'Jueves': 'Thursday', 'Viernes': 'Friday', 'Sábado': 'Saturday', 'Domingo': 'Sunday'
-        };
+        // 0 = lunes ... 6 = domingo, igual que dia_semana_num
+        const diaActual = currentTime.isoWeekday() - 1;
 
-        const diaMateriaEnIngles = diasMap[diaMateria];
-
-        if (diaMateriaEnIngles !== diaActual) {
+        if (materia.dia_semana_num !== diaActual) {
             // Calcular cuántos días faltan hasta el próximo día de la materia
-            const diasSemana = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
-            const diaActualIndex = diasSemana.indexOf(diaActual);
-            const diaMateriaIndex = diasSemana.indexOf(diaMateriaEnIngles);
-            
-            let diasFaltantes = diaMateriaIndex - diaActualIndex;
+            let diasFaltantes = materia.dia_semana_num - diaActual;
             if (diasFaltantes <= 0) {
                 diasFaltantes += 7; // Siguiente semana
             }
@@ -214,7 +199,8 @@ const MisMateriasDocenteView: React.FC = () => {
             });
 
             setCreatedSession(response.data);
-            setIsExistingSession(false);
+            // 200: la sesión ya existía (otra pestaña o el programador de sesiones la creó)
+            setIsExistingSession(response.status === 200);
             setIsModalOpen(true);
         } catch (err) {
             if (axios.isAxiosError(err) && err.response?.status === 400) {
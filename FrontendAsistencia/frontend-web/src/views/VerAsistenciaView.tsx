@@ -34,6 +34,9 @@ interface SesionClase {
   hora_inicio: string;
   hora_fin: string;
   tema?: string;
+  presentes: number;
+  retrasos: number;
+  total_estudiantes: number;
 }
 
 const VerAsistenciaView: React.FC = () => {
@@ -321,6 +324,7 @@ const VerAsistenciaView: React.FC = () => {
               <option key={`sesion-${sesion.id}`} value={sesion.id}>
                 {sesion.fecha} - {sesion.hora_inicio} a {sesion.hora_fin}
                 {sesion.tema && ` (${sesion.tema})`}
+                {` - ${sesion.presentes + sesion.retrasos}/${sesion.total_estudiantes} presentes`}
               </option>
             ))}
           </select>